@@ -0,0 +1,347 @@
+"""
+Per-iteration cost of every bot's loop body against a freshly deployed ecosystem on anvil
+
+Starts anvil on a free port, deploys script/DeployEcosystem.s.sol with forge,
+then runs each bot's loop body (snapshot + step, or the oracle's fetch +
+update) N times in its own worker process, with the chain reverted to the
+deployed state in between. Every RPC request is counted by method; loop body
+calls and receipt polling after each iteration are reported separately.
+Transactions are confirmed synchronously after each iteration, so gas and
+reverts are exact. Peak memory is the worker's maximum resident set size.
+
+The oracle follows a seeded random walk advanced by ORACLE_UPDATE_INTERVAL
+per iteration and the retailers draw from a seeded generator, so two runs of
+the same commit do the same work. The result is one JSON document; with
+--baseline the latency, RPC and gas figures are compared with an earlier one.
+
+Usage:
+    python bench_bots.py --iterations 100 --out bench.json
+    python bench_bots.py --bots profit_bot_1 --borrowers 300 --baseline bench.json
+    python bench_bots.py --rpc-url http://localhost:8545   # ecosystem already deployed and configured in .env
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+import numpy as np
+from web3 import Web3
+from config import RPC_URL, ROOT_DIR, WALLET_1_KEY, WALLET_2_KEY, WALLET_3_KEY, WALLET_4_KEY
+from utils import TransactionSubmitter, TransactionReverted, AllowanceManager
+from contracts import call_view
+from control import BOTS, CONTROL
+from snapshot import snapshot
+from positions import PositionBook
+from ledger import BalanceLedger
+from prices import RandomWalkSource
+from simulate import DEFAULT_VOLATILITY, SimClock
+from bench_positions import make_users
+import oracle_bot
+import profit_bot_1
+import profit_bot_2
+import retailer_bot_1
+import retailer_bot_2
+
+DEPLOY_SCRIPT = "script/DeployEcosystem.s.sol:DeployEcosystem"
+# Anvil's first default account, the deployer used by run_ecosystem.sh
+DEPLOYER_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"
+
+# Contract deployed by DeployEcosystem -> configuration variable holding its address
+DEPLOYED_CONTRACTS = {
+    "MockWETH": "MWETH_ADDRESS",
+    "DemoStablecoin": "DUSD_ADDRESS",
+    "DemoStablecoinUSC": "DUSC_ADDRESS",
+    "MockOracle": "ORACLE_ADDRESS",
+    "SimpleDEX": "DEX_ADDRESS",
+    "LendingProtocol": "LENDING_ADDRESS",
+    "MinterRedeemer": "MINTER_REDEEMER_ADDRESS",
+    "Multicall": "MULTICALL_ADDRESS"
+}
+
+# Wallets 1-4 are vm.addr(1) ... vm.addr(4), whose private keys are 1 ... 4
+DEPLOYED_WALLET_KEYS = {f"WALLET_{n}_KEY": f"0x{n:064x}" for n in range(1, 5)}
+
+# Bot id -> (module, wallet key)
+WALLET_BOTS = {
+    retailer_bot_1.BOT_ID: (retailer_bot_1, WALLET_1_KEY),
+    retailer_bot_2.BOT_ID: (retailer_bot_2, WALLET_2_KEY),
+    profit_bot_1.BOT_ID: (profit_bot_1, WALLET_3_KEY),
+    profit_bot_2.BOT_ID: (profit_bot_2, WALLET_4_KEY)
+}
+
+class CountingProvider(Web3.HTTPProvider):
+    """HTTPProvider that counts requests by JSON-RPC method"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = Counter()
+
+    def make_request(self, method, params):
+        self.calls[method] += 1
+        return super().make_request(method, params)
+
+class RecordingSubmitter(TransactionSubmitter):
+    """Submitter that keeps every transaction it sent, to total their gas afterwards"""
+
+    def __init__(self, w3: Web3):
+        # Receipts are polled by the benchmark right after each iteration
+        super().__init__(w3, background=False)
+        self.sent = []
+
+    def send(self, *args, **kwargs):
+        pending = super().send(*args, **kwargs)
+        self.sent.append(pending)
+        return pending
+
+def percentiles(samples: list) -> dict:
+    """Latency summary in milliseconds"""
+    values = np.array(samples) * 1e3
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    return {"mean": round(float(values.mean()), 3), "p50": round(float(p50), 3), "p90": round(float(p90), 3),
+            "p99": round(float(p99), 3), "max": round(float(values.max()), 3)}
+
+def _loop_body(bot: str, w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, seed: int, borrowers: int):
+    """body(index) doing what one iteration of the bot's main loop does"""
+    if bot == oracle_bot.BOT_ID:
+        account = w3.eth.account.from_key(oracle_bot.ORACLE_KEY)
+        clock = SimClock()
+        source = RandomWalkSource(call_view(w3, "oracle", "latestRoundData")[1], DEFAULT_VOLATILITY, seed, clock=clock)
+        policy = oracle_bot.UpdatePolicy(clock=clock)
+
+        def body(index: int):
+            clock.now = index * CONTROL.get("ORACLE_UPDATE_INTERVAL")
+            oracle_bot.step(w3, submitter, account, source, policy)
+        return body
+
+    module, key = WALLET_BOTS[bot]
+    if not key:
+        raise ValueError(f"no wallet key configured for {bot}")
+    account = w3.eth.account.from_key(key)
+    if module in (retailer_bot_1, retailer_bot_2):
+        rng = random.Random(seed)
+        ledger = BalanceLedger([account.address])
+
+        def body(index: int):
+            snap = snapshot(w3, [account.address], ledger=ledger)
+            module.step(w3, submitter, allowances, account, snap, rng)
+        return body
+
+    book = PositionBook()
+    # Written to storage, so the book is told about them directly
+    for user in make_users(w3, borrowers):
+        book.set_position(user, *call_view(w3, "lending", "positions", user))
+    ledger = BalanceLedger([account.address])
+
+    def body(index: int):
+        snap = snapshot(w3, [account.address], ledger=ledger)
+        module.step(w3, submitter, allowances, account, book, snap)
+    return body
+
+def run_bot(bot: str, iterations: int, seed: int, borrowers: int) -> dict:
+    """Benchmark one bot in this process (the worker side)"""
+    provider = CountingProvider(RPC_URL)
+    w3 = Web3(provider)
+    submitter = RecordingSubmitter(w3)
+    allowances = AllowanceManager(w3, submitter)
+    body = _loop_body(bot, w3, submitter, allowances, seed, borrowers)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    provider.calls.clear()
+    loop_calls, confirm_calls = Counter(), Counter()
+    latencies = []
+    errors = []
+    for index in range(iterations):
+        before = provider.calls.copy()
+        started = time.perf_counter()
+        try:
+            body(index)
+        except Exception as e:
+            errors.append(str(e))
+        latencies.append(time.perf_counter() - started)
+        after_body = provider.calls.copy()
+        loop_calls += after_body - before
+        # anvil mines on arrival, so one poll resolves everything this iteration sent
+        submitter.poll()
+        confirm_calls += provider.calls - after_body
+
+    gas_used = reverted = 0
+    for pending in submitter.sent:
+        try:
+            receipt = pending.result(timeout=0)
+        except TransactionReverted as e:
+            receipt = e.receipt
+            reverted += 1
+        except Exception:
+            continue
+        gas_used += receipt.gasUsed
+
+    total_calls = sum(loop_calls.values())
+    return {
+        "iterations": iterations,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "latency_ms": percentiles(latencies),
+        "rpc_calls": {
+            "per_iteration": round(total_calls / iterations, 2),
+            "by_method": dict(loop_calls.most_common())
+        },
+        "confirmation_rpc_calls": {
+            "per_iteration": round(sum(confirm_calls.values()) / iterations, 2),
+            "by_method": dict(confirm_calls.most_common())
+        },
+        "transactions": {
+            "sent": len(submitter.sent),
+            "reverted": reverted,
+            "gas_used": gas_used,
+            "gas_per_iteration": round(gas_used / iterations)
+        },
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "rss_growth_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1)
+    }
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_anvil(port: int) -> subprocess.Popen:
+    process = subprocess.Popen(["anvil", "--port", str(port), "--silent"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    w3 = Web3(Web3.HTTPProvider(f"http://127.0.0.1:{port}"))
+    deadline = time.monotonic() + 15
+    while not w3.is_connected():
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError(f"anvil did not start on port {port}")
+        time.sleep(0.1)
+    return process
+
+def deploy(rpc_url: str) -> dict:
+    """Run DeployEcosystem and return the configuration variables of the deployed addresses"""
+    subprocess.run(["forge", "script", DEPLOY_SCRIPT, "--rpc-url", rpc_url, "--broadcast", "--private-key", DEPLOYER_KEY],
+                   cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL)
+    chain_id = Web3(Web3.HTTPProvider(rpc_url)).eth.chain_id
+    with open(os.path.join(ROOT_DIR, "broadcast", "DeployEcosystem.s.sol", str(chain_id), "run-latest.json")) as f:
+        transactions = json.load(f)["transactions"]
+    addresses = {}
+    for tx in transactions:
+        if tx.get("transactionType") == "CREATE" and tx.get("contractName") in DEPLOYED_CONTRACTS:
+            addresses[DEPLOYED_CONTRACTS[tx["contractName"]]] = Web3.to_checksum_address(tx["contractAddress"])
+    missing = set(DEPLOYED_CONTRACTS.values()) - set(addresses)
+    if missing:
+        raise RuntimeError(f"deployment did not create {', '.join(sorted(missing))}")
+    return addresses
+
+def git_revision() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+def rpc(w3: Web3, method: str, params: list):
+    response = w3.provider.make_request(method, params)
+    if "error" in response:
+        raise RuntimeError(f"{method} failed: {response['error']}")
+    return response["result"]
+
+def compare(result: dict, baseline: dict):
+    """Print the relative change of the main figures of every bot in both results"""
+    figures = (("latency p50 ms", ("latency_ms", "p50")), ("latency p99 ms", ("latency_ms", "p99")),
+               ("RPC calls / iteration", ("rpc_calls", "per_iteration")),
+               ("gas / iteration", ("transactions", "gas_per_iteration")), ("peak RSS MB", ("peak_rss_mb",)))
+    print(f"Compared with {(baseline.get('commit') or 'baseline')[:12]}:")
+    for bot, stats in result["bots"].items():
+        old_stats = baseline.get("bots", {}).get(bot)
+        if "error" in stats or not old_stats or "error" in old_stats:
+            continue
+        print(f"  {bot}")
+        for label, path in figures:
+            new, old = stats, old_stats
+            for key in path:
+                new, old = new[key], old[key]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"    {label:<24} {old:>12} -> {new:<12} {change}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=50, help="loop body runs per bot")
+    parser.add_argument("--bots", nargs="+", choices=BOTS, default=list(BOTS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--borrowers", type=int, default=0, help="synthetic lending positions for the profit bots to monitor")
+    parser.add_argument("--rpc-url", help="use this node and the addresses in the environment instead of starting anvil")
+    parser.add_argument("--out", help="write the result JSON here as well")
+    parser.add_argument("--baseline", help="earlier result JSON to compare with")
+    parser.add_argument("--worker", choices=BOTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_bot(args.worker, args.iterations, args.seed, args.borrowers)))
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="bench_bots_")
+    # Workers log to a scratch directory, not the running ecosystem's files
+    env = dict(os.environ, LOG_FILE=os.path.join(workdir, "ecosystem.log"), STATS_DIR=os.path.join(workdir, "stats"))
+    anvil = None
+    if args.rpc_url:
+        env["RPC_URL"] = args.rpc_url
+    else:
+        port = free_port()
+        env["RPC_URL"] = f"http://127.0.0.1:{port}"
+        env["WS_URL"] = f"ws://127.0.0.1:{port}"
+        anvil = start_anvil(port)
+    try:
+        if anvil:
+            env.update(deploy(env["RPC_URL"]))
+            env.update(DEPLOYED_WALLET_KEYS)
+        w3 = Web3(Web3.HTTPProvider(env["RPC_URL"]))
+        result = {
+            **git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "node": w3.client_version,
+            "iterations": args.iterations,
+            "seed": args.seed,
+            "borrowers": args.borrowers,
+            "bots": {}
+        }
+        for bot in args.bots:
+            snapshot_id = rpc(w3, "evm_snapshot", [])
+            command = [sys.executable, os.path.abspath(__file__), "--worker", bot, "--iterations", str(args.iterations),
+                       "--seed", str(args.seed), "--borrowers", str(args.borrowers)]
+            print(f"Benchmarking {bot}...", file=sys.stderr)
+            try:
+                worker = subprocess.run(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+            finally:
+                rpc(w3, "evm_revert", [snapshot_id])
+            if worker.returncode == 0:
+                result["bots"][bot] = json.loads(worker.stdout.splitlines()[-1])
+            else:
+                result["bots"][bot] = {"error": worker.stderr.strip().splitlines()[-1] if worker.stderr.strip() else f"exit code {worker.returncode}"}
+    finally:
+        if anvil:
+            anvil.terminate()
+            anvil.wait()
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(result, json.load(f))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
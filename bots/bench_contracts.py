@@ -0,0 +1,74 @@
+"""
+Micro-benchmark of per-call contract overhead: inline ABI + w3.eth.contract on every call vs the registry
+
+Usage:
+    python bench_contracts.py            # calldata construction only, no node needed
+    python bench_contracts.py --rpc      # also time full eth_calls against RPC_URL
+"""
+import argparse
+import timeit
+from web3 import Web3
+from config import RPC_URL
+from contracts import address_of, call_view, encode_call, get_contract
+
+BALANCE_OF_ABI = [{"constant": True, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf", "outputs": [{"name": "balance", "type": "uint256"}], "type": "function"}]
+LATEST_ROUND_DATA_ABI = [{"inputs": [], "name": "latestRoundData", "outputs": [{"name": "", "type": "uint80"}, {"name": "", "type": "int256"}, {"name": "", "type": "uint256"}, {"name": "", "type": "uint256"}, {"name": "", "type": "uint80"}], "stateMutability": "view", "type": "function"}]
+
+OWNER = "0x7E5F4552091A69125d5DfCb7b8C2659029395Bdf"  # vm.addr(1), wallet 1
+
+def legacy_oracle_calldata(w3: Web3):
+    """What get_oracle_price used to do before sending the call"""
+    contract = w3.eth.contract(address=address_of("oracle"), abi=LATEST_ROUND_DATA_ABI)
+    return contract.functions.latestRoundData()._encode_transaction_data()
+
+def legacy_balance_calldata(w3: Web3):
+    """What get_balance used to do before sending the call"""
+    contract = w3.eth.contract(address=address_of("mweth"), abi=BALANCE_OF_ABI)
+    return contract.functions.balanceOf(OWNER)._encode_transaction_data()
+
+def legacy_oracle_call(w3: Web3):
+    contract = w3.eth.contract(address=address_of("oracle"), abi=LATEST_ROUND_DATA_ABI)
+    return contract.functions.latestRoundData().call()
+
+def legacy_balance_call(w3: Web3):
+    contract = w3.eth.contract(address=address_of("mweth"), abi=BALANCE_OF_ABI)
+    return contract.functions.balanceOf(OWNER).call()
+
+def per_call_us(fn, number: int) -> float:
+    """Best-of-5 time per call in microseconds"""
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+def report(label: str, before: float, after: float):
+    print(f"{label:<34} {before:>10.1f} us {after:>10.1f} us {before / after:>8.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rpc", action="store_true", help="also time full eth_calls against RPC_URL")
+    parser.add_argument("-n", "--number", type=int, default=2000, help="calls per timing run")
+    args = parser.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    # Warm the registry caches so only the steady-state cost is measured
+    get_contract(w3, "oracle")
+    encode_call("oracle", "latestRoundData")
+    encode_call("mweth", "balanceOf", OWNER)
+
+    print(f"{'':<34} {'before':>13} {'after':>13} {'speedup':>9}")
+    report("latestRoundData calldata",
+           per_call_us(lambda: legacy_oracle_calldata(w3), args.number),
+           per_call_us(lambda: encode_call("oracle", "latestRoundData"), args.number))
+    report("balanceOf calldata",
+           per_call_us(lambda: legacy_balance_calldata(w3), args.number),
+           per_call_us(lambda: encode_call("mweth", "balanceOf", OWNER), args.number))
+
+    if args.rpc:
+        number = max(args.number // 10, 1)
+        report("latestRoundData eth_call",
+               per_call_us(lambda: legacy_oracle_call(w3), number),
+               per_call_us(lambda: call_view(w3, "oracle", "latestRoundData"), number))
+        report("balanceOf eth_call",
+               per_call_us(lambda: legacy_balance_call(w3), number),
+               per_call_us(lambda: call_view(w3, "mweth", "balanceOf", OWNER), number))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Latency and gas of bulk position health checks: one canLiquidate eth_call per address vs the batch views
+
+For each list size, synthetic positions (a third without debt, a third
+without collateral, the rest undercollateralized) are written straight into
+LendingProtocol storage with anvil_setStorageAt, then the list is checked with
+N canLiquidate calls, one getLiquidatable call and one getPositions call.
+Gas is eth_estimateGas of each call, so the per-address loop also pays the
+21000 base cost N times. Chain state is restored with evm_snapshot/evm_revert
+afterwards.
+
+Usage:
+    python bench_positions.py                 # 1, 100 and 1000 addresses against RPC_URL
+    python bench_positions.py --sizes 10 5000
+"""
+import argparse
+import time
+from web3 import Web3
+from config import RPC_URL
+from contracts import address_of, call_view, encode_call
+from positions import VIEW_BATCH_SIZE, get_liquidatable, get_positions
+
+# Storage slot of LendingProtocol.positions
+POSITIONS_SLOT = 4
+
+def _word(value: int) -> str:
+    return "0x" + value.to_bytes(32, "big").hex()
+
+def set_position(w3: Web3, user: str, collateral: int, dusd_debt: int, dusc_debt: int):
+    """Overwrite positions[user] in place, as the Foundry tests do with vm.store"""
+    slot = int.from_bytes(Web3.solidity_keccak(["uint256", "uint256"], [int(user, 16), POSITIONS_SLOT]), "big")
+    for offset, value in enumerate((collateral, dusd_debt, dusc_debt)):
+        w3.provider.make_request("anvil_setStorageAt", [address_of("lending"), hex(slot + offset), _word(value)])
+
+def make_users(w3: Web3, count: int) -> list:
+    users = []
+    for i in range(count):
+        user = Web3.to_checksum_address(f"0x{0x1000 + i:040x}")
+        if i % 3 == 0:
+            set_position(w3, user, 10**18, 0, 0)
+        elif i % 3 == 1:
+            set_position(w3, user, 0, 100 * 10**18, 0)
+        else:
+            set_position(w3, user, i * 10**15, 1000 * 10**18, 500 * 10**18)
+        users.append(user)
+    return users
+
+def best_ms(fn, repeat: int) -> float:
+    """Best-of-repeat wall time in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1e3
+
+def estimate_gas(w3: Web3, fn_name: str, *args) -> int:
+    return w3.eth.estimate_gas({"to": address_of("lending"), "data": encode_call("lending", fn_name, *args)})
+
+def report(label: str, calls: int, ms: float, gas: int):
+    print(f"  {label:<22} {calls:>6} {ms:>11.2f} {gas:>13,}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1000], help="address list sizes")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="timing runs per measurement")
+    args = parser.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    if not w3.is_connected():
+        print("Failed to connect to RPC")
+        return
+
+    snapshot_id = w3.provider.make_request("evm_snapshot", [])["result"]
+    try:
+        users = make_users(w3, max(args.sizes))
+        for size in args.sizes:
+            batch = users[:size]
+            print(f"{size} addresses")
+            print(f"  {'':<22} {'calls':>6} {'latency ms':>11} {'gas':>13}")
+            report("canLiquidate x N", size,
+                   best_ms(lambda: [call_view(w3, "lending", "canLiquidate", user) for user in batch], args.repeat),
+                   sum(estimate_gas(w3, "canLiquidate", user) for user in batch))
+            batch_calls = -(-size // VIEW_BATCH_SIZE)
+            report("getLiquidatable", batch_calls,
+                   best_ms(lambda: get_liquidatable(w3, batch), args.repeat),
+                   estimate_gas(w3, "getLiquidatable", batch))
+            report("getPositions", batch_calls,
+                   best_ms(lambda: get_positions(w3, batch), args.repeat),
+                   estimate_gas(w3, "getPositions", batch))
+    finally:
+        w3.provider.make_request("evm_revert", [snapshot_id])
+
+if __name__ == "__main__":
+    main()
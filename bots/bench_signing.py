@@ -0,0 +1,84 @@
+"""
+Transaction signatures per second: account.sign_transaction vs cached keys vs SigningPool per process count
+
+Signs the same batch of EIP-1559 swap transactions from --accounts accounts
+(each account's nonces in order) every way, best of --repeat runs. The pool
+is started and warmed before it is timed, so process start-up and the key
+derivation of every account in every worker are not part of the figure.
+No node is needed.
+
+Usage:
+    python bench_signing.py                         # 1, 2, 4 ... up to one process per core
+    python bench_signing.py --transactions 5000 --processes 1 2 4 8 16
+"""
+import argparse
+import os
+import time
+from eth_account import Account
+from web3 import Web3
+from contracts import encode_call
+from signing import SigningPool, sign
+
+# Any address does; nothing is sent
+DEX = Web3.to_checksum_address("0x" + "d1" * 20)
+
+def make_batch(accounts: int, transactions: int) -> list:
+    """(account, tx) pairs cycling through the accounts, each one's nonces counting up"""
+    keys = [Account.from_key((index + 1).to_bytes(32, "big")) for index in range(accounts)]
+    batch = []
+    for index in range(transactions):
+        account = keys[index % accounts]
+        batch.append((account, {
+            "to": DEX,
+            "data": encode_call("dex", "swapDUSDForWETH", 10**18 + index),
+            "value": 0,
+            "gas": 200000,
+            "nonce": index // accounts,
+            "chainId": 31337,
+            "maxFeePerGas": 3 * 10**9,
+            "maxPriorityFeePerGas": 10**9
+        }))
+    return batch
+
+def best_rate(fn, count: int, repeat: int) -> float:
+    """Best-of-repeat signatures per second"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return count / min(timings)
+
+def report(label: str, rate: float, baseline: float):
+    print(f"{label:<34} {rate:>10.0f} {rate / baseline:>8.2f}x")
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transactions", type=int, default=2000, help="transactions per batch")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--processes", type=int, nargs="+",
+                        default=sorted({2**n for n in range(cores.bit_length()) if 2**n <= cores} | {cores}))
+    parser.add_argument("--chunk-size", type=int, default=64, help="transactions per worker task")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="timing runs per measurement")
+    args = parser.parse_args()
+
+    batch = make_batch(args.accounts, args.transactions)
+    print(f"{args.transactions} transactions from {args.accounts} accounts, {cores} cores")
+    print(f"{'':<34} {'signatures/s':>10} {'speedup':>9}")
+    # Sequential loops sign the first fifth only; they are slow and the rate does not depend on the count
+    sample = batch[:max(len(batch) // 5, 1)]
+    baseline = best_rate(lambda: [account.sign_transaction(tx) for account, tx in sample], len(sample), args.repeat)
+    report("account.sign_transaction", baseline, baseline)
+    report("sign() with cached keys", best_rate(lambda: [sign(account.key, tx) for account, tx in sample], len(sample), args.repeat),
+           baseline)
+    for processes in args.processes:
+        with SigningPool(processes, args.chunk_size) as pool:
+            # Start the workers and fill their key caches
+            pool.sign(batch)
+            signed = pool.sign(batch)
+            assert [tx.nonce for tx in signed] == [tx["nonce"] for _, tx in batch], "pool changed the order"
+            report(f"SigningPool, {processes} processes", best_rate(lambda: pool.sign(batch), len(batch), args.repeat), baseline)
+
+if __name__ == "__main__":
+    main()
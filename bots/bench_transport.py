@@ -0,0 +1,128 @@
+"""
+Latency of a typical bot iteration per RPC transport: plain HTTP, keep-alive HTTP, batched HTTP and IPC
+
+An iteration is what a profit bot's threads read after a block: the main loop
+takes a snapshot with the ledger and syncs the position book, the block
+watcher reads the fee quote and the block's receipts, and the receipt poller
+reads the head and the wallet's nonce, all three at once as in the bot. Every
+transport does the same N iterations, each after an evm_mine, and the chain is
+reverted afterwards. Requests count JSON-RPC requests and HTTP posts count
+round trips, which batching makes fewer than requests.
+
+Needs the ecosystem deployed and configured as for the bots. The IPC row needs
+the node's socket: start anvil with --ipc <path> and pass it with --ipc-path
+or RPC_IPC_PATH.
+
+Usage:
+    python bench_transport.py
+    python bench_transport.py --iterations 500 --ipc-path /tmp/anvil.ipc
+"""
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from web3 import Web3
+from config import RPC_URL, RPC_IPC_PATH, WALLET_3_KEY
+from utils import FeeOracle
+from snapshot import snapshot
+from positions import PositionBook
+from ledger import BalanceLedger
+from transport import BatchingHTTPProvider
+
+class RequestCounter:
+    """Innermost middleware counting the JSON-RPC requests of one connection"""
+
+    def __init__(self):
+        self.requests = 0
+
+    def middleware(self, make_request, w3):
+        def middleware(method, params):
+            self.requests += 1
+            return make_request(method, params)
+        return middleware
+
+def transports(ipc_path: str) -> dict:
+    """Label -> provider factory"""
+    factories = {
+        "HTTP, web3 defaults": lambda: Web3.HTTPProvider(RPC_URL),
+        "HTTP, keep-alive pool": lambda: BatchingHTTPProvider(RPC_URL, batch_size=1),
+        "HTTP, keep-alive + batching": lambda: BatchingHTTPProvider(RPC_URL)
+    }
+    if ipc_path:
+        factories["IPC"] = lambda: Web3.IPCProvider(ipc_path)
+    return factories
+
+def iteration(w3: Web3, executor: ThreadPoolExecutor, wallet: str, book: PositionBook, ledger: BalanceLedger, fees: FeeOracle):
+    """One block's reads, issued from three threads as a bot issues them"""
+    def loop():
+        snap = snapshot(w3, [wallet], ledger=ledger)
+        book.sync(w3, snap.block_number)
+
+    def watcher():
+        block_number = w3.eth.block_number
+        fees.new_block(block_number)
+        fees.fees()
+        w3.manager.request_blocking("eth_getBlockReceipts", [hex(block_number)])
+
+    def poller():
+        w3.eth.block_number
+        w3.eth.get_transaction_count(wallet)
+
+    for future in [executor.submit(task) for task in (loop, watcher, poller)]:
+        future.result()
+
+def measure(provider, control: Web3, wallet: str, iterations: int) -> dict:
+    w3 = Web3(provider)
+    counter = RequestCounter()
+    w3.middleware_onion.inject(counter.middleware, "request_counter", layer=0)
+    book, ledger, fees = PositionBook(), BalanceLedger([wallet]), FeeOracle(w3)
+    timings = []
+    with ThreadPoolExecutor(3) as executor:
+        # The first iteration seeds the ledger and the position book
+        iteration(w3, executor, wallet, book, ledger, fees)
+        requests = counter.requests
+        posts = getattr(provider, "posts", None)
+        for _ in range(iterations):
+            control.provider.make_request("evm_mine", [])
+            started = time.perf_counter()
+            iteration(w3, executor, wallet, book, ledger, fees)
+            timings.append(time.perf_counter() - started)
+    timings = np.array(timings) * 1000
+    return {
+        "p50": float(np.percentile(timings, 50)),
+        "p99": float(np.percentile(timings, 99)),
+        "mean": float(timings.mean()),
+        "requests": (counter.requests - requests) / iterations,
+        "posts": (provider.posts - posts) / iterations if posts is not None else None
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=200, help="iterations per transport")
+    parser.add_argument("--ipc-path", default=RPC_IPC_PATH, help="node IPC socket (anvil --ipc <path>)")
+    args = parser.parse_args()
+
+    control = Web3(Web3.HTTPProvider(RPC_URL))
+    if not control.is_connected():
+        print("Failed to connect to RPC")
+        return 1
+    wallet = control.eth.account.from_key(WALLET_3_KEY).address if WALLET_3_KEY else control.eth.accounts[0]
+
+    snapshot_id = control.provider.make_request("evm_snapshot", [])["result"]
+    try:
+        print(f"{args.iterations} iterations per transport")
+        print(f"{'':<30} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8} {'requests':>9} {'posts':>6} {'speedup':>8}")
+        baseline = None
+        for label, factory in transports(args.ipc_path).items():
+            result = measure(factory(), control, wallet, args.iterations)
+            baseline = baseline or result["mean"]
+            posts = f"{result['posts']:.1f}" if result["posts"] is not None else "-"
+            print(f"{label:<30} {result['p50']:>8.2f} {result['p99']:>8.2f} {result['mean']:>8.2f} "
+                  f"{result['requests']:>9.1f} {posts:>6} {baseline / result['mean']:>7.2f}x")
+    finally:
+        control.provider.make_request("evm_revert", [snapshot_id])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,21 @@ load_dotenv()
 # RPC URL - defaults to local Anvil
 RPC_URL = os.getenv("RPC_URL", "http://localhost:8545")
 
+# Unix socket of a node on the same host (anvil --ipc <path>); when set the bots use it instead of RPC_URL
+RPC_IPC_PATH = os.getenv("RPC_IPC_PATH", "")
+
+# HTTP transport: keep-alive connections per process (also the most reads on the wire at once), most reads
+# grouped in one JSON-RPC batch while all of them are busy (1 sends every request on its own) and seconds
+# before a request times out
+RPC_POOL_SIZE = int(os.getenv("RPC_POOL_SIZE", "8"))
+RPC_BATCH_SIZE = int(os.getenv("RPC_BATCH_SIZE", "32"))
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "10"))
+
+# Websocket endpoint for block and event subscriptions (anvil serves both on the same port);
+# the bots fall back to polling filters over RPC_URL every EVENT_POLL_INTERVAL seconds
+WS_URL = os.getenv("WS_URL", "ws://localhost:8545")
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.5"))
+
 # Contract addresses (will be set after deployment)
 MWETH_ADDRESS = os.getenv("MWETH_ADDRESS", "")
 DUSD_ADDRESS = os.getenv("DUSD_ADDRESS", "")
@@ -17,6 +32,10 @@ ORACLE_ADDRESS = os.getenv("ORACLE_ADDRESS", "")
 DEX_ADDRESS = os.getenv("DEX_ADDRESS", "")
 LENDING_ADDRESS = os.getenv("LENDING_ADDRESS", "")
 MINTER_REDEEMER_ADDRESS = os.getenv("MINTER_REDEEMER_ADDRESS", "")
+MULTICALL_ADDRESS = os.getenv("MULTICALL_ADDRESS", "")
+
+# Foundry build artifacts the bots load contract ABIs from
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "out"))
 
 # Wallet private keys (for testing - in production use secure key management)
 WALLET_1_KEY = os.getenv("WALLET_1_KEY", "")
@@ -24,9 +43,80 @@ WALLET_2_KEY = os.getenv("WALLET_2_KEY", "")
 WALLET_3_KEY = os.getenv("WALLET_3_KEY", "")
 WALLET_4_KEY = os.getenv("WALLET_4_KEY", "")
 
+# Event indexer: SQLite database and initial eth_getLogs range in blocks (adapted at runtime)
+INDEX_DB = os.getenv("INDEX_DB", "events.db")
+INDEX_CHUNK_SIZE = int(os.getenv("INDEX_CHUNK_SIZE", "2000"))
+
 # Logging
 LOG_FILE = os.getenv("LOG_FILE", "ecosystem.log")
-STATS_FILE = os.getenv("STATS_FILE", "statistics.log")
+# Statistics store: one segment file per STATS_SEGMENT_SECONDS under STATS_DIR
+STATS_DIR = os.getenv("STATS_DIR", "stats")
+STATS_SEGMENT_SECONDS = int(os.getenv("STATS_SEGMENT_SECONDS", "3600"))
+# Lowest level written (DEBUG, INFO, WARNING, ERROR)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Log files are rotated to .1 ... .LOG_BACKUPS once they exceed LOG_MAX_BYTES
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+# Lines buffered for the background writer; DEBUG lines are sampled once it is half full
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# RPC metrics of every bot: request counts, errors and latency histograms (RPC_METRICS=0 disables them),
+# served in Prometheus format on METRICS_PORT plus the process' offset (0 serves nothing)
+# and summarized in the log every METRICS_LOG_INTERVAL seconds (0 never)
+RPC_METRICS = os.getenv("RPC_METRICS", "1") == "1"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9400"))
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "60"))
+
+# Bot control: both files live in the repository root, where the run and stop scripts write them
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+KILL_SWITCH_FILE = os.getenv("KILL_SWITCH_FILE", os.path.join(ROOT_DIR, ".kill_switch"))
+# Pause flags and setting overrides, managed with control.py
+CONTROL_FILE = os.getenv("CONTROL_FILE", os.path.join(ROOT_DIR, ".control.json"))
+# Seconds between checks of both files where inotify is unavailable
+CONTROL_POLL_INTERVAL = float(os.getenv("CONTROL_POLL_INTERVAL", "0.5"))
+
+# Single-process runtime: seconds one bot step may take before it is abandoned
+BOT_STEP_TIMEOUT = float(os.getenv("BOT_STEP_TIMEOUT", "30"))
+
+# Transaction fees are read once per block, or again after FEE_MAX_AGE seconds where no block
+# notifications arrive; the priority fee is the FEE_PRIORITY_PERCENTILE tip of the latest block,
+# at least MIN_PRIORITY_FEE wei
+FEE_MAX_AGE = float(os.getenv("FEE_MAX_AGE", "2"))
+FEE_PRIORITY_PERCENTILE = float(os.getenv("FEE_PRIORITY_PERCENTILE", "50"))
+MIN_PRIORITY_FEE = int(os.getenv("MIN_PRIORITY_FEE", str(10**9)))
+# Gas limits are estimated once per contract function and multiplied by GAS_LIMIT_MARGIN
+GAS_LIMIT_MARGIN = float(os.getenv("GAS_LIMIT_MARGIN", "1.3"))
+
+# Wallet balances follow Transfer logs and are read on chain again every LEDGER_RECONCILE_BLOCKS
+# blocks; the last LEDGER_HISTORY changes are kept per wallet
+LEDGER_RECONCILE_BLOCKS = int(os.getenv("LEDGER_RECONCILE_BLOCKS", "100"))
+LEDGER_HISTORY = int(os.getenv("LEDGER_HISTORY", "1000"))
+
+# Batches of transactions are signed by SIGNING_PROCESSES worker processes (0: one per core),
+# SIGNING_CHUNK_SIZE transactions per task
+SIGNING_PROCESSES = int(os.getenv("SIGNING_PROCESSES", "0"))
+SIGNING_CHUNK_SIZE = int(os.getenv("SIGNING_CHUNK_SIZE", "64"))
+
+# Arbitrage sizing (wei): cycles expected to return less than ARB_MIN_PROFIT are skipped,
+# and no cycle spends more than ARB_MAX_TRADE of its input stablecoin
+ARB_MIN_PROFIT = int(os.getenv("ARB_MIN_PROFIT", str(10**18)))
+ARB_MAX_TRADE = int(os.getenv("ARB_MAX_TRADE", str(1000 * 10**18)))
+# Seconds after the snapshot block within which an arbitrage must be mined
+ARB_DEADLINE = int(os.getenv("ARB_DEADLINE", "30"))
+
+# Retail trade size range in mWETH wei, and the least seconds between two retail trades
+RETAIL_MIN_TRADE = int(os.getenv("RETAIL_MIN_TRADE", str(10**16)))
+RETAIL_MAX_TRADE = int(os.getenv("RETAIL_MAX_TRADE", str(3 * 10**17)))
+RETAIL_TRADE_INTERVAL = float(os.getenv("RETAIL_TRADE_INTERVAL", "10"))
 
-# Bot control
-KILL_SWITCH_FILE = os.getenv("KILL_SWITCH_FILE", ".kill_switch")
+# Seconds between two oracle price checks
+ORACLE_UPDATE_INTERVAL = float(os.getenv("ORACLE_UPDATE_INTERVAL", "5"))
+# Where the oracle bot reads prices: "binance", or "replay:<csv or parquet file>" to run offline
+ORACLE_SOURCE = os.getenv("ORACLE_SOURCE", "binance")
+# How many times faster than recorded a replay file is played back
+ORACLE_REPLAY_SPEEDUP = float(os.getenv("ORACLE_REPLAY_SPEEDUP", "1"))
+# A price goes on chain once it differs from the last one sent by ORACLE_DEVIATION_BPS basis points,
+# or when ORACLE_HEARTBEAT seconds passed since the last update
+ORACLE_DEVIATION_BPS = float(os.getenv("ORACLE_DEVIATION_BPS", "10"))
+ORACLE_HEARTBEAT = float(os.getenv("ORACLE_HEARTBEAT", "300"))
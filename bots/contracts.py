@@ -0,0 +1,150 @@
+"""
+Contract registry - loads ABIs from Foundry artifacts and builds each contract object once per process
+"""
+import json
+import os
+from functools import lru_cache
+from eth_abi import decode, encode
+from eth_utils import event_signature_to_log_topic, function_signature_to_4byte_selector
+from web3 import Web3
+from config import (ARTIFACTS_DIR, MWETH_ADDRESS, DUSD_ADDRESS, DUSC_ADDRESS, ORACLE_ADDRESS, DEX_ADDRESS,
+                    LENDING_ADDRESS, MINTER_REDEEMER_ADDRESS, MULTICALL_ADDRESS)
+
+# Registry name -> (Foundry artifact name, deployed address)
+CONTRACTS = {
+    "mweth": ("MockWETH", MWETH_ADDRESS),
+    "dusd": ("DemoStablecoin", DUSD_ADDRESS),
+    "dusc": ("DemoStablecoinUSC", DUSC_ADDRESS),
+    "oracle": ("MockOracle", ORACLE_ADDRESS),
+    "dex": ("SimpleDEX", DEX_ADDRESS),
+    "lending": ("LendingProtocol", LENDING_ADDRESS),
+    "minter": ("MinterRedeemer", MINTER_REDEEMER_ADDRESS),
+    "multicall": ("Multicall", MULTICALL_ADDRESS)
+}
+
+# Token registry names keyed by the symbols used in logs and snapshots
+TOKENS = {"mWETH": "mweth", "dUSD": "dusd", "dUSC": "dusc"}
+
+@lru_cache(maxsize=None)
+def load_abi(artifact: str) -> tuple:
+    """Load a contract ABI from Foundry's out/ directory"""
+    path = os.path.join(ARTIFACTS_DIR, f"{artifact}.sol", f"{artifact}.json")
+    try:
+        with open(path, "r") as f:
+            return tuple(json.load(f)["abi"])
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Contract artifact {path} not found, run `forge build` first") from None
+
+@lru_cache(maxsize=None)
+def address_of(name: str) -> str:
+    """Checksummed deployed address of a registered contract"""
+    return Web3.to_checksum_address(CONTRACTS[name][1])
+
+@lru_cache(maxsize=None)
+def get_contract(w3: Web3, name: str):
+    """Contract object for a registered contract, built once per Web3 instance"""
+    artifact, _ = CONTRACTS[name]
+    return w3.eth.contract(address=address_of(name), abi=list(load_abi(artifact)))
+
+def token_name(token_address: str) -> str:
+    """Registry name of one of the ecosystem ERC20 tokens, looked up by address"""
+    for name in TOKENS.values():
+        if CONTRACTS[name][1].lower() == token_address.lower():
+            return name
+    raise ValueError(f"Unknown token {token_address}")
+
+@lru_cache(maxsize=None)
+def _function_abi(name: str, fn_name: str) -> tuple:
+    """Selector, input types and output types of a contract function"""
+    artifact, _ = CONTRACTS[name]
+    for entry in load_abi(artifact):
+        if entry.get("type") == "function" and entry["name"] == fn_name:
+            input_types = [_abi_type(arg) for arg in entry["inputs"]]
+            output_types = [_abi_type(arg) for arg in entry["outputs"]]
+            selector = function_signature_to_4byte_selector(f"{fn_name}({','.join(input_types)})")
+            return selector, tuple(input_types), tuple(output_types)
+    raise ValueError(f"{artifact} has no function {fn_name}")
+
+@lru_cache(maxsize=None)
+def _event_abis(name: str) -> dict:
+    """Event signature topic (0x-prefixed hex) -> (event name, ((arg name, type, indexed), ...))"""
+    artifact, _ = CONTRACTS[name]
+    events = {}
+    for entry in load_abi(artifact):
+        if entry.get("type") == "event":
+            inputs = tuple((arg["name"], _abi_type(arg), arg.get("indexed", False)) for arg in entry["inputs"])
+            signature = f"{entry['name']}({','.join(arg_type for _, arg_type, _ in inputs)})"
+            events["0x" + event_signature_to_log_topic(signature).hex()] = (entry["name"], inputs)
+    return events
+
+@lru_cache(maxsize=None)
+def event_topics(name: str) -> dict:
+    """Event signature topic (0x-prefixed hex) -> event name for a registered contract"""
+    return {topic: event_name for topic, (event_name, _) in _event_abis(name).items()}
+
+@lru_cache(maxsize=None)
+def function_names(name: str) -> dict:
+    """Function selector (0x-prefixed hex) -> function name for a registered contract"""
+    artifact, _ = CONTRACTS[name]
+    names = {}
+    for entry in load_abi(artifact):
+        if entry.get("type") == "function":
+            signature = f"{entry['name']}({','.join(_abi_type(arg) for arg in entry['inputs'])})"
+            names["0x" + function_signature_to_4byte_selector(signature).hex()] = entry["name"]
+    return names
+
+def decode_log(name: str, topics: list, data: bytes) -> tuple:
+    """Decode a raw log of a registered contract into (event name, {arg name: value})"""
+    event_name, inputs = _event_abis(name)[topics[0]]
+    indexed = iter(topics[1:])
+    values = iter(decode([arg_type for _, arg_type, is_indexed in inputs if not is_indexed], data))
+    args = {}
+    for arg_name, arg_type, is_indexed in inputs:
+        if is_indexed:
+            # Indexed value types are stored as their 32-byte ABI encoding
+            args[arg_name] = decode([arg_type], bytes.fromhex(next(indexed)[2:]))[0]
+        else:
+            args[arg_name] = next(values)
+    return event_name, args
+
+def decode_events(logs: list) -> list:
+    """(registry name, event name, {arg name: value}) for every log in logs emitted by a registered contract"""
+    names = {address.lower(): name for name, (_, address) in CONTRACTS.items() if address}
+    events = []
+    for log in logs:
+        name = names.get(log["address"].lower())
+        topics = ["0x" + bytes(topic).hex() for topic in log["topics"]]
+        if name is None or not topics or topics[0] not in event_topics(name):
+            continue
+        events.append((name, *decode_log(name, topics, bytes(log["data"]))))
+    return events
+
+def _abi_type(arg: dict) -> str:
+    """Canonical type string of an ABI argument, expanding tuples"""
+    if arg["type"].startswith("tuple"):
+        return f"({','.join(_abi_type(c) for c in arg['components'])}){arg['type'][5:]}"
+    return arg["type"]
+
+@lru_cache(maxsize=None)
+def _static_calldata(name: str, fn_name: str) -> bytes:
+    return _function_abi(name, fn_name)[0]
+
+def encode_call(name: str, fn_name: str, *args) -> bytes:
+    """Calldata for a function call; argument-free calls are encoded once and cached"""
+    if not args:
+        return _static_calldata(name, fn_name)
+    selector, input_types, _ = _function_abi(name, fn_name)
+    return selector + encode(list(input_types), list(args))
+
+def decode_result(name: str, fn_name: str, data: bytes) -> tuple:
+    """Decode the return data of a function call"""
+    return decode(list(_function_abi(name, fn_name)[2]), data)
+
+def call_view(w3: Web3, name: str, fn_name: str, *args, block_identifier="latest"):
+    """eth_call a view function with cached calldata, skipping contract-object dispatch.
+
+    Single-value results are unwrapped; multi-value results are returned as a tuple.
+    """
+    data = w3.eth.call({"to": address_of(name), "data": encode_call(name, fn_name, *args)}, block_identifier)
+    result = decode_result(name, fn_name, data)
+    return result[0] if len(result) == 1 else result
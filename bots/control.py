@@ -0,0 +1,309 @@
+"""
+Control plane: kill switch, per-bot pause and hot-reloaded thresholds, applied without waiting for a loop
+
+Every bot process runs a ControlPlane thread that watches KILL_SWITCH_FILE and
+CONTROL_FILE with inotify (stat polling every CONTROL_POLL_INTERVAL seconds
+where inotify is unavailable) and reacts to SIGTERM/SIGINT (stop) and SIGHUP
+(reload). Signal handlers only write to a pipe the thread selects on, so
+nothing runs inside the handler itself. On any change the callbacks given to
+on_change() run on that thread; the bots use them to interrupt their
+ChainWatcher.wait() or sleep, so a stop or a resume takes effect at once.
+
+CONTROL_FILE is a JSON document shared by all bot processes:
+    {"paused": ["retailer_bot_1"], "settings": {"ARB_MIN_PROFIT": "2e18"}}
+Only the names in TUNABLES can be overridden; bots read them with get() at
+every use, so a new value applies from their next step.
+
+Usage:
+    python control.py status
+    python control.py pause retailer_bot_1      # or "all"
+    python control.py resume retailer_bot_1
+    python control.py set ARB_MIN_PROFIT 2e18
+    python control.py unset ARB_MIN_PROFIT
+    python control.py stop                      # same as ./stop_ecosystem.sh's kill switch
+"""
+import argparse
+import ctypes
+import json
+import os
+import select
+import signal
+import struct
+import threading
+from decimal import Decimal
+import config
+from config import KILL_SWITCH_FILE, CONTROL_FILE, CONTROL_POLL_INTERVAL
+from utils import log_message, check_kill_switch
+
+# Settings that can be changed at runtime, with the type their values are parsed to
+TUNABLES = {
+    "ARB_MIN_PROFIT": int,
+    "ARB_MAX_TRADE": int,
+    "ARB_DEADLINE": int,
+    "RETAIL_MIN_TRADE": int,
+    "RETAIL_MAX_TRADE": int,
+    "RETAIL_TRADE_INTERVAL": float,
+    "ORACLE_UPDATE_INTERVAL": float,
+    "ORACLE_DEVIATION_BPS": float,
+    "ORACLE_HEARTBEAT": float
+}
+
+BOTS = ("oracle_bot", "retailer_bot_1", "retailer_bot_2", "profit_bot_1", "profit_bot_2")
+
+# inotify(7) event bits: file written and closed, renamed into the directory, created, deleted
+IN_CLOSE_WRITE, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x8, 0x80, 0x100, 0x200
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+def parse_setting(name: str, value):
+    """Parse a tunable value; integers accept exponent notation such as 2e18"""
+    if name not in TUNABLES:
+        raise ValueError(f"{name} is not a tunable setting ({', '.join(TUNABLES)})")
+    try:
+        if TUNABLES[name] is int:
+            return int(Decimal(str(value)))
+        return float(value)
+    except (ArithmeticError, ValueError):
+        raise ValueError(f"invalid value {value!r} for {name}") from None
+
+def read_control_file(path: str = CONTROL_FILE) -> dict:
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        state = {}
+    return {"paused": list(state.get("paused", [])), "settings": dict(state.get("settings", {}))}
+
+def write_control_file(state: dict, path: str = CONTROL_FILE):
+    """Replace the file atomically, so a watcher never reads it half written"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _inotify(directory: str):
+    """inotify descriptor watching directory, or None where inotify is unavailable"""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+def _changed_names(fd: int) -> set:
+    names = set()
+    while True:
+        try:
+            data = os.read(fd, 65536)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            names.add(data[offset:offset + length].rstrip(b"\0").decode(errors="replace"))
+            offset += length
+
+def _file_state(path: str):
+    try:
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
+
+class ControlPlane:
+    """Kill switch, pause flags and setting overrides of one process, updated by a watcher thread"""
+
+    def __init__(self, kill_switch_file: str = KILL_SWITCH_FILE, control_file: str = CONTROL_FILE,
+                 poll_interval: float = CONTROL_POLL_INTERVAL):
+        self.kill_switch_file = kill_switch_file
+        self.control_file = control_file
+        self.poll_interval = poll_interval
+        # Incremented on every reload, so a bot can tell its settings or pause flag may have changed
+        self.version = 0
+        self._paused = frozenset()
+        self._settings = {}
+        self._stopped = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wake_r = self._wake_w = None
+        self._inotify_fd = None
+        self._file_states = None
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    def start(self) -> "ControlPlane":
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_w, False)
+            # Watch before the first read, so no change in between is missed
+            directory = os.path.dirname(os.path.abspath(self.control_file))
+            if os.path.dirname(os.path.abspath(self.kill_switch_file)) == directory:
+                self._inotify_fd = _inotify(directory)
+            self._file_states = self._stat_files()
+            self._reload()
+            # Handlers can only be installed from the main thread
+            if threading.current_thread() is threading.main_thread():
+                for signum, command in ((signal.SIGTERM, b"s"), (signal.SIGINT, b"s"), (signal.SIGHUP, b"r")):
+                    signal.signal(signum, lambda *_, command=command: self._signal(command))
+            self._thread = threading.Thread(target=self._run, name="control-plane", daemon=True)
+            self._thread.start()
+        return self
+
+    def on_change(self, callback):
+        """Call callback() on the control thread after every stop, pause, resume or setting change"""
+        self._callbacks.append(callback)
+        return self
+
+    def wait(self, timeout: float = None) -> bool:
+        """Sleep until timeout or a stop; True if stopped"""
+        return self._stopped.wait(timeout)
+
+    def paused(self, bot: str) -> bool:
+        paused = self._paused
+        return bot in paused or "all" in paused
+
+    def get(self, name: str):
+        """Current value of a tunable setting: the override if one is set, else config"""
+        return self._settings.get(name, getattr(config, name))
+
+    def override(self, name: str, value):
+        """Set a tunable for this process only, until the control file next sets or clears it"""
+        self._settings = {**self._settings, name: parse_setting(name, value)}
+        self.version += 1
+
+    def stop(self, reason: str):
+        if not self._stopped.is_set():
+            log_message(f"Stopping: {reason}")
+            self._stopped.set()
+            self._notify()
+
+    def _signal(self, command: bytes):
+        try:
+            os.write(self._wake_w, command)
+        except BlockingIOError:
+            pass
+
+    def _notify(self):
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log_message(f"Control callback failed: {e}", "ERROR")
+
+    def _reload(self) -> bool:
+        """Re-read both files; True if anything the bots act on changed"""
+        if check_kill_switch(self.kill_switch_file):
+            # stop() already ran the callbacks
+            self.stop(f"kill switch {self.kill_switch_file} set")
+            return False
+        try:
+            state = read_control_file(self.control_file)
+            settings = {}
+            for name, value in state["settings"].items():
+                settings[name] = parse_setting(name, value)
+        except (ValueError, TypeError) as e:
+            log_message(f"Ignoring invalid control file {self.control_file}: {e}", "ERROR")
+            return False
+        paused = frozenset(state["paused"])
+        if paused == self._paused and settings == self._settings:
+            return False
+        for bot in sorted(paused - self._paused):
+            log_message(f"Paused {bot}")
+        for bot in sorted(self._paused - paused):
+            log_message(f"Resumed {bot}")
+        for name in sorted(set(settings) | set(self._settings)):
+            if settings.get(name) != self._settings.get(name):
+                log_message(f"{name} set to {settings.get(name, getattr(config, name))}")
+        self._paused, self._settings = paused, settings
+        self.version += 1
+        return True
+
+    def _stat_files(self) -> tuple:
+        return _file_state(self.kill_switch_file), _file_state(self.control_file)
+
+    def _changed(self, ready: list) -> bool:
+        if self._inotify_fd is not None:
+            watched = {os.path.basename(self.kill_switch_file), os.path.basename(self.control_file)}
+            return self._inotify_fd in ready and bool(_changed_names(self._inotify_fd) & watched)
+        states = self._stat_files()
+        changed, self._file_states = states != self._file_states, states
+        return changed
+
+    def _run(self):
+        fds = [self._wake_r] + ([self._inotify_fd] if self._inotify_fd is not None else [])
+        timeout = None if self._inotify_fd is not None else self.poll_interval
+        while not self._stopped.is_set():
+            try:
+                ready, _, _ = select.select(fds, [], [], timeout)
+                reload = False
+                if self._wake_r in ready:
+                    commands = os.read(self._wake_r, 64)
+                    if b"s" in commands:
+                        self.stop("signal received")
+                        break
+                    reload = True
+                # Also drains the inotify events
+                reload = self._changed(ready) or reload
+                if reload and self._reload():
+                    self._notify()
+            except Exception as e:
+                log_message(f"Error in control plane: {e}", "ERROR")
+                self._stopped.wait(self.poll_interval)
+
+# Process-wide instance; bots call CONTROL.start() in main()
+CONTROL = ControlPlane()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status", help="show pause flags and setting overrides")
+    commands.add_parser("stop", help="set the kill switch")
+    for command in ("pause", "resume"):
+        commands.add_parser(command, help=f"{command} a bot").add_argument("bot", choices=BOTS + ("all",))
+    set_parser = commands.add_parser("set", help="override a tunable setting")
+    set_parser.add_argument("name", choices=TUNABLES)
+    set_parser.add_argument("value")
+    commands.add_parser("unset", help="drop an override").add_argument("name", choices=TUNABLES)
+    args = parser.parse_args()
+
+    if args.command == "stop":
+        with open(KILL_SWITCH_FILE, "w") as f:
+            f.write("1\n")
+        print(f"Kill switch set in {KILL_SWITCH_FILE}")
+        return
+
+    state = read_control_file()
+    if args.command == "pause" and args.bot not in state["paused"]:
+        state["paused"].append(args.bot)
+    elif args.command == "resume":
+        # Resuming all clears every individual pause too
+        state["paused"] = [bot for bot in state["paused"] if bot != args.bot and args.bot != "all"]
+    elif args.command == "set":
+        # Stored as given, so large wei amounts keep their exact value
+        parse_setting(args.name, args.value)
+        state["settings"][args.name] = args.value
+    elif args.command == "unset":
+        state["settings"].pop(args.name, None)
+    if args.command != "status":
+        write_control_file(state)
+
+    print(f"kill switch: {'set' if check_kill_switch() else 'clear'}")
+    print(f"paused:      {', '.join(state['paused']) or '-'}")
+    for name in TUNABLES:
+        override = state["settings"].get(name)
+        print(f"{name:<24} {getattr(config, name) if override is None else override}"
+              f"{'' if override is None else ' (override)'}")
+
+if __name__ == "__main__":
+    main()
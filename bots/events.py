@@ -0,0 +1,166 @@
+"""
+Block and contract event subscriptions that wake the bots when on-chain state changes
+
+A background thread subscribes to new heads and to the logs of the watched
+contracts over a websocket (eth_subscribe), falling back to eth_newFilter /
+eth_newBlockFilter polling over HTTP when no websocket is available. Bots call
+ChainWatcher.wait() instead of sleeping and skip their loop body when none of
+the events they care about happened since the last wakeup.
+"""
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from web3 import Web3
+from config import WS_URL, EVENT_POLL_INTERVAL
+from contracts import address_of, event_topics
+from utils import log_message
+
+# Events that move pool prices
+SWAP_EVENTS = frozenset({"SwapDUSDForWETH", "SwapWETHForDUSD", "SwapDUSCForWETH", "SwapWETHForDUSC"})
+DUSD_POOL_EVENTS = frozenset({"SwapDUSDForWETH", "SwapWETHForDUSD"})
+DUSC_POOL_EVENTS = frozenset({"SwapDUSCForWETH", "SwapWETHForDUSC"})
+# Events that change the health of lending positions
+LENDING_EVENTS = frozenset({"DepositCollateral", "WithdrawCollateral", "Borrow", "Repay", "Liquidate"})
+ORACLE_EVENTS = frozenset({"PriceUpdated"})
+
+@dataclass
+class Changes:
+    """What happened on chain between two wakeups"""
+    block_number: int = 0
+    new_blocks: int = 0
+    events: set = field(default_factory=set)  # names of the watched events seen
+
+    def any_of(self, events) -> bool:
+        return not self.events.isdisjoint(events)
+
+class ChainWatcher:
+    """Collects new blocks and watched contract events for a single consumer.
+
+    contracts are registry names whose events are subscribed to. The
+    websocket is tried first; any failure on it switches the watcher to filter
+    polling over the HTTP provider for the rest of the run.
+    """
+
+    def __init__(self, w3: Web3, contracts: tuple = ("dex", "oracle", "lending"), ws_url: str = WS_URL,
+                 poll_interval: float = EVENT_POLL_INTERVAL):
+        self.w3 = w3
+        self.ws_url = ws_url
+        self.poll_interval = poll_interval
+        self.addresses = [address_of(name) for name in contracts]
+        self.topics = {}
+        for name in contracts:
+            self.topics.update(event_topics(name))
+        self._pending = Changes()
+        self._changed = threading.Condition()
+        self._stopped = threading.Event()
+        self._interrupted = False
+        self._block_callbacks = []
+        self._thread = None
+
+    def start(self) -> "ChainWatcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="chain-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        with self._changed:
+            self._changed.notify_all()
+
+    def on_block(self, callback):
+        """Call callback(block_number) on the watcher thread for every new block"""
+        self._block_callbacks.append(callback)
+        return self
+
+    def interrupt(self):
+        """Make the current or next wait() return right away, e.g. on a control plane change"""
+        with self._changed:
+            self._interrupted = True
+            self._changed.notify_all()
+
+    def wait(self, timeout: float = None):
+        """Block until a new block or watched event arrives, then return and reset the accumulated Changes.
+
+        Returns None if nothing happened within timeout or the wait was interrupted.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while not self._pending.new_blocks and not self._pending.events:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if self._interrupted:
+                    self._interrupted = False
+                    return None
+                if self._stopped.is_set() or (remaining is not None and remaining <= 0):
+                    return None
+                self._changed.wait(remaining)
+            changes, self._pending = self._pending, Changes(block_number=self._pending.block_number)
+            return changes
+
+    def _notify(self, block_number: int, event: str = None):
+        with self._changed:
+            new_block = block_number > self._pending.block_number
+            if new_block:
+                self._pending.new_blocks += 1
+                self._pending.block_number = block_number
+            if event is not None:
+                self._pending.events.add(event)
+            self._changed.notify_all()
+        if new_block:
+            for callback in self._block_callbacks:
+                callback(block_number)
+
+    def _log_filter(self) -> dict:
+        return {"address": self.addresses, "topics": [list(self.topics)]}
+
+    def _run(self):
+        try:
+            self._run_websocket()
+        except Exception as e:
+            if not self._stopped.is_set():
+                log_message(f"Websocket subscription unavailable ({e}), polling filters every {self.poll_interval}s", "WARNING")
+                self._run_polling()
+
+    def _run_websocket(self):
+        """eth_subscribe to newHeads and to the watched contracts' logs"""
+        from websockets.sync.client import connect
+
+        with connect(self.ws_url, open_timeout=5) as ws:
+            ws.send(json.dumps({"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]}))
+            ws.send(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "eth_subscribe", "params": ["logs", self._log_filter()]}))
+            subscriptions = {}
+            while not self._stopped.is_set():
+                try:
+                    message = json.loads(ws.recv(timeout=1))
+                except TimeoutError:
+                    continue
+                if "id" in message:
+                    if "error" in message:
+                        raise RuntimeError(message["error"].get("message", message["error"]))
+                    subscriptions[message["result"]] = message["id"]
+                    continue
+                params = message["params"]
+                result = params["result"]
+                if subscriptions.get(params["subscription"]) == 1:
+                    self._notify(int(result["number"], 16))
+                else:
+                    self._notify(int(result["blockNumber"], 16), self.topics.get(result["topics"][0]))
+
+    def _run_polling(self):
+        """eth_getFilterChanges on a block filter and a log filter"""
+        filters = None
+        while not self._stopped.is_set():
+            try:
+                if filters is None:
+                    filters = self.w3.eth.filter("latest"), self.w3.eth.filter(self._log_filter())
+                block_filter, log_filter = filters
+                for entry in log_filter.get_new_entries():
+                    self._notify(entry["blockNumber"], self.topics.get("0x" + bytes(entry["topics"][0]).hex()))
+                if block_filter.get_new_entries():
+                    self._notify(self.w3.eth.block_number)
+            except Exception as e:
+                # Filters expire on the node after inactivity or a restart
+                log_message(f"Event filter polling failed ({e}), reinstalling filters", "WARNING")
+                filters = None
+            self._stopped.wait(self.poll_interval)
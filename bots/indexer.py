@@ -0,0 +1,248 @@
+"""
+Incremental event indexer - SimpleDEX, LendingProtocol and MinterRedeemer logs into SQLite
+
+Logs are fetched with eth_getLogs over block ranges whose size adapts to the
+node's responses, decoded against the Foundry ABIs and appended to the events
+table in one transaction per range together with the block cursor, so an
+interrupted run resumes exactly where it stopped. The hashes of recently
+indexed blocks are kept to detect reorgs: when the chain no longer contains
+them, events above the fork point are deleted and re-indexed.
+
+Usage:
+    python indexer.py                 # catch up, then follow new blocks until the kill switch
+    python indexer.py --once          # catch up to the current head and exit
+    python indexer.py --from-block N  # start a fresh database at block N
+"""
+import argparse
+import json
+import sqlite3
+import time
+from web3 import Web3
+from config import INDEX_DB, INDEX_CHUNK_SIZE, EVENT_POLL_INTERVAL
+from transport import connect_rpc
+from contracts import address_of, decode_log, event_topics
+from utils import log_message
+from control import CONTROL
+from metrics import instrument
+
+# Contracts whose events are indexed
+INDEXED_CONTRACTS = ("dex", "lending", "minter")
+
+# Block hashes kept for reorg detection, in blocks behind the cursor
+REORG_DEPTH = 128
+
+# Bounds of the adaptive eth_getLogs range
+MIN_CHUNK_SIZE = 16
+MAX_CHUNK_SIZE = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    block_number INTEGER NOT NULL,
+    log_index INTEGER NOT NULL,
+    block_hash TEXT NOT NULL,
+    tx_hash TEXT NOT NULL,
+    contract TEXT NOT NULL,
+    event TEXT NOT NULL,
+    user TEXT,
+    args TEXT NOT NULL,
+    PRIMARY KEY (block_number, log_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_event ON events (event, block_number);
+CREATE INDEX IF NOT EXISTS events_user ON events (user, block_number);
+CREATE TABLE IF NOT EXISTS blocks (
+    number INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cursor (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    block_number INTEGER NOT NULL
+);
+"""
+
+def connect(path: str = INDEX_DB) -> sqlite3.Connection:
+    """Open (and create if needed) the event store"""
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def query_events(conn: sqlite3.Connection, event: str = None, user: str = None,
+                 from_block: int = 0, to_block: int = None) -> list:
+    """Indexed events as dicts, filtered by event name and/or user, in chain order"""
+    sql = "SELECT block_number, log_index, tx_hash, contract, event, user, args FROM events WHERE block_number >= ?"
+    params = [from_block]
+    if to_block is not None:
+        sql += " AND block_number <= ?"
+        params.append(to_block)
+    if event is not None:
+        sql += " AND event = ?"
+        params.append(event)
+    if user is not None:
+        sql += " AND user = ?"
+        params.append(Web3.to_checksum_address(user))
+    sql += " ORDER BY block_number, log_index"
+    return [
+        {"block_number": block_number, "log_index": log_index, "tx_hash": tx_hash, "contract": contract,
+         "event": name, "user": owner, "args": json.loads(args)}
+        for block_number, log_index, tx_hash, contract, name, owner, args in conn.execute(sql, params)
+    ]
+
+def _rpc(w3: Web3, method: str, params: list):
+    """JSON-RPC call through web3's middleware, so it is measured, but without the method's result formatters"""
+    return w3.manager.request_blocking(method, params)
+
+def _json_value(value):
+    # uint256 amounts do not fit SQLite integers and JSON readers lose precision on large numbers
+    return str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+
+class Indexer:
+    """Pulls watched contract logs into the events table"""
+
+    def __init__(self, w3: Web3, conn: sqlite3.Connection, chunk_size: int = INDEX_CHUNK_SIZE):
+        self.w3 = w3
+        self.conn = conn
+        self.chunk_size = chunk_size
+        # Largest range the node has not rejected yet
+        self.chunk_ceiling = MAX_CHUNK_SIZE
+        self.contracts = {address_of(name).lower(): name for name in INDEXED_CONTRACTS}
+        self.topics = [topic for name in INDEXED_CONTRACTS for topic in event_topics(name)]
+
+    @property
+    def cursor(self):
+        """Last fully indexed block, or None for an empty store"""
+        row = self.conn.execute("SELECT block_number FROM cursor WHERE id = 0").fetchone()
+        return row[0] if row else None
+
+    def _block_hash(self, number: int):
+        block = _rpc(self.w3, "eth_getBlockByNumber", [hex(number), False])
+        return block["hash"] if block else None
+
+    def _head(self) -> int:
+        return int(_rpc(self.w3, "eth_blockNumber", []), 16)
+
+    def _get_logs(self, from_block: int, to_block: int) -> list:
+        return _rpc(self.w3, "eth_getLogs", [{
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "address": [Web3.to_checksum_address(address) for address in self.contracts],
+            "topics": [self.topics]
+        }])
+
+    def _rows(self, logs: list) -> list:
+        rows = []
+        for log in logs:
+            if log.get("removed"):
+                continue
+            contract = self.contracts[log["address"].lower()]
+            event, args = decode_log(contract, log["topics"], bytes.fromhex(log["data"][2:]))
+            user = Web3.to_checksum_address(args["user"]) if "user" in args else None
+            rows.append((
+                int(log["blockNumber"], 16), int(log["logIndex"], 16), log["blockHash"], log["transactionHash"],
+                contract, event, user, json.dumps({key: _json_value(value) for key, value in args.items()})
+            ))
+        return rows
+
+    def _commit_range(self, to_block: int, to_block_hash: str, rows: list):
+        """Store one range's events, the hashes needed for reorg checks and the new cursor atomically"""
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            hashes = {row[0]: row[2] for row in rows}
+            hashes[to_block] = to_block_hash
+            self.conn.executemany("INSERT OR REPLACE INTO blocks VALUES (?, ?)", hashes.items())
+            self.conn.execute("DELETE FROM blocks WHERE number < ?", (to_block - REORG_DEPTH,))
+            self.conn.execute("INSERT OR REPLACE INTO cursor VALUES (0, ?)", (to_block,))
+
+    def check_reorg(self) -> bool:
+        """Roll back to the last block whose stored hash is still on chain; returns True if it did"""
+        cursor = self.cursor
+        if cursor is None:
+            return False
+        stored = self.conn.execute("SELECT hash FROM blocks WHERE number = ?", (cursor,)).fetchone()
+        if stored is None or self._block_hash(cursor) == stored[0]:
+            return False
+
+        fork_point = None
+        for number, block_hash in self.conn.execute("SELECT number, hash FROM blocks ORDER BY number DESC").fetchall():
+            if self._block_hash(number) == block_hash:
+                fork_point = number
+                break
+        if fork_point is None:
+            # Deeper than the kept hashes: re-index the whole window
+            fork_point = max(cursor - REORG_DEPTH, -1)
+
+        with self.conn:
+            self.conn.execute("DELETE FROM events WHERE block_number > ?", (fork_point,))
+            self.conn.execute("DELETE FROM blocks WHERE number > ?", (fork_point,))
+            self.conn.execute("INSERT OR REPLACE INTO cursor VALUES (0, ?)", (fork_point,))
+        log_message(f"Reorg detected at block {cursor}, re-indexing from block {fork_point + 1}", "WARNING")
+        return True
+
+    def sync(self, start_block: int = 0) -> int:
+        """Index everything up to the current head; returns the number of events stored"""
+        self.check_reorg()
+        cursor = self.cursor
+        from_block = start_block if cursor is None else cursor + 1
+        head = self._head()
+        stored = 0
+        while from_block <= head:
+            to_block = min(from_block + self.chunk_size - 1, head)
+            try:
+                logs = self._get_logs(from_block, to_block)
+            except ValueError as e:
+                if self.chunk_size <= MIN_CHUNK_SIZE:
+                    raise
+                # Range too large for the node (result size or timeout limits)
+                self.chunk_size = max(self.chunk_size // 2, MIN_CHUNK_SIZE)
+                self.chunk_ceiling = self.chunk_size
+                log_message(f"eth_getLogs {from_block}-{to_block} failed ({e}), retrying with {self.chunk_size} blocks", "WARNING")
+                continue
+
+            to_block_hash = self._block_hash(to_block)
+            if to_block_hash is None:
+                # The chain got shorter under us
+                break
+            rows = self._rows(logs)
+            self._commit_range(to_block, to_block_hash, rows)
+            stored += len(rows)
+            from_block = to_block + 1
+            self.chunk_size = min(self.chunk_size * 2, self.chunk_ceiling)
+        return stored
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--db", default=INDEX_DB, help="SQLite database path")
+    parser.add_argument("--once", action="store_true", help="catch up to the current head and exit")
+    parser.add_argument("--from-block", type=int, default=0, help="first block to index in a fresh database")
+    args = parser.parse_args()
+
+    w3 = instrument(connect_rpc(), "indexer")
+    if not w3.is_connected():
+        log_message("Failed to connect to RPC", "ERROR")
+        return
+
+    indexer = Indexer(w3, connect(args.db))
+    started = time.monotonic()
+    start_cursor = indexer.cursor
+    stored = indexer.sync(args.from_block)
+    blocks = (indexer.cursor or 0) - (start_cursor if start_cursor is not None else args.from_block - 1)
+    elapsed = time.monotonic() - started
+    log_message(f"Indexed {blocks} blocks ({stored} events) in {elapsed:.1f}s, "
+                f"{blocks / elapsed * 60 if elapsed else 0:.0f} blocks/min, cursor at {indexer.cursor}")
+    if args.once:
+        return
+
+    CONTROL.start()
+    while not CONTROL.stopped:
+        try:
+            stored = indexer.sync(args.from_block)
+            if stored:
+                log_message(f"Indexed {stored} events up to block {indexer.cursor}")
+        except Exception as e:
+            log_message(f"Error in indexer loop: {e}", "ERROR")
+        CONTROL.wait(EVENT_POLL_INTERVAL)
+
+    log_message("Indexer stopped")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Off-chain token balance ledger kept current from ERC20 Transfer logs
+
+Each tracked wallet's mWETH, dUSD and dUSC balances are seeded with one
+balanceOf per (wallet, token), all in a single Multicall eth_call, and then
+moved by the Transfer logs of the three tokens, fetched with one eth_getLogs
+per new block range. Every LEDGER_RECONCILE_BLOCKS blocks the balances are
+read again the same way and any drift is logged and corrected. Reading a
+balance is then a dict lookup, and every change is kept in a per-wallet
+history.
+"""
+import threading
+from collections import deque
+from web3 import Web3
+from config import INDEX_CHUNK_SIZE, LEDGER_RECONCILE_BLOCKS, LEDGER_HISTORY
+from contracts import TOKENS, address_of, decode_log, encode_call, decode_result, event_topics, get_contract
+from utils import log_message
+
+# Token registry name -> symbol
+SYMBOLS = {name: symbol for symbol, name in TOKENS.items()}
+
+def _transfer_topic() -> str:
+    # All three tokens are OpenZeppelin ERC20s with the same Transfer signature
+    return next(topic for topic, event in event_topics("mweth").items() if event == "Transfer")
+
+class BalanceLedger:
+    """Token balances of a set of wallets, as of block_number"""
+
+    def __init__(self, wallets: list = (), reconcile_blocks: int = LEDGER_RECONCILE_BLOCKS, history: int = LEDGER_HISTORY):
+        self.reconcile_blocks = reconcile_blocks
+        self.history_size = history
+        self.block_number = -1  # last block whose logs were applied
+        self.reconciled = -1  # last block the balances were read on chain
+        self.corrections = 0  # balances found wrong by reconciliation
+        self._balances = {}  # wallet -> {symbol: balance}
+        self._history = {}  # wallet -> deque of (block number, symbol, balance)
+        self._wallets = []
+        self._addresses = {address_of(name).lower(): name for name in TOKENS.values()}
+        self._lock = threading.RLock()
+        self.track(wallets)
+
+    def track(self, wallets: list):
+        """Add wallets; they are seeded on the next sync"""
+        with self._lock:
+            for wallet in wallets:
+                wallet = Web3.to_checksum_address(wallet)
+                if wallet not in self._wallets:
+                    self._wallets.append(wallet)
+                    self._history[wallet] = deque(maxlen=self.history_size)
+
+    def balance(self, wallet: str, symbol: str) -> int:
+        with self._lock:
+            return self._balances[Web3.to_checksum_address(wallet)][symbol]
+
+    def balances(self, wallet: str) -> dict:
+        """{"mWETH": int, "dUSD": int, "dUSC": int}, as in Snapshot.balances"""
+        with self._lock:
+            return dict(self._balances[Web3.to_checksum_address(wallet)])
+
+    def history(self, wallet: str) -> list:
+        """(block number, symbol, new balance) of the wallet's last LEDGER_HISTORY balance changes, oldest first"""
+        with self._lock:
+            return list(self._history[Web3.to_checksum_address(wallet)])
+
+    def _set(self, wallet: str, symbol: str, balance: int, block_number: int):
+        balances = self._balances.setdefault(wallet, {})
+        if balances.get(symbol) != balance:
+            balances[symbol] = balance
+            self._history[wallet].append((block_number, symbol, balance))
+
+    def _plan(self, to_block: int) -> tuple:
+        """(first block whose logs are needed or None, wallets to read on chain at to_block)"""
+        if to_block < self.block_number:
+            # The chain got shorter (evm_revert on anvil): every balance is read again
+            self._balances = {}
+            self.block_number = self.reconciled = -1
+        from_block = self.block_number + 1 if self._balances and to_block > self.block_number else None
+        if self.reconciled < 0 or to_block - self.reconciled >= self.reconcile_blocks:
+            return from_block, list(self._wallets)
+        return from_block, [wallet for wallet in self._wallets if wallet not in self._balances]
+
+    def _log_filter(self, from_block: int, to_block: int) -> dict:
+        return {"fromBlock": from_block, "toBlock": to_block, "address": [address_of(name) for name in TOKENS.values()],
+                "topics": [_transfer_topic()]}
+
+    def _apply(self, logs: list):
+        """Apply Transfer logs in chain order to the seeded wallets they touch"""
+        for log in logs:
+            name = self._addresses.get(log["address"].lower())
+            if name is None:
+                continue
+            _, args = decode_log(name, ["0x" + bytes(topic).hex() for topic in log["topics"]], bytes(log["data"]))
+            symbol = SYMBOLS[name]
+            for wallet, sign in ((args["from"], -1), (args["to"], 1)):
+                # Decoded logs carry lowercase addresses
+                wallet = Web3.to_checksum_address(wallet)
+                if wallet in self._balances:
+                    self._set(wallet, symbol, self._balances[wallet][symbol] + sign * args["value"], log["blockNumber"])
+
+    def _read_calls(self, wallets: list) -> list:
+        return [(address_of(name), False, encode_call(name, "balanceOf", wallet)) for wallet in wallets for name in TOKENS.values()]
+
+    def _seed(self, wallets: list, to_block: int, results: list):
+        """Store balances read at to_block, logging the ones the logs got wrong"""
+        results = iter(results)
+        for wallet in wallets:
+            for symbol, name in TOKENS.items():
+                _, return_data = next(results)
+                balance = decode_result(name, "balanceOf", return_data)[0]
+                known = self._balances.get(wallet, {}).get(symbol)
+                if known is not None and known != balance:
+                    self.corrections += 1
+                    log_message(f"Balance ledger drift for {wallet}: {symbol} {known} in the ledger, {balance} on chain at block {to_block}", "WARNING")
+                self._set(wallet, symbol, balance, to_block)
+        if len(wallets) == len(self._wallets):
+            self.reconciled = to_block
+
+    def sync(self, w3: Web3, to_block: int, chunk_size: int = INDEX_CHUNK_SIZE):
+        """Bring every tracked wallet's balances to to_block"""
+        with self._lock:
+            from_block, seed = self._plan(to_block)
+            while from_block is not None and from_block <= to_block:
+                chunk_end = min(from_block + chunk_size - 1, to_block)
+                self._apply(w3.eth.get_logs(self._log_filter(from_block, chunk_end)))
+                from_block = chunk_end + 1
+            if seed:
+                _, _, results = get_contract(w3, "multicall").functions.blockAndAggregate(
+                    self._read_calls(seed)
+                ).call(block_identifier=to_block)
+                self._seed(seed, to_block, results)
+            self.block_number = to_block
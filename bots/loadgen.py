@@ -0,0 +1,522 @@
+"""
+Synthetic retail order flow against SimpleDEX from thousands of funded wallets
+
+Wallets are derived from --seed and funded without a single transaction:
+anvil_setBalance gives them gas money, and their mWETH, dUSD and dUSC balances
+and unlimited SimpleDEX allowances are written straight into the token
+contracts' storage (totalSupply is left as it was). Swaps arrive on a Poisson
+schedule at --rate per second, or at the times recorded in a file
+(--arrivals replay:<csv>) rescaled to that rate and looped. Every arrival
+picks a pool and a wallet and trades like the retailer bots: it buys mWETH
+while the pool is below the oracle and sells it otherwise, for a size between
+RETAIL_MIN_TRADE and RETAIL_MAX_TRADE, quoted on the latest block's reserves.
+
+Signing is pure-Python ECDSA, so the flow is split over --processes worker
+processes. Each one sends from its own wallets with --threads threads and
+confirms everything with one eth_getBlockReceipts call per block. The report
+gives the achieved send and mining throughput, failure rates, the slippage of
+every mined swap against the quote it was sent on, and both pools' price
+paths (one row per block with --trace). Unless --keep is given, the chain
+is restored afterwards with evm_snapshot/evm_revert.
+
+Usage:
+    python loadgen.py --wallets 2000 --rate 300 --duration 60 --out load.json
+    python loadgen.py --arrivals replay:trades.csv --rate 500 --processes 8 --trace prices.csv
+    python loadgen.py --rpc-url http://localhost:8545   # ecosystem already deployed and configured in .env
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import numpy as np
+from web3 import Web3
+from web3._utils.method_formatters import receipt_formatter
+from transport import connect_rpc
+from utils import FeeOracle, MAX_UINT256
+from contracts import TOKENS, address_of, call_view, decode_events, encode_call
+from control import CONTROL
+from snapshot import snapshot, pool_price, Snapshot
+from ledger import BalanceLedger
+from quote import get_amount_out
+from prices import TIME_COLUMNS, parse_time, pick_column
+from bench_bots import deploy, free_port, git_revision, percentiles, rpc, start_anvil
+
+# OpenZeppelin ERC20 storage slots of _balances and _allowances
+BALANCES_SLOT = 0
+ALLOWANCES_SLOT = 1
+
+# Gas limit of every swap, the retailer bots' fallback limit
+SWAP_GAS = 200000
+
+# Pool -> side -> (SimpleDEX function, input token, output token, event, output argument)
+SWAPS = {
+    "dUSD/mWETH": {
+        "buy": ("swapDUSDForWETH", "dUSD", "mWETH", "SwapDUSDForWETH", "wethOut"),
+        "sell": ("swapWETHForDUSD", "mWETH", "dUSD", "SwapWETHForDUSD", "dusdOut")
+    },
+    "dUSC/mWETH": {
+        "buy": ("swapDUSCForWETH", "dUSC", "mWETH", "SwapDUSCForWETH", "wethOut"),
+        "sell": ("swapWETHForDUSC", "mWETH", "dUSC", "SwapWETHForDUSC", "duscOut")
+    }
+}
+
+# Pool -> Snapshot attribute holding its (stablecoin, mWETH) reserves
+RESERVES = {"dUSD/mWETH": "dusd_reserves", "dUSC/mWETH": "dusc_reserves"}
+
+# SimpleDEX events of the single-pool swaps, counted per block in the price path
+SWAP_EVENTS = {event for sides in SWAPS.values() for _, _, _, event, _ in sides.values()}
+
+def wallet_key(seed: int, index: int) -> bytes:
+    """Private key of load wallet index, the same for the same seed"""
+    return bytes(Web3.keccak(text=f"loadgen:{seed}:{index}"))
+
+def _word(value: int) -> str:
+    return "0x" + value.to_bytes(32, "big").hex()
+
+def _mapping_slot(key: str, slot: int) -> int:
+    """Storage slot of mapping[key] for a mapping declared at slot"""
+    return int.from_bytes(Web3.solidity_keccak(["uint256", "uint256"], [int(key, 16), slot]), "big")
+
+def fund(w3: Web3, addresses: list, eth: int, mweth: int, stable: int):
+    """Give every address eth wei, mweth mWETH wei, stable wei of each stablecoin and unlimited SimpleDEX allowances"""
+    dex = address_of("dex")
+    amounts = {"mWETH": mweth, "dUSD": stable, "dUSC": stable}
+    for address in addresses:
+        rpc(w3, "anvil_setBalance", [address, hex(eth)])
+        allowance_slot = _mapping_slot(address, ALLOWANCES_SLOT)
+        for symbol, name in TOKENS.items():
+            token = address_of(name)
+            rpc(w3, "anvil_setStorageAt", [token, hex(_mapping_slot(address, BALANCES_SLOT)), _word(amounts[symbol])])
+            rpc(w3, "anvil_setStorageAt", [token, hex(_mapping_slot(dex, allowance_slot)), _word(MAX_UINT256)])
+    for symbol, name in TOKENS.items():
+        if (call_view(w3, name, "balanceOf", addresses[0]) != amounts[symbol]
+                or call_view(w3, name, "allowance", addresses[0], dex) != MAX_UINT256):
+            raise RuntimeError(f"{symbol} does not keep balances and allowances in OpenZeppelin ERC20's slots")
+
+def poisson_arrivals(rate: float, duration: float, seed: int) -> np.ndarray:
+    """Arrival times in seconds of a Poisson process, sorted"""
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.uniform(0, duration, rng.poisson(rate * duration)))
+
+def replay_arrivals(path: str, rate: float, duration: float) -> np.ndarray:
+    """Times recorded in a CSV file, rescaled to rate arrivals per second and looped to fill duration"""
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        column = pick_column(reader.fieldnames or (), TIME_COLUMNS, path)
+        times = np.sort(np.array([parse_time(row[column]) for row in reader], dtype=np.float64))
+    if len(times) < 2 or times[-1] <= times[0]:
+        raise ValueError(f"{path} needs at least two distinct arrival times")
+    # Recorded (n - 1) gaps over the span become gaps averaging 1 / rate
+    offsets = (times - times[0]) * (len(times) - 1) / (times[-1] - times[0]) / rate
+    period = offsets[-1] + 1 / rate
+    repeats = int(np.ceil(duration / period))
+    arrivals = (offsets[None, :] + period * np.arange(repeats)[:, None]).ravel()
+    return arrivals[arrivals < duration]
+
+def schedule(spec: str, rate: float, duration: float, seed: int) -> np.ndarray:
+    """Arrival times for an --arrivals spec: "poisson" or "replay:<csv file>" """
+    if spec == "poisson":
+        return poisson_arrivals(rate, duration, seed)
+    if spec.startswith("replay:"):
+        return replay_arrivals(spec.split(":", 1)[1], rate, duration)
+    raise ValueError(f"unknown arrival schedule {spec!r}")
+
+def retail_order(snap: Snapshot, pool: str, balances: dict, amount_mweth: int):
+    """(side, amount in) of a retailer bot's trade in pool, None if the wallet can afford neither side"""
+    reserves = getattr(snap, RESERVES[pool])
+    price = pool_price(reserves)
+    amount_stable = amount_mweth * price // 10**18
+    stablecoin = SWAPS[pool]["buy"][1]
+    # Both sides in 18 decimals; the oracle has 8
+    below_oracle = price < snap.oracle_price * 10**10
+    if below_oracle and 0 < amount_stable <= balances[stablecoin]:
+        return "buy", amount_stable
+    if amount_mweth <= balances["mWETH"]:
+        return "sell", amount_mweth
+    if 0 < amount_stable <= balances[stablecoin]:
+        return "buy", amount_stable
+    return None
+
+def expected_out(snap: Snapshot, pool: str, side: str, amount_in: int) -> int:
+    stable, weth = getattr(snap, RESERVES[pool])
+    return get_amount_out(amount_in, stable, weth) if side == "buy" else get_amount_out(amount_in, weth, stable)
+
+class RetailWallet:
+    """A load wallet with its next nonce and token balances, both tracked locally"""
+
+    __slots__ = ("account", "nonce", "balances")
+
+    def __init__(self, account, nonce: int, balances: dict):
+        self.account = account
+        self.nonce = nonce
+        self.balances = balances
+
+@dataclass
+class Swap:
+    """A sent swap waiting for its receipt"""
+    wallet: RetailWallet
+    pool: str
+    side: str
+    amount_in: int
+    expected_out: int
+    sent_at: float
+
+class LoadWorker:
+    """Sends one share of the arrivals from its own wallets and confirms them block by block"""
+
+    def __init__(self, w3: Web3, wallets: list, pools: list, seed: int, threads: int, record_prices: bool = False,
+                 poll_interval: float = 0.05):
+        self.w3 = w3
+        self.wallets = wallets
+        self.pools = pools
+        self.seed = seed
+        self.threads = threads
+        self.record_prices = record_prices
+        self.poll_interval = poll_interval
+        self.dex = address_of("dex")
+        self.chain_id = w3.eth.chain_id
+        self.fees = FeeOracle(w3)
+        self.market = snapshot(w3, [])
+        self.scanned = self.market.block_number
+        self.start = None
+        self.sent = self.skipped = self.mined = self.reverted = 0
+        self.send_errors = Counter()
+        self.lag = []
+        self.confirmation = []
+        self.slippage = {f"{pool} {side}": [] for pool in pools for side in ("buy", "sell")}
+        self.price_path = []  # (block, timestamp, swaps, dUSD pool price, dUSC pool price, oracle price)
+        self.first_send = self.last_send = self.last_mined = None
+        self._in_flight = {}  # tx hash -> Swap
+        self._lock = threading.Lock()
+        self._sending = True
+
+    def _send(self, wallet: RetailWallet, pool: str, side: str, amount_in: int, quoted: int):
+        function, token_in, _, _, _ = SWAPS[pool][side]
+        tx = {"to": self.dex, "data": encode_call("dex", function, amount_in), "value": 0, "gas": SWAP_GAS,
+              "nonce": wallet.nonce, "chainId": self.chain_id, **self.fees.fees()}
+        signed = wallet.account.sign_transaction(tx)
+        now = time.time()
+        with self._lock:
+            # Registered before sending, so a receipt can never arrive for an unknown hash
+            self._in_flight[signed.hash] = Swap(wallet, pool, side, amount_in, quoted, now)
+            wallet.balances[token_in] -= amount_in
+        try:
+            self.w3.eth.send_raw_transaction(signed.rawTransaction)
+        except Exception as e:
+            with self._lock:
+                del self._in_flight[signed.hash]
+                wallet.balances[token_in] += amount_in
+                self.send_errors[str(e)[:120]] += 1
+            # Rejected before it reached the mempool; the node knows which nonce comes next
+            wallet.nonce = self.w3.eth.get_transaction_count(wallet.account.address, "pending")
+            return
+        wallet.nonce += 1
+        with self._lock:
+            self.sent += 1
+            self.first_send = self.first_send or now
+            self.last_send = now
+
+    def _send_loop(self, arrivals: np.ndarray, wallets: list, rng: random.Random):
+        """Send every arrival of this thread from its own wallets, so nonces need no lock"""
+        for at in arrivals:
+            delay = self.start + at - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.lag.append(max(-delay, 0.0))
+            pool = rng.choice(self.pools)
+            wallet = wallets[rng.randrange(len(wallets))]
+            amount_mweth = rng.randint(CONTROL.get("RETAIL_MIN_TRADE"), CONTROL.get("RETAIL_MAX_TRADE"))
+            market = self.market
+            with self._lock:
+                order = retail_order(market, pool, wallet.balances, amount_mweth)
+            if order is None:
+                with self._lock:
+                    self.skipped += 1
+                continue
+            side, amount_in = order
+            try:
+                self._send(wallet, pool, side, amount_in, expected_out(market, pool, side, amount_in))
+            except Exception as e:
+                with self._lock:
+                    self.send_errors[str(e)[:120]] += 1
+
+    def _resolve(self, receipts: list, seen_at: float):
+        with self._lock:
+            for receipt in receipts:
+                swap = self._in_flight.pop(receipt.transactionHash, None)
+                if swap is None:
+                    continue
+                _, token_in, token_out, event, output = SWAPS[swap.pool][swap.side]
+                self.last_mined = seen_at
+                self.confirmation.append(seen_at - swap.sent_at)
+                if receipt.status != 1:
+                    self.reverted += 1
+                    swap.wallet.balances[token_in] += swap.amount_in
+                    continue
+                self.mined += 1
+                received = next((args[output] for _, name, args in decode_events(receipt.logs) if name == event), 0)
+                swap.wallet.balances[token_out] += received
+                if swap.expected_out and received:
+                    self.slippage[f"{swap.pool} {swap.side}"].append((swap.expected_out - received) / swap.expected_out * 1e4)
+
+    def _track(self):
+        """Resolve receipts and refresh the market once per block until nothing is left in flight"""
+        while self._sending or self._in_flight:
+            head = self.w3.eth.block_number
+            for number in range(self.scanned + 1, head + 1):
+                raw = self.w3.manager.request_blocking("eth_getBlockReceipts", [hex(number)])
+                receipts = [receipt_formatter(receipt) for receipt in raw or ()]
+                self._resolve(receipts, time.time())
+                snap = snapshot(self.w3, [], block_identifier=number)
+                self.market = snap
+                self.fees.new_block(number)
+                if self.record_prices:
+                    swaps = sum(1 for receipt in receipts for _, name, _ in decode_events(receipt.logs) if name in SWAP_EVENTS)
+                    self.price_path.append((number, snap.timestamp, swaps, snap.dusd_pool_price, snap.dusc_pool_price,
+                                            snap.oracle_price_usd))
+            self.scanned = max(self.scanned, head)
+            time.sleep(self.poll_interval)
+
+    def run(self, arrivals: np.ndarray, start: float, drain: float) -> dict:
+        """Send arrivals (seconds after start, a Unix time), then wait up to drain seconds for the receipts"""
+        self.start = start
+        tracker = threading.Thread(target=self._track, name="loadgen-tracker", daemon=True)
+        tracker.start()
+        # No more senders than wallets, each with its own wallets and its share of the arrivals
+        count = min(self.threads, len(self.wallets))
+        senders = [threading.Thread(target=self._send_loop, name=f"loadgen-sender-{i}", daemon=True,
+                                    args=(arrivals[i::count], self.wallets[i::count], random.Random(f"{self.seed}:{i}")))
+                   for i in range(count)]
+        for sender in senders:
+            sender.start()
+        for sender in senders:
+            sender.join()
+        self._sending = False
+        tracker.join(drain)
+        return self.result()
+
+    def result(self) -> dict:
+        with self._lock:
+            return {
+                "sent": self.sent,
+                "skipped": self.skipped,
+                "mined": self.mined,
+                "reverted": self.reverted,
+                "unconfirmed": len(self._in_flight),
+                "send_errors": dict(self.send_errors),
+                "first_send": self.first_send,
+                "last_send": self.last_send,
+                "last_mined": self.last_mined,
+                "lag": self.lag,
+                "confirmation": self.confirmation,
+                "slippage": self.slippage,
+                "price_path": self.price_path
+            }
+
+def run_worker(index: int, args) -> dict:
+    """Fund, then on the parent's start time send this worker's share of the load (the worker side)"""
+    w3 = connect_rpc()
+    indices = range(index, args.wallets, args.processes)
+    accounts = [w3.eth.account.from_key(wallet_key(args.seed, i)) for i in indices]
+    addresses = [account.address for account in accounts]
+    fund(w3, addresses, args.fund_eth * 10**18, int(args.fund_mweth * 10**18), int(args.fund_stable * 10**18))
+    # Balances and nonces as the chain has them, in case the wallets were used before
+    ledger = BalanceLedger(addresses)
+    ledger.sync(w3, w3.eth.block_number)
+    wallets = [RetailWallet(account, w3.eth.get_transaction_count(account.address, "pending"), ledger.balances(account.address))
+               for account in accounts]
+    arrivals = schedule(args.arrivals, args.rate, args.duration, args.seed)[index::args.processes]
+    worker = LoadWorker(w3, wallets, args.pools, f"{args.seed}:{index}", args.threads, record_prices=index == 0)
+
+    print("ready", flush=True)
+    start = float(sys.stdin.readline())
+    return worker.run(arrivals, start, args.drain)
+
+def distribution(values: list) -> dict:
+    """Count, mean and percentiles of a sample, rounded to two decimals"""
+    if not values:
+        return {"count": 0}
+    values = np.array(values)
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    return {"count": len(values), "mean": round(float(values.mean()), 2), "min": round(float(values.min()), 2),
+            "p50": round(float(p50), 2), "p90": round(float(p90), 2), "p99": round(float(p99), 2),
+            "max": round(float(values.max()), 2)}
+
+def summarize(shares: list, start: float, scheduled: int) -> dict:
+    """One report from the results of every worker"""
+    total = {key: sum(share[key] for share in shares) for key in ("sent", "skipped", "mined", "reverted", "unconfirmed")}
+    send_errors = Counter()
+    for share in shares:
+        send_errors.update(share["send_errors"])
+    last_send = max((share["last_send"] for share in shares if share["last_send"]), default=None)
+    last_mined = max((share["last_mined"] for share in shares if share["last_mined"]), default=None)
+    attempted = total["sent"] + sum(send_errors.values())
+    lag = [value for share in shares for value in share["lag"]]
+    confirmation = [value for share in shares for value in share["confirmation"]]
+    path = shares[0]["price_path"]
+    report = {
+        "scheduled": scheduled,
+        **total,
+        "send_errors": sum(send_errors.values()),
+        "send_rate": round(total["sent"] / (last_send - start), 1) if last_send and last_send > start else 0.0,
+        "mined_rate": round(total["mined"] / (last_mined - start), 1) if last_mined and last_mined > start else 0.0,
+        "failure_rate": {
+            "rejected": round(sum(send_errors.values()) / attempted, 4) if attempted else 0.0,
+            "reverted": round(total["reverted"] / total["sent"], 4) if total["sent"] else 0.0,
+            "unconfirmed": round(total["unconfirmed"] / total["sent"], 4) if total["sent"] else 0.0
+        },
+        "errors": dict(send_errors.most_common(10)),
+        "schedule_lag_ms": percentiles(lag) if lag else None,
+        "confirmation_ms": percentiles(confirmation) if confirmation else None,
+        "slippage_bps": {key: distribution([value for share in shares for value in share["slippage"][key]])
+                         for key in shares[0]["slippage"]},
+        "blocks": len(path),
+        "price_path": {}
+    }
+    if path:
+        columns = np.array([row[3:] for row in path])
+        for column, name in enumerate(("dUSD/mWETH", "dUSC/mWETH", "oracle")):
+            values = columns[:, column]
+            report["price_path"][name] = {"start": round(float(values[0]), 2), "end": round(float(values[-1]), 2),
+                                          "min": round(float(values.min()), 2), "max": round(float(values.max()), 2)}
+    return report
+
+def write_trace(path: str, price_path: list):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["block", "timestamp", "swaps", "dusd_pool_price", "dusc_pool_price", "oracle_price"])
+        writer.writerows(price_path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=100, help="target swaps per second")
+    parser.add_argument("--duration", type=float, default=30, help="seconds of arrivals")
+    parser.add_argument("--arrivals", default="poisson", help='"poisson" or "replay:<csv with a time column>"')
+    parser.add_argument("--pools", nargs="+", choices=list(SWAPS), default=list(SWAPS))
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="worker processes, each signing on its own core")
+    parser.add_argument("--threads", type=int, default=8, help="sending threads per worker")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fund-eth", type=int, default=100, help="ETH per wallet for gas")
+    parser.add_argument("--fund-mweth", type=float, default=10, help="mWETH per wallet")
+    parser.add_argument("--fund-stable", type=float, default=30000, help="dUSD and dUSC per wallet")
+    parser.add_argument("--block-time", type=int, default=1, help="seconds between blocks during the run, 0 keeps the node's mining mode")
+    parser.add_argument("--block-gas-limit", type=int, default=300_000_000, help="room for the swaps of one block")
+    parser.add_argument("--drain", type=float, default=30, help="seconds to wait for receipts after the last arrival")
+    parser.add_argument("--rpc-url", help="use this node and the addresses in the environment instead of starting anvil")
+    parser.add_argument("--keep", action="store_true", help="keep the chain state instead of reverting it")
+    parser.add_argument("--out", help="write the report JSON here as well")
+    parser.add_argument("--trace", help="write the per-block price path CSV here")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.wallets < 1:
+        parser.error("--wallets must be at least 1")
+    # Every worker needs at least one wallet to send from
+    args.processes = max(1, min(args.processes, args.wallets))
+
+    if args.worker is not None:
+        print(json.dumps(run_worker(args.worker, args)))
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="loadgen_")
+    # Workers log to a scratch directory, not the running ecosystem's files
+    env = dict(os.environ, LOG_FILE=os.path.join(workdir, "ecosystem.log"), STATS_DIR=os.path.join(workdir, "stats"))
+    anvil = None
+    if args.rpc_url:
+        env["RPC_URL"] = args.rpc_url
+    else:
+        port = free_port()
+        env["RPC_URL"] = f"http://127.0.0.1:{port}"
+        env["WS_URL"] = f"ws://127.0.0.1:{port}"
+        anvil = start_anvil(port)
+    workers = []
+    try:
+        if anvil:
+            env.update(deploy(env["RPC_URL"]))
+        w3 = Web3(Web3.HTTPProvider(env["RPC_URL"]))
+        snapshot_id = None if args.keep else rpc(w3, "evm_snapshot", [])
+        automine = rpc(w3, "anvil_getAutomine", [])
+        gas_limit = w3.eth.get_block("latest")["gasLimit"]
+        scheduled = len(schedule(args.arrivals, args.rate, args.duration, args.seed))
+        try:
+            rpc(w3, "evm_setBlockGasLimit", [hex(args.block_gas_limit)])
+            if args.block_time:
+                rpc(w3, "evm_setIntervalMining", [args.block_time])
+            print(f"Funding {args.wallets} wallets in {args.processes} workers...", file=sys.stderr)
+            command = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:] + ["--processes", str(args.processes)]
+            for index in range(args.processes):
+                workers.append(subprocess.Popen(command + ["--worker", str(index)], env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True))
+            for worker in workers:
+                # Anything a worker logs before it is funded comes first
+                for line in worker.stdout:
+                    if line.strip() == "ready":
+                        break
+                else:
+                    raise RuntimeError(f"a worker exited with code {worker.wait()} before it was ready")
+            # Every worker starts its schedule at the same instant
+            start = time.time() + 0.5
+            for worker in workers:
+                worker.stdin.write(f"{start}\n")
+                worker.stdin.flush()
+            print(f"Sending {scheduled} swaps over {args.duration:g}s...", file=sys.stderr)
+            # Read concurrently, so no worker blocks on a full pipe while another one is read
+            outputs = [[] for _ in workers]
+            readers = [threading.Thread(target=output.extend, args=(worker.stdout,), daemon=True)
+                       for worker, output in zip(workers, outputs)]
+            for reader in readers:
+                reader.start()
+            shares = []
+            for worker, reader, output in zip(workers, readers, outputs):
+                reader.join()
+                if worker.wait() != 0 or not output:
+                    raise RuntimeError(f"a worker failed with exit code {worker.returncode}")
+                shares.append(json.loads(output[-1]))
+        finally:
+            for worker in workers:
+                if worker.poll() is None:
+                    worker.kill()
+            if args.block_time and automine:
+                rpc(w3, "evm_setIntervalMining", [0])
+                rpc(w3, "evm_setAutomine", [True])
+            rpc(w3, "evm_setBlockGasLimit", [hex(gas_limit)])
+            if snapshot_id is not None:
+                rpc(w3, "evm_revert", [snapshot_id])
+        result = {
+            **git_revision(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "node": w3.client_version,
+            "wallets": args.wallets,
+            "processes": args.processes,
+            "threads": args.threads,
+            "target_rate": args.rate,
+            "duration": args.duration,
+            "arrivals": args.arrivals,
+            "seed": args.seed,
+            **summarize(shares, start, scheduled)
+        }
+    finally:
+        if anvil:
+            anvil.terminate()
+            anvil.wait()
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if args.trace:
+        write_trace(args.trace, shares[0]["price_path"])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""
+Non-blocking log and statistics writer shared by every bot in a process
+
+log_message / log_statistics only put a tuple on a bounded queue; a daemon
+thread drains it in batches, formats the lines and writes the log file once
+per batch through a descriptor kept open, echoing them to stdout, and packs
+the statistics into records for the segmented store in stats.py. Several
+processes append to the same files: every batch is written on an O_APPEND
+descriptor under an flock on a sidecar .lock file, which also serializes
+size-based rotation, and a writer whose file was rotated away by another
+process reopens it. Under pressure DEBUG lines are sampled first, then any
+line is dropped instead of blocking the caller; the counts are reported in
+the log.
+"""
+import atexit
+import fcntl
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from config import LOG_FILE, STATS_DIR, LOG_LEVEL, LOG_MAX_BYTES, LOG_BACKUPS, LOG_QUEUE_SIZE
+from stats import StatsStore, pack_record
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+
+# Most queued entries written per batch
+BATCH_SIZE = 1000
+
+# Once the queue is half full, one DEBUG line in DEBUG_SAMPLE is kept
+DEBUG_SAMPLE = 10
+
+# Seconds the process waits at exit for queued lines to be written
+EXIT_FLUSH_TIMEOUT = 5.0
+
+# Queue entry kinds
+_LOG, _STATS, _FLUSH = range(3)
+
+class LogFile:
+    """Append-only handle on a file shared with other processes, rotated by size"""
+
+    def __init__(self, path: str, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._fd = None
+        self._lock_fd = None
+
+    def _open(self):
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _rotated_away(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _rotate(self):
+        """path -> path.1 -> ... -> path.<backups>, the oldest is overwritten"""
+        if self.backups:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{i}"):
+                    os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+            self._open()
+        else:
+            os.ftruncate(self._fd, 0)
+
+    def write(self, data: bytes):
+        if self._lock_fd is None:
+            self._lock_fd = os.open(self.path + ".lock", os.O_WRONLY | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            if self._fd is None or self._rotated_away():
+                self._open()
+            view = memoryview(data)
+            while view:
+                view = view[os.write(self._fd, view):]
+            if self.max_bytes and os.fstat(self._fd).st_size >= self.max_bytes:
+                self._rotate()
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def close(self):
+        for fd in (self._fd, self._lock_fd):
+            if fd is not None:
+                os.close(fd)
+        self._fd = self._lock_fd = None
+
+class BackgroundLogger:
+    """Bounded queue in front of a writer thread for the log file and the statistics store"""
+
+    def __init__(self, log_file: str = LOG_FILE, stats_dir: str = STATS_DIR, level: str = LOG_LEVEL,
+                 queue_size: int = LOG_QUEUE_SIZE, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+                 echo: bool = True):
+        self.log_file = LogFile(log_file, max_bytes, backups)
+        self.stats_store = StatsStore(stats_dir)
+        self.level = LEVELS.get(level.upper(), LEVELS["INFO"])
+        self.queue_size = queue_size
+        self.echo = echo
+        # Updated without a lock by every logging thread: the counts are approximate
+        self.dropped = 0
+        self.sampled = 0
+        self._debug_seen = 0
+        self._reported = (0, 0)
+        self._queue = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stamp = (None, "")
+
+    def _ensure_started(self):
+        # The writer thread does not survive a fork, so a child process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    # An inherited flock descriptor would share the parent's lock instead of excluding it
+                    self.log_file.close()
+                    self.stats_store = StatsStore(self.stats_store.directory, self.stats_store.segment_seconds)
+                self._queue = queue.Queue(self.queue_size)
+                threading.Thread(target=self._run, name="log-writer", daemon=True).start()
+                if self._pid is None:
+                    atexit.register(self.flush, EXIT_FLUSH_TIMEOUT)
+                self._pid = os.getpid()
+
+    def _put(self, entry: tuple, debug: bool = False):
+        self._ensure_started()
+        if debug and self.queue_size and self._queue.qsize() >= self.queue_size // 2:
+            self._debug_seen += 1
+            if self._debug_seen % DEBUG_SAMPLE:
+                self.sampled += 1
+                return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def log(self, message: str, level: str = "INFO"):
+        if LEVELS.get(level, LEVELS["INFO"]) < self.level:
+            return
+        self._put((_LOG, time.time(), level, message), level == "DEBUG")
+
+    def stats(self, event_type: str, data: dict, receipt=None):
+        """data is packed by the writer thread and must not be modified afterwards"""
+        self._put((_STATS, time.time(), event_type, (data, receipt)))
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything queued so far is written; False on timeout"""
+        if self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, 0, done, None), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _timestamp(self, ts: float) -> str:
+        # Consecutive lines mostly fall in the same second
+        second = int(ts)
+        if self._stamp[0] != second:
+            self._stamp = (second, datetime.fromtimestamp(second).strftime("%Y-%m-%d %H:%M:%S"))
+        return self._stamp[1]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch: list):
+        log_lines, records, flushed = [], [], []
+        for kind, ts, first, second in batch:
+            if kind == _LOG:
+                log_lines.append(f"[{self._timestamp(ts)}] [{first}] {second}\n")
+            elif kind == _STATS:
+                try:
+                    records.append(pack_record(first, *second))
+                except Exception as e:
+                    log_lines.append(f"[{self._timestamp(ts)}] [ERROR] Unrecordable {first} statistics {second[0]}: {e}\n")
+            else:
+                flushed.append(first)
+
+        counts = (self.dropped, self.sampled)
+        if counts != self._reported:
+            log_lines.append(f"[{self._timestamp(time.time())}] [WARNING] Logger under pressure: "
+                             f"{counts[0] - self._reported[0]} lines dropped, {counts[1] - self._reported[1]} DEBUG lines sampled out\n")
+            self._reported = counts
+
+        # Logging must never take a bot down
+        try:
+            if log_lines:
+                text = "".join(log_lines)
+                self.log_file.write(text.encode())
+                if self.echo:
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
+        except Exception as e:
+            sys.stderr.write(f"Log write failed: {e}\n")
+        try:
+            self.stats_store.append(records)
+        except Exception as e:
+            sys.stderr.write(f"Statistics write failed: {e}\n")
+        for done in flushed:
+            done.set()
+
+# Process-wide instance behind utils.log_message and utils.log_statistics
+LOGGER = BackgroundLogger()
@@ -0,0 +1,310 @@
+"""
+JSON-RPC instrumentation: call counts, errors and latency histograms per method and per contract function
+
+instrument(w3, name) installs a middleware at the innermost layer of a Web3
+connection, so every request that goes on the wire is measured, including
+the ones web3 makes on its own behalf. eth_call, eth_estimateGas and
+eth_sendRawTransaction are also recorded per called function, labelled
+"<contract>.<function>" for the ecosystem contracts and by 4-byte selector
+otherwise. Recording a request costs one perf_counter pair, a dict lookup and
+a bisect under a lock.
+
+The first instrument() call of a process also serves the metrics in
+Prometheus text format on http://METRICS_HOST:<port>/metrics, where the port
+is METRICS_PORT plus the process' offset in PROCESSES (0 for the
+single-process runtime, 1 ... 5 for the bots in control.BOTS order, 6 for
+the indexer and 7 for the simulation), and logs a summary of the last
+METRICS_LOG_INTERVAL seconds. RPC_METRICS=0 turns all of it off.
+
+Usage:
+    python metrics.py                      # print the runtime's metrics
+    python metrics.py --bot profit_bot_1   # or one bot's
+"""
+import argparse
+import bisect
+import sys
+import threading
+import time
+import urllib.request
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import rlp
+from config import RPC_METRICS, METRICS_HOST, METRICS_PORT, METRICS_LOG_INTERVAL
+from contracts import CONTRACTS, function_names
+from control import BOTS
+from utils import log_message
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Methods whose first parameter carries calldata worth labelling by function
+CALL_METHODS = ("eth_call", "eth_estimateGas")
+
+class Series:
+    """Count, errors and latency histogram of one method or function"""
+
+    __slots__ = ("count", "errors", "total", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        # One slot per bound plus +Inf; not cumulative until exported
+        self.buckets = [0] * (len(BUCKETS) + 1)
+
+    def observe(self, seconds: float, error: bool):
+        self.count += 1
+        self.errors += error
+        self.total += seconds
+        self.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def copy(self) -> "Series":
+        series = Series()
+        series.count, series.errors, series.total, series.buckets = self.count, self.errors, self.total, list(self.buckets)
+        return series
+
+    def since(self, earlier: "Series") -> "Series":
+        series = Series()
+        series.count = self.count - earlier.count
+        series.errors = self.errors - earlier.errors
+        series.total = self.total - earlier.total
+        series.buckets = [a - b for a, b in zip(self.buckets, earlier.buckets)]
+        return series
+
+    def quantile(self, q: float) -> float:
+        """Estimated from the buckets with linear interpolation, as Prometheus' histogram_quantile does"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, in_bucket in enumerate(self.buckets):
+            if seen + in_bucket >= rank and in_bucket:
+                if index == len(BUCKETS):
+                    return BUCKETS[-1]
+                lower = BUCKETS[index - 1] if index else 0.0
+                return lower + (BUCKETS[index] - lower) * (rank - seen) / in_bucket
+            seen += in_bucket
+        return BUCKETS[-1]
+
+@lru_cache(maxsize=None)
+def _selector_names() -> dict:
+    """(lowercase contract address, selector hex) -> "<registry name>.<function>" for the ecosystem contracts"""
+    names = {}
+    for name, (_, address) in CONTRACTS.items():
+        if not address:
+            continue
+        try:
+            selectors = function_names(name)
+        except FileNotFoundError:
+            continue
+        for selector, function in selectors.items():
+            names[(address.lower(), selector)] = f"{name}.{function}"
+    return names
+
+def _hex(value) -> str:
+    if isinstance(value, (bytes, bytearray)):
+        return "0x" + bytes(value).hex()
+    return str(value).lower()
+
+def _raw_call(raw) -> tuple:
+    """(to, calldata hex) of a signed legacy or typed transaction"""
+    raw = bytes.fromhex(raw.removeprefix("0x")) if isinstance(raw, str) else bytes(raw)
+    if raw and raw[0] < 0x7f:
+        # EIP-2718 typed: type 1 has one leading chainId field before nonce, gasPrice, gas, to, value, data
+        fields = rlp.decode(raw[1:])
+        to, data = (fields[4], fields[6]) if raw[0] == 1 else (fields[5], fields[7])
+    else:
+        fields = rlp.decode(raw)
+        to, data = fields[3], fields[5]
+    return _hex(to), _hex(data)
+
+def function_label(method: str, params) -> str:
+    """Called contract function of a request, None for requests that call none"""
+    try:
+        if method in CALL_METHODS:
+            tx = params[0]
+            to, data = _hex(tx.get("to", "")), _hex(tx.get("data") or tx.get("input") or "")
+        elif method == "eth_sendRawTransaction":
+            to, data = _raw_call(params[0])
+        else:
+            return None
+    except Exception:
+        return None
+    if len(data) < 10:
+        return "transfer" if method == "eth_sendRawTransaction" else None
+    selector = data[:10]
+    return _selector_names().get((to, selector), selector)
+
+def _is_error(response) -> bool:
+    return isinstance(response, dict) and "error" in response
+
+class RPCMetrics:
+    """Request statistics of one process, shared by all its instrumented providers"""
+
+    def __init__(self):
+        self.name = None
+        self.methods = {}
+        self.functions = {}  # (method, function) -> Series
+        self._lock = threading.Lock()
+        self._server = None
+        self._reporter = None
+
+    def observe(self, method: str, params, seconds: float, error: bool):
+        function = function_label(method, params)
+        with self._lock:
+            series = self.methods.get(method)
+            if series is None:
+                series = self.methods[method] = Series()
+            series.observe(seconds, error)
+            if function:
+                key = (method, function)
+                series = self.functions.get(key)
+                if series is None:
+                    series = self.functions[key] = Series()
+                series.observe(seconds, error)
+
+    def middleware(self, make_request, w3):
+        def middleware(method, params):
+            started = time.perf_counter()
+            try:
+                response = make_request(method, params)
+            except Exception:
+                self.observe(method, params, time.perf_counter() - started, True)
+                raise
+            self.observe(method, params, time.perf_counter() - started, _is_error(response))
+            return response
+        return middleware
+
+    def copy(self) -> tuple:
+        """(methods, functions) as independent copies"""
+        with self._lock:
+            return ({method: series.copy() for method, series in self.methods.items()},
+                    {key: series.copy() for key, series in self.functions.items()})
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        methods, functions = self.copy()
+        bot = self.name or "unknown"
+        lines = []
+        for prefix, subject, series_by_labels in (("rpc", "JSON-RPC requests by method", methods),
+                                                  ("rpc_function", "JSON-RPC requests by called contract function", functions)):
+            rows = []
+            for key, series in sorted(series_by_labels.items()):
+                labels = f'bot="{bot}",method="{key}"' if prefix == "rpc" else f'bot="{bot}",method="{key[0]}",function="{key[1]}"'
+                rows.append((labels, series))
+            lines.append(f"# HELP {prefix}_requests_total {subject}")
+            lines.append(f"# TYPE {prefix}_requests_total counter")
+            lines.extend(f"{prefix}_requests_total{{{labels}}} {series.count}" for labels, series in rows)
+            lines.append(f"# HELP {prefix}_errors_total Failed {subject}")
+            lines.append(f"# TYPE {prefix}_errors_total counter")
+            lines.extend(f"{prefix}_errors_total{{{labels}}} {series.errors}" for labels, series in rows)
+            lines.append(f"# HELP {prefix}_duration_seconds Latency of {subject}")
+            lines.append(f"# TYPE {prefix}_duration_seconds histogram")
+            for labels, series in rows:
+                cumulative = 0
+                for bound, in_bucket in zip(BUCKETS + ("+Inf",), series.buckets):
+                    cumulative += in_bucket
+                    lines.append(f'{prefix}_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{prefix}_duration_seconds_sum{{{labels}}} {series.total:.6f}")
+                lines.append(f"{prefix}_duration_seconds_count{{{labels}}} {series.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self, methods: dict, top: int = 8) -> str:
+        parts = []
+        for method, series in sorted(methods.items(), key=lambda item: -item[1].total)[:top]:
+            if series.count:
+                errors = f", {series.errors} errors" if series.errors else ""
+                parts.append(f"{method} {series.count}{errors} p50 {series.quantile(0.5) * 1e3:.1f}ms "
+                             f"p99 {series.quantile(0.99) * 1e3:.1f}ms")
+        return "; ".join(parts)
+
+    def _report(self, interval: float):
+        previous = {}
+        while True:
+            time.sleep(interval)
+            methods, _ = self.copy()
+            recent = {method: series.since(previous[method]) if method in previous else series
+                      for method, series in methods.items()}
+            previous = methods
+            text = self.summary(recent)
+            if text:
+                log_message(f"RPC in the last {interval:g}s (by total time): {text}")
+
+    def start(self, name: str, port: int = None, interval: float = METRICS_LOG_INTERVAL):
+        """Serve /metrics and start the periodic log summary, once per process"""
+        with self._lock:
+            if self.name is not None:
+                return
+            self.name = name
+        port = metrics_port(name) if port is None else port
+        if port:
+            try:
+                self._server = ThreadingHTTPServer((METRICS_HOST, port), _handler(self))
+            except OSError as e:
+                log_message(f"RPC metrics endpoint not started on port {port}: {e}", "WARNING")
+            else:
+                self._server.daemon_threads = True
+                threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+                log_message(f"RPC metrics on http://{METRICS_HOST}:{port}/metrics")
+        if interval > 0:
+            self._reporter = threading.Thread(target=self._report, args=(interval,), name="metrics-report", daemon=True)
+            self._reporter.start()
+
+def _handler(metrics: RPCMetrics):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Scrapes would flood the bot's stdout
+            pass
+    return Handler
+
+METRICS = RPCMetrics()
+
+# Instrumented processes, each serving on METRICS_PORT plus its index, so they can run side by side
+PROCESSES = ("runtime",) + BOTS + ("indexer", "simulate")
+
+def metrics_port(name: str) -> int:
+    """Endpoint port of a process in PROCESSES; 0 when disabled"""
+    if name not in PROCESSES:
+        raise ValueError(f"{name} has no metrics port ({', '.join(PROCESSES)})")
+    if not METRICS_PORT:
+        return 0
+    return METRICS_PORT + PROCESSES.index(name)
+
+def instrument(w3, name: str):
+    """Measure every request of w3 and publish the process' metrics under name"""
+    if not RPC_METRICS:
+        return w3
+    # Layer 0 is innermost: requests made by other middleware are measured too
+    w3.middleware_onion.inject(METRICS.middleware, "rpc_metrics", layer=0)
+    METRICS.start(name)
+    return w3
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bot", choices=PROCESSES[1:], help="bot or tool, default the single-process runtime")
+    args = parser.parse_args()
+    port = metrics_port(args.bot or "runtime")
+    if not port:
+        print("METRICS_PORT is 0, no endpoint is served")
+        return 1
+    try:
+        with urllib.request.urlopen(f"http://{METRICS_HOST}:{port}/metrics", timeout=5) as response:
+            sys.stdout.write(response.read().decode())
+    except OSError as e:
+        print(f"No metrics on port {port}: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,855 @@
+"""
+Vectorized in-memory model of the ecosystem for Monte Carlo peg-stability studies
+
+EcosystemModel holds the SimpleDEX, LendingProtocol and MinterRedeemer state of
+many independent paths at once, one array element per path, and every
+contract function runs on all paths with one set of array operations. The
+Solidity integer arithmetic is reproduced exactly - floor divisions, the
+lending protocol's ratio units, reverts leaving a path's state untouched -
+with amounts held as Python integers in object arrays, as in
+quote.quote_cycle_batch.
+
+MonteCarlo steps the bots' decision rules in simulate.py's lockstep order:
+every bot decides from the state at the start of a tick, then the oracle
+update, the retailers' swaps and the profit bots' liquidations and router
+swaps execute in that order in one block. The rules are ported as they are,
+including the retailers' comparison of the pool price with oracle_price * 1e18,
+the fallback sell a retailer sends once a swap of theirs reverted (mined at
+the start of the next block), and the profit bots' deposit-and-borrow attempt
+when liquidation funds run short, so a path started from the same chain state with the same prices and
+retail draws as a simulate.py run ends in the same state. `verify` checks
+exactly that on anvil, tick by tick, taking the retailers' stablecoins
+halfway through so their fallbacks run, plus mint and redeem amounts of the
+MinterRedeemer.
+
+With --keeper-weth an extra peg keeper, which no bot in this repository
+implements, closes pool deviations through the MinterRedeemer: it sells mWETH
+into a pool priced above the oracle and redeems the stablecoin, or mints at
+the oracle price and buys mWETH from a pool priced below it.
+
+Usage:
+    python model.py run --paths 2000 --days 1 --seed 1        # deployed state, 60 s ticks
+    python model.py run --paths 500 --borrowers 50 --arb-funds 5000 --keeper-weth 10 --out mc.json
+    python model.py run --from-chain --prices eth_prices.csv   # start from RPC_URL, replay a recorded path
+    python model.py verify --ticks 300 --seed 1 --borrowers 5  # one path against the contracts on anvil
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import time
+import numpy as np
+from web3 import Web3
+from config import RPC_URL, MINTER_REDEEMER_ADDRESS, MWETH_ADDRESS, WALLET_1_KEY, WALLET_2_KEY, WALLET_3_KEY, WALLET_4_KEY
+from utils import TransactionSubmitter, AllowanceManager
+from contracts import TOKENS, address_of, call_view, get_contract
+from control import CONTROL
+from positions import LIQUIDATION_THRESHOLD
+from prices import PRICE_DECIMALS, RandomWalkSource, ReplaySource
+from quote import REFINE_WINDOW
+from snapshot import snapshot
+from simulate import DEFAULT_VOLATILITY, SimClock, fit_deadline
+from bench_positions import set_position
+import profit_bot_1
+import profit_bot_2
+import retailer_bot_1
+import retailer_bot_2
+
+WAD = 10**18
+# getEthPrice: 8-decimal oracle price to 18 decimals
+PRICE_SCALE = 10**10
+
+# LendingProtocol constants (LIQUIDATION_THRESHOLD comes from positions.py)
+COLLATERALIZATION_RATIO = 150 * 10**16
+LIQUIDATION_BONUS = 5 * 10**16
+
+SYMBOLS = ("mWETH", "dUSD", "dUSC")
+
+# quote.CYCLES as (first pool, second pool) stablecoin symbols; router swap of each cycle
+ROUTES = {"dusd_to_dusc": ("dUSD", "dUSC"), "dusc_to_dusd": ("dUSC", "dUSD")}
+
+# Retailer bot module and the pool it trades in; profit bots in the order simulate.py steps them
+RETAILERS = ((retailer_bot_1, "dUSD"), (retailer_bot_2, "dUSC"))
+PROFIT_BOTS = (profit_bot_1, profit_bot_2)
+PEG_KEEPER = "peg_keeper"
+
+# State left by script/DeployEcosystem.s.sol
+DEPLOY_ORACLE_PRICE = 2000 * 10**8
+DEPLOY_POOLS = {"dUSD": (6000 * WAD, 2 * WAD), "dUSC": (6000 * WAD, 2 * WAD)}
+DEPLOY_LENDING_RESERVES = {"dUSD": 10000 * WAD, "dUSC": 10000 * WAD}
+# mWETH minted into MinterRedeemer: 3 + 3 for the pools, 5 + 5 for lending, 1 + 1 for wallets 1 and 2
+DEPLOY_MINTER_WETH = 18 * WAD
+# Bot id -> (vm.addr(n) of its wallet, starting balances)
+DEPLOY_WALLETS = {
+    "retailer_bot_1": ("0x7E5F4552091A69125d5DfCb7b8C2659029395Bdf", {"dUSD": 2000 * WAD}),
+    "retailer_bot_2": ("0x2B5AD5c4795c026514f8317c7a215E218DcCD6cF", {"dUSC": 2000 * WAD}),
+    "profit_bot_1": ("0x6813Eb9362372EEF6200f3b1dbC3f819671cBA69", {"mWETH": WAD}),
+    "profit_bot_2": ("0x1efF47bc3a10a45D4B230B5d10E37751FE6AA718", {"mWETH": WAD})
+}
+# Address of the peg keeper's wallet, which exists only in the model
+PEG_KEEPER_ADDRESS = "0x000000000000000000000000000000000000bEEF"
+
+_isqrt = np.frompyfunc(math.isqrt, 1, 1)
+_int = np.frompyfunc(int, 1, 1)
+
+def _ints(value, shape) -> np.ndarray:
+    """value broadcast to an object array of Python integers"""
+    out = np.empty(shape, dtype=object)
+    out[...] = _int(np.asarray(value, dtype=object))
+    return out
+
+def _div(numerator, denominator) -> tuple:
+    """(floor division, mask of non-zero denominators); 0 where Solidity would revert"""
+    valid = denominator != 0
+    return np.where(valid, numerator // np.where(valid, denominator, 1), 0), valid
+
+def amount_out(amount_in, reserve_in, reserve_out) -> np.ndarray:
+    """SimpleDEX swap output on every path, as quote.get_amount_out"""
+    return _div(amount_in * reserve_out, reserve_in + amount_in)[0]
+
+def pool_price(stable, weth) -> np.ndarray:
+    """SimpleDEX.getDUSDPrice / getDUSCPrice on every path"""
+    return _div(stable * WAD, weth)[0]
+
+def mint_amount(mweth_amount, oracle_price):
+    """Stablecoin MinterRedeemer.mintDUSD/mintDUSC returns for mweth_amount"""
+    return mweth_amount * (oracle_price * PRICE_SCALE) // WAD
+
+def redeem_amount(amount, oracle_price):
+    """mWETH MinterRedeemer.redeemDUSD/redeemDUSC returns for amount"""
+    return _div(amount * WAD, oracle_price * PRICE_SCALE)[0]
+
+def can_liquidate(collateral, dusd_debt, dusc_debt, oracle_price) -> np.ndarray:
+    """LendingProtocol._canLiquidate, False where getEthPrice reverts"""
+    total_debt_value = (dusd_debt + dusc_debt) * WAD
+    collateral_value = collateral * (oracle_price * PRICE_SCALE) // WAD
+    ratio, has_debt = _div(collateral_value * WAD, total_debt_value)
+    return has_debt & (collateral > 0) & (oracle_price > 0) & (ratio < LIQUIDATION_THRESHOLD)
+
+def liquidation_prices(collateral, debt) -> np.ndarray:
+    """positions.liquidation_price on every element, 0 where a position cannot be liquidated"""
+    price, valid = _div(-LIQUIDATION_THRESHOLD * debt * 10**8, collateral)
+    return np.where(valid & (debt > 0), -price, 0)
+
+def best_cycle_batch(first_pool: tuple, second_pool: tuple, max_input) -> tuple:
+    """quote.best_cycle on every path: (amount in, mWETH out of the first leg, amount out)
+
+    The same candidates are evaluated - first-leg outputs within REFINE_WINDOW
+    of the closed-form optimum priced back to their minimal input, then
+    max_input - and ties go to the first, so the result is identical path by path.
+    """
+    stable_a, weth_a = first_pool
+    stable_b, weth_b = second_pool
+    optimum, _ = _div(_isqrt(stable_a * weth_a * weth_b * stable_b) - stable_a * weth_b, weth_a + weth_b)
+    live = (optimum > 0) & (max_input > 0)
+
+    center = amount_out(np.where(optimum < max_input, optimum, max_input), stable_a, weth_a)
+    low = np.where(center - REFINE_WINDOW > 1, center - REFINE_WINDOW, 1)
+    high = np.where(center + REFINE_WINDOW < weth_a - 1, center + REFINE_WINDOW, weth_a - 1)
+    targets = low[:, None] + np.arange(2 * REFINE_WINDOW + 1).astype(object)[None, :]
+    valid = targets <= high[:, None]
+    # min_input_for, with the masked-out targets kept away from a zero denominator
+    inputs = -((-targets * stable_a[:, None]) // np.where(valid, weth_a[:, None] - targets, 1))
+    valid &= inputs <= max_input[:, None]
+
+    inputs = np.concatenate([inputs, max_input[:, None]], axis=1)
+    valid = np.concatenate([valid, np.ones((len(valid), 1), dtype=bool)], axis=1)
+    weth_out = amount_out(inputs, stable_a[:, None], weth_a[:, None])
+    outputs = amount_out(weth_out, weth_b[:, None], stable_b[:, None])
+    profits = np.where(valid, outputs - inputs, -(2**256))
+    best = np.argmax(profits, axis=1)[:, None]
+    pick = lambda values: np.where(live, np.take_along_axis(values, best, axis=1)[:, 0], 0)
+    return pick(inputs), pick(weth_out), pick(outputs)
+
+def find_arbitrage_batch(pools: dict, balances: dict, max_trade: int, min_profit: int) -> tuple:
+    """quote.find_arbitrage on every path: (direction index into ROUTES or -1, amount in, amount out)"""
+    paths = len(balances["dUSD"])
+    direction = np.full(paths, -1)
+    best_in, best_out, best_profit = _ints(0, paths), _ints(0, paths), _ints(0, paths)
+    for index, route in enumerate(ROUTES.values()):
+        first, second = route
+        max_input = np.where(balances[first] < max_trade, balances[first], max_trade)
+        amount_in, _, amount_out_ = best_cycle_batch(pools[first], pools[second], max_input)
+        profit = amount_out_ - amount_in
+        take = (max_input > 0) & (profit >= min_profit) & ((direction < 0) | (profit > best_profit))
+        direction = np.where(take, index, direction)
+        best_in = np.where(take, amount_in, best_in)
+        best_out = np.where(take, amount_out_, best_out)
+        best_profit = np.where(take, profit, best_profit)
+    return direction, best_in, best_out
+
+class EcosystemModel:
+    """Contract state of many independent paths; every operation takes the mask of paths it runs on.
+
+    Operations follow the Solidity functions line by line. On a path where the
+    contract would revert (failed require, underflow, division by zero, a
+    transfer above the sender's balance) the state is left as it was and the
+    returned ok mask is False. Operations replace state arrays rather than
+    write into them, so view() is a cheap consistent copy.
+    """
+
+    def __init__(self, paths: int, oracle_price, pools: dict, lending_reserves: dict, minter_weth,
+                 wallets: dict, positions: dict = None, timestamp: int = 0):
+        """wallets: bot id -> (address, {symbol: balance}); positions: address -> (collateral, dUSD debt, dUSC debt)"""
+        self.paths = paths
+        self.timestamp = timestamp
+        self.oracle_price = _ints(oracle_price, paths)
+        self.pools = {symbol: (_ints(stable, paths), _ints(weth, paths)) for symbol, (stable, weth) in pools.items()}
+        self.lending_reserves = {symbol: _ints(amount, paths) for symbol, amount in lending_reserves.items()}
+        self.minter_weth = _ints(minter_weth, paths)
+        self.addresses = {wallet: address for wallet, (address, _) in wallets.items()}
+        self.balances = {wallet: {symbol: _ints(balances.get(symbol, 0), paths) for symbol in SYMBOLS}
+                         for wallet, (_, balances) in wallets.items()}
+
+        # One column per account, sorted by address as PositionBook breaks ties
+        positions = dict(positions or {})
+        for address in self.addresses.values():
+            positions.setdefault(address, (0, 0, 0))
+        self.accounts = sorted(positions)
+        self.column = {address: index for index, address in enumerate(self.accounts)}
+        self.positions = _ints([positions[address] for address in self.accounts], (paths, len(self.accounts), 3))
+        self._rows = np.arange(paths)
+
+    @classmethod
+    def deployed(cls, paths: int, borrowers: dict = None, arb_funds: int = 0, keeper_weth: int = 0) -> "EcosystemModel":
+        """State right after DeployEcosystem, with optional extra stablecoins for the profit bots and a peg keeper"""
+        wallets = {wallet: (address, dict(balances)) for wallet, (address, balances) in DEPLOY_WALLETS.items()}
+        for module in PROFIT_BOTS:
+            balances = wallets[module.BOT_ID][1]
+            for symbol in ("dUSD", "dUSC"):
+                balances[symbol] = balances.get(symbol, 0) + arb_funds
+        if keeper_weth:
+            wallets[PEG_KEEPER] = (PEG_KEEPER_ADDRESS, {"mWETH": keeper_weth})
+        return cls(paths, DEPLOY_ORACLE_PRICE, DEPLOY_POOLS, DEPLOY_LENDING_RESERVES, DEPLOY_MINTER_WETH, wallets, borrowers)
+
+    @classmethod
+    def from_chain(cls, w3: Web3, paths: int, wallets: dict, borrowers: list = (), positions: dict = None,
+                   block_identifier="latest") -> "EcosystemModel":
+        """State of a live deployment.
+
+        wallets maps bot ids to addresses, borrowers are further accounts whose
+        positions are read, and positions adds positions that exist only in the model.
+        """
+        snap = snapshot(w3, list(wallets.values()), list(borrowers), block_identifier)
+        lending_reserves = {"dUSD": call_view(w3, "lending", "dusdReserves", block_identifier=snap.block_number),
+                            "dUSC": call_view(w3, "lending", "duscReserves", block_identifier=snap.block_number)}
+        minter_weth = call_view(w3, "mweth", "balanceOf", MINTER_REDEEMER_ADDRESS, block_identifier=snap.block_number)
+        return cls(paths, snap.oracle_price, {"dUSD": snap.dusd_reserves, "dUSC": snap.dusc_reserves}, lending_reserves,
+                   minter_weth, {wallet: (address, snap.balances[address]) for wallet, address in wallets.items()},
+                   {**snap.positions, **(positions or {})}, snap.timestamp)
+
+    def view(self) -> dict:
+        """State as of now, unaffected by later operations"""
+        return {
+            "timestamp": self.timestamp,
+            "oracle_price": self.oracle_price,
+            "pools": dict(self.pools),
+            "balances": {wallet: dict(balances) for wallet, balances in self.balances.items()},
+            "positions": self.positions
+        }
+
+    def _credit(self, wallet: str, symbol: str, amount, on):
+        self.balances[wallet][symbol] = np.where(on, self.balances[wallet][symbol] + amount, self.balances[wallet][symbol])
+
+    def _position(self, address: str, cols=None) -> tuple:
+        cols = self.column[address] if cols is None else cols
+        position = self.positions[self._rows, cols]
+        return position[:, 0], position[:, 1], position[:, 2]
+
+    def _set_position(self, cols, collateral, dusd_debt, dusc_debt, on):
+        positions = self.positions.copy()
+        rows = self._rows[on]
+        cols = np.broadcast_to(cols, on.shape)[on]
+        positions[rows, cols, 0] = collateral[on]
+        positions[rows, cols, 1] = dusd_debt[on]
+        positions[rows, cols, 2] = dusc_debt[on]
+        self.positions = positions
+
+    def set_price(self, price, on):
+        """MockOracle.setPrice"""
+        self.oracle_price = np.where(on, price, self.oracle_price)
+
+    def swap(self, wallet: str, pool: str, stable_in: bool, amount, on) -> tuple:
+        """swapDUSDForWETH etc.: (amount out, ok)"""
+        stable, weth = self.pools[pool]
+        reserve_in, reserve_out = (stable, weth) if stable_in else (weth, stable)
+        out, ok = _div(amount * reserve_out, reserve_in + amount)
+        token_in, token_out = (pool, "mWETH") if stable_in else ("mWETH", pool)
+        ok &= on & (self.balances[wallet][token_in] >= amount)
+        reserve_in = np.where(ok, reserve_in + amount, reserve_in)
+        reserve_out = np.where(ok, reserve_out - out, reserve_out)
+        self.pools[pool] = (reserve_in, reserve_out) if stable_in else (reserve_out, reserve_in)
+        self._credit(wallet, token_in, -amount, ok)
+        self._credit(wallet, token_out, out, ok)
+        return np.where(ok, out, 0), ok
+
+    def router_swap(self, wallet: str, direction: str, amount, min_out, deadline: int, on) -> tuple:
+        """swapDUSDForDUSC / swapDUSCForDUSD: (amount out, ok); both legs revert together"""
+        first, second = ROUTES[direction]
+        stable_a, weth_a = self.pools[first]
+        stable_b, weth_b = self.pools[second]
+        weth_out, ok_a = _div(amount * weth_a, stable_a + amount)
+        out, ok_b = _div(weth_out * stable_b, weth_b + weth_out)
+        ok = on & ok_a & ok_b & (self.timestamp <= deadline) & (self.balances[wallet][first] >= amount) & (out >= min_out)
+        self.pools[first] = (np.where(ok, stable_a + amount, stable_a), np.where(ok, weth_a - weth_out, weth_a))
+        self.pools[second] = (np.where(ok, stable_b - out, stable_b), np.where(ok, weth_b + weth_out, weth_b))
+        self._credit(wallet, first, -amount, ok)
+        self._credit(wallet, second, out, ok)
+        return np.where(ok, out, 0), ok
+
+    def mint(self, wallet: str, symbol: str, mweth_amount, on) -> tuple:
+        """mintDUSD / mintDUSC: (stablecoin minted, ok)"""
+        out = mint_amount(mweth_amount, self.oracle_price)
+        ok = on & (self.oracle_price > 0) & (self.balances[wallet]["mWETH"] >= mweth_amount)
+        self.minter_weth = np.where(ok, self.minter_weth + mweth_amount, self.minter_weth)
+        self._credit(wallet, "mWETH", -mweth_amount, ok)
+        self._credit(wallet, symbol, out, ok)
+        return np.where(ok, out, 0), ok
+
+    def redeem(self, wallet: str, symbol: str, amount, on) -> tuple:
+        """redeemDUSD / redeemDUSC: (mWETH returned, ok)"""
+        out = redeem_amount(amount, self.oracle_price)
+        ok = on & (self.oracle_price > 0) & (self.balances[wallet][symbol] >= amount) & (self.minter_weth >= out)
+        self.minter_weth = np.where(ok, self.minter_weth - out, self.minter_weth)
+        self._credit(wallet, symbol, -amount, ok)
+        self._credit(wallet, "mWETH", out, ok)
+        return np.where(ok, out, 0), ok
+
+    def deposit_collateral(self, wallet: str, amount, on):
+        """LendingProtocol.depositCollateral; returns ok"""
+        ok = on & (self.balances[wallet]["mWETH"] >= amount)
+        collateral, dusd_debt, dusc_debt = self._position(self.addresses[wallet])
+        self._set_position(self.column[self.addresses[wallet]], collateral + amount, dusd_debt, dusc_debt, ok)
+        self._credit(wallet, "mWETH", -amount, ok)
+        return ok
+
+    def borrow(self, wallet: str, dusd_amount, dusc_amount, on):
+        """LendingProtocol.borrow; returns ok"""
+        collateral, dusd_debt, dusc_debt = self._position(self.addresses[wallet])
+        dusd_debt, dusc_debt = dusd_debt + dusd_amount, dusc_debt + dusc_amount
+        collateral_value = collateral * (self.oracle_price * PRICE_SCALE) // WAD
+        ratio, has_debt = _div(collateral_value * WAD, (dusd_debt + dusc_debt) * WAD)
+        ok = (on & (dusd_amount <= self.lending_reserves["dUSD"]) & (dusc_amount <= self.lending_reserves["dUSC"])
+              & has_debt & (self.oracle_price > 0) & (ratio >= COLLATERALIZATION_RATIO))
+        self._set_position(self.column[self.addresses[wallet]], collateral, dusd_debt, dusc_debt, ok)
+        for symbol, amount in (("dUSD", dusd_amount), ("dUSC", dusc_amount)):
+            self.lending_reserves[symbol] = np.where(ok, self.lending_reserves[symbol] - amount, self.lending_reserves[symbol])
+            self._credit(wallet, symbol, amount, ok)
+        return ok
+
+    def liquidate(self, wallet: str, cols, on) -> tuple:
+        """LendingProtocol.liquidate of the account in column cols[i] on path i: (collateral seized, ok)"""
+        collateral, dusd_debt, dusc_debt = self._position(None, cols)
+        eth_price = self.oracle_price * PRICE_SCALE
+        ok = on & can_liquidate(collateral, dusd_debt, dusc_debt, self.oracle_price)
+
+        total_debt_value = (dusd_debt + dusc_debt) * WAD
+        collateral_value = collateral * eth_price // WAD
+        target_collateral_value = total_debt_value * COLLATERALIZATION_RATIO // WAD
+        # Liquidatable means collateralValue < 1.2 * totalDebtValue, so this subtraction always underflows
+        # and the deployed contract never completes a liquidation; kept to stay exact if that changes
+        ok &= collateral_value >= target_collateral_value
+        excess = np.where(ok, collateral_value - target_collateral_value, 0)
+        repay = np.where(excess > total_debt_value, total_debt_value, excess)
+        dusd_repay, _ = _div(dusd_debt * repay, total_debt_value)
+        dusc_repay, _ = _div(dusc_debt * repay, total_debt_value)
+        seize_value = repay + repay * LIQUIDATION_BONUS // WAD
+        seize, _ = _div(seize_value * WAD, eth_price)
+        ok &= (seize <= collateral) & (self.balances[wallet]["dUSD"] >= dusd_repay) & (self.balances[wallet]["dUSC"] >= dusc_repay)
+
+        self._set_position(cols, collateral - seize, dusd_debt - dusd_repay, dusc_debt - dusc_repay, ok)
+        for symbol, amount in (("dUSD", dusd_repay), ("dUSC", dusc_repay)):
+            self.lending_reserves[symbol] = np.where(ok, self.lending_reserves[symbol] + amount, self.lending_reserves[symbol])
+            self._credit(wallet, symbol, -amount, ok)
+        self._credit(wallet, "mWETH", seize, ok)
+        return np.where(ok, seize, 0), ok
+
+    def wallet_value(self, wallet: str) -> np.ndarray:
+        """Balances plus own lending position, stablecoins at $1 and mWETH at the oracle price, in USD"""
+        balances = self.balances[wallet]
+        collateral, dusd_debt, dusc_debt = self._position(self.addresses[wallet])
+        eth_usd = self.oracle_price.astype(float) / 10**PRICE_DECIMALS
+        stables = (balances["dUSD"] + balances["dUSC"] - dusd_debt - dusc_debt).astype(float) / 1e18
+        return stables + (balances["mWETH"] + collateral).astype(float) / 1e18 * eth_usd
+
+class RandomWalkPaths:
+    """prices.RandomWalkSource for many paths: one seeded generator, one normal draw per path and fetch.
+
+    With one path the prices equal RandomWalkSource's for the same seed up to
+    the last bit of np.exp; verify uses the scalar source itself.
+    """
+
+    def __init__(self, start_price: int, volatility: float, seed: int, paths: int):
+        self.price = np.full(paths, start_price / 10**PRICE_DECIMALS)
+        self.sigma = volatility / math.sqrt(365 * 86400)
+        self.rng = np.random.default_rng(seed)
+        self.last = None
+        self.name = f"random walk at {volatility:.0%} volatility, seed {seed}"
+
+    def fetch(self, now: float) -> np.ndarray:
+        if self.last is not None and now > self.last:
+            elapsed = now - self.last
+            self.price *= np.exp(self.sigma * math.sqrt(elapsed) * self.rng.standard_normal(len(self.price))
+                                 - self.sigma**2 * elapsed / 2)
+        self.last = now
+        return _int(np.rint(self.price * 10**PRICE_DECIMALS).astype(np.int64))
+
+class SourcePaths:
+    """A scalar prices.PriceSource on a SimClock, the same price on every path"""
+
+    def __init__(self, source, clock: SimClock, paths: int):
+        self.source = source
+        self.clock = clock
+        self.paths = paths
+        self.name = source.name
+
+    def fetch(self, now: float) -> np.ndarray:
+        self.clock.now = now
+        return _ints(self.source.fetch() or 0, self.paths)
+
+class NumpyDraws:
+    """Retail trade sizes, an independent seeded stream per bot"""
+
+    def __init__(self, seed: int, paths: int):
+        self.paths = paths
+        self.rngs = {module.BOT_ID: np.random.default_rng([seed, index]) for index, (module, _) in enumerate(RETAILERS)}
+
+    def __call__(self, bot_id: str, low: int, high: int) -> np.ndarray:
+        return _int(self.rngs[bot_id].integers(low, high, endpoint=True, size=self.paths))
+
+class RandomDraws:
+    """Retail trade sizes from random.Random seeded as simulate.py seeds each retailer"""
+
+    def __init__(self, seed: int, paths: int):
+        self.paths = paths
+        self.rngs = {module.BOT_ID: random.Random(f"{seed}:{module.BOT_ID}") for module, _ in RETAILERS}
+
+    def __call__(self, bot_id: str, low: int, high: int) -> np.ndarray:
+        rng = self.rngs[bot_id]
+        return _ints([rng.randint(low, high) for _ in range(self.paths)], self.paths)
+
+def make_borrowers(count: int, seed: int, oracle_price: int = DEPLOY_ORACLE_PRICE) -> dict:
+    """count synthetic positions, 110% to 300% collateralized in USD at oracle_price, at bench_positions' addresses"""
+    rng = np.random.default_rng(seed)
+    borrowers = {}
+    for i in range(count):
+        collateral = int(rng.uniform(0.5, 5) * 10**6) * 10**12
+        debt = collateral * oracle_price // 10**8 * 100 // int(rng.uniform(110, 300))
+        dusd_debt = debt * int(rng.integers(0, 101)) // 100
+        borrowers[Web3.to_checksum_address(f"0x{0x1000 + i:040x}")] = (collateral, dusd_debt, debt - dusd_debt)
+    return borrowers
+
+def _distribution(values: np.ndarray) -> dict:
+    values = np.asarray(values, dtype=float)
+    p5, p50, p95 = np.percentile(values, (5, 50, 95))
+    return {"mean": round(float(values.mean()), 2), "p5": round(float(p5), 2), "p50": round(float(p50), 2),
+            "p95": round(float(p95), 2), "min": round(float(values.min()), 2), "max": round(float(values.max()), 2)}
+
+class MonteCarlo:
+    """The bots' decision rules stepped over an EcosystemModel in simulate.py's lockstep order"""
+
+    def __init__(self, model: EcosystemModel, source, draw, tick: float = 60):
+        self.model = model
+        self.source = source
+        self.draw = draw
+        self.tick = tick
+        # As in simulate.py, so the router swaps stay comparable
+        fit_deadline(tick)
+        self.start_timestamp = model.timestamp
+        self.retailers = [(module, pool) for module, pool in RETAILERS if module.BOT_ID in model.balances]
+        self.profit_bots = [module for module in PROFIT_BOTS if module.BOT_ID in model.balances]
+        self.keeper = PEG_KEEPER in model.balances
+        self.next_oracle = 0.0
+        self.next_trade = {module.BOT_ID: 0.0 for module, _ in self.retailers}
+
+        paths = model.paths
+        # oracle_bot.UpdatePolicy per path
+        self.last_price = _ints(0, paths)
+        self.last_sent = np.zeros(paths)
+        self.oracle_updates = np.zeros(paths, dtype=np.int64)
+
+        self.ticks = 0
+        self.start_values = {wallet: model.wallet_value(wallet) for wallet in model.balances}
+        self.deviation = {pool: {"sum_abs": np.zeros(paths), "max_abs": np.zeros(paths)} for pool in model.pools}
+        self.transactions = np.zeros(paths, dtype=np.int64)
+        self.reverted = np.zeros(paths, dtype=np.int64)
+        # Sells the retailers send once a swap of theirs reverted, mined in the next block: wallet -> (amount, on)
+        self.pending_fallbacks = {}
+        self.retail_fallbacks = np.zeros(paths, dtype=np.int64)
+        self.liquidations = np.zeros(paths, dtype=np.int64)
+        self.liquidation_reverts = np.zeros(paths, dtype=np.int64)
+        self.max_liquidations_per_tick = np.zeros(paths, dtype=np.int64)
+        self.seized = _ints(0, paths)
+
+    def _count(self, on, ok):
+        self.transactions += on
+        self.reverted += on & ~ok
+
+    def _sample(self, view: dict):
+        oracle_usd = view["oracle_price"].astype(float) / 10**PRICE_DECIMALS
+        for pool, (stable, weth) in view["pools"].items():
+            price = pool_price(stable, weth).astype(float) / 1e18
+            deviation = np.abs(np.where(oracle_usd > 0, price / np.where(oracle_usd > 0, oracle_usd, 1) - 1, 0)) * 10000
+            self.deviation[pool]["sum_abs"] += deviation
+            np.maximum(self.deviation[pool]["max_abs"], deviation, out=self.deviation[pool]["max_abs"])
+
+    def _oracle(self, now: float):
+        """oracle_bot.step: fetch, then setPrice where UpdatePolicy.reason() gives a reason"""
+        price = self.source.fetch(now)
+        fetched = price != 0
+        first = self.last_price == 0
+        deviation = (abs(price - self.last_price) * 10000 / np.where(first, 1, self.last_price)).astype(float)
+        due = first | (deviation >= CONTROL.get("ORACLE_DEVIATION_BPS"))
+        heartbeat = CONTROL.get("ORACLE_HEARTBEAT")
+        if heartbeat:
+            due |= now - self.last_sent >= heartbeat
+        send = fetched & due
+        self.model.set_price(price, send)
+        self._count(send, send)
+        self.last_price = np.where(send, price, self.last_price)
+        self.last_sent = np.where(send, now, self.last_sent)
+        self.oracle_updates += send
+
+    def _retail(self, module, pool: str, view: dict):
+        """retailer_bot_1.step / retailer_bot_2.step"""
+        wallet = module.BOT_ID
+        balances = view["balances"][wallet]
+        amount_mweth = self.draw(wallet, CONTROL.get("RETAIL_MIN_TRADE"), CONTROL.get("RETAIL_MAX_TRADE"))
+        price = pool_price(*view["pools"][pool]).astype(float) / 1e18
+        oracle_usd = view["oracle_price"].astype(float) / 10**PRICE_DECIMALS
+        amount_stable = _int(amount_mweth.astype(float) * price)
+
+        can_buy = balances[pool] >= amount_stable
+        can_sell = balances["mWETH"] >= amount_mweth
+        first = (price < oracle_usd * 1e18) & can_buy
+        sell = ~first & can_sell
+        buy = first | (~first & ~can_sell & can_buy)
+        bought = self.model.swap(wallet, pool, True, amount_stable, buy)[1]
+        self._count(buy, bought)
+        sold = self.model.swap(wallet, pool, False, amount_mweth, sell)[1]
+        self._count(sell, sold)
+
+        # on_failure of the first buy sells instead (half the balance when short of amount_mweth),
+        # on_failure of the sell sells half the balance; the buy without a better option has none
+        half = balances["mWETH"] // 2
+        sell_instead = first & ~bought
+        amount = np.where(sell_instead & can_sell, amount_mweth, half)
+        fallback = (sell_instead | (sell & ~sold)) & (amount > 0)
+        if fallback.any():
+            self.pending_fallbacks[wallet] = (amount, fallback)
+
+    def _retail_fallbacks(self):
+        """The retailers' fallback sells, sent on the receipts of the last block and mined first in this one"""
+        for module, pool in self.retailers:
+            pending = self.pending_fallbacks.pop(module.BOT_ID, None)
+            if pending is not None:
+                amount, on = pending
+                self._count(on, self.model.swap(module.BOT_ID, pool, False, amount, on)[1])
+                self.retail_fallbacks += on
+
+    def _profit(self, module, view: dict):
+        """profit_bot_1.step / profit_bot_2.step: liquidations, then the best router swap"""
+        model = self.model
+        wallet = module.BOT_ID
+        balances = view["balances"][wallet]
+        positions = view["positions"]
+        oracle_price = view["oracle_price"][:, None]
+        prices = liquidation_prices(positions[:, :, 0], positions[:, :, 1] + positions[:, :, 2])
+        # PositionBook.liquidatable, without our own position
+        targets = (prices > oracle_price) & (oracle_price > 0)
+        targets[:, model.column[model.addresses[wallet]]] = False
+        counts = targets.sum(axis=1)
+        if counts.any():
+            # borrow_if_needed deposits every mWETH held, then borrows LIQUIDATION_FUNDS of each stablecoin
+            funds = module.LIQUIDATION_FUNDS
+            deposit = (counts > 0) & ((balances["dUSD"] < funds) | (balances["dUSC"] < funds)) & (balances["mWETH"] > 0)
+            self._count(deposit, model.deposit_collateral(wallet, balances["mWETH"], deposit))
+            self._count(deposit, model.borrow(wallet, funds, funds, deposit))
+
+            # Ascending liquidation price, then address, as PositionBook returns them
+            keys = np.where(targets, prices * len(model.accounts) + np.arange(len(model.accounts)).astype(object), 2**256)
+            order = np.argsort(keys, axis=1, kind="stable")
+            liquidated = np.zeros(model.paths, dtype=np.int64)
+            for rank in range(int(counts.max())):
+                on = counts > rank
+                seized, ok = model.liquidate(wallet, order[:, rank], on)
+                self._count(on, ok)
+                liquidated += ok
+                self.liquidation_reverts += on & ~ok
+                self.seized = self.seized + seized
+            self.liquidations += liquidated
+            np.maximum(self.max_liquidations_per_tick, liquidated, out=self.max_liquidations_per_tick)
+
+        min_profit = CONTROL.get("ARB_MIN_PROFIT")
+        direction, amount_in, _ = find_arbitrage_batch(view["pools"], balances, CONTROL.get("ARB_MAX_TRADE"), min_profit)
+        for index, route in enumerate(ROUTES):
+            on = direction == index
+            if on.any():
+                deadline = view["timestamp"] + CONTROL.get("ARB_DEADLINE")
+                self._count(on, model.router_swap(wallet, route, amount_in, amount_in + min_profit, deadline, on)[1])
+
+    def _keep_peg(self, view: dict):
+        """The model-only peg keeper: trade each pool back to the oracle price through the MinterRedeemer"""
+        model = self.model
+        oracle_price = view["oracle_price"]
+        eth_price = oracle_price * PRICE_SCALE
+        priced = eth_price > 0
+        safe_price = np.where(priced, eth_price, 1)
+        for pool, (stable, weth) in view["pools"].items():
+            weth_balance = model.balances[PEG_KEEPER]["mWETH"]
+            product = stable * weth
+            # Pool price above the oracle: sell mWETH until the pool holds product / price of it, redeem the proceeds
+            weth_target = _isqrt(product * WAD // safe_price)
+            sell_amount = np.where(weth_target > weth, weth_target - weth, 0)
+            sell_amount = np.where(sell_amount < weth_balance, sell_amount, weth_balance)
+            sell = priced & (sell_amount > 0) & (redeem_amount(amount_out(sell_amount, weth, stable), oracle_price) > sell_amount)
+            stable_out, ok = model.swap(PEG_KEEPER, pool, False, sell_amount, sell)
+            self._count(sell, ok)
+            self._count(ok, model.redeem(PEG_KEEPER, pool, stable_out, ok)[1])
+
+            # Pool price below the oracle: mint what the pool lacks of product * price, buy mWETH with it
+            stable_target = _isqrt(product * eth_price // WAD)
+            needed = np.where(stable_target > stable, -((stable - stable_target) * WAD // safe_price), 0)
+            mint_in = np.where(needed < weth_balance, needed, weth_balance)
+            buy = priced & (mint_in > 0) & (amount_out(mint_amount(mint_in, oracle_price), stable, weth) > mint_in)
+            minted, ok = model.mint(PEG_KEEPER, pool, mint_in, buy)
+            self._count(buy, ok)
+            self._count(ok, model.swap(PEG_KEEPER, pool, True, minted, ok)[1])
+
+    def step(self, index: int, view: dict = None):
+        """One tick: every bot decides from the state at its start, then their transactions execute in order.
+
+        view replaces the state the bots decide from, for a chain changed
+        after the snapshot the bots read.
+        """
+        now = index * self.tick
+        view = self.model.view() if view is None else view
+        self._sample(view)
+        self.model.timestamp = self.start_timestamp + round((index + 1) * self.tick)
+
+        self._retail_fallbacks()
+        if now >= self.next_oracle:
+            self._oracle(now)
+            self.next_oracle = now + CONTROL.get("ORACLE_UPDATE_INTERVAL")
+        for module, pool in self.retailers:
+            if now >= self.next_trade[module.BOT_ID]:
+                self._retail(module, pool, view)
+                self.next_trade[module.BOT_ID] = now + CONTROL.get("RETAIL_TRADE_INTERVAL")
+        for module in self.profit_bots:
+            self._profit(module, view)
+        if self.keeper:
+            self._keep_peg(view)
+        self.ticks += 1
+
+    def run(self, ticks: int) -> dict:
+        started = time.perf_counter()
+        for index in range(ticks):
+            self.step(index)
+        wall_seconds = time.perf_counter() - started
+        return self.summary(wall_seconds)
+
+    def summary(self, wall_seconds: float) -> dict:
+        model = self.model
+        oracle_usd = model.oracle_price.astype(float) / 10**PRICE_DECIMALS
+        peg = {}
+        for pool, deviation in self.deviation.items():
+            end = pool_price(*model.pools[pool]).astype(float) / 1e18
+            peg[f"{pool}/mWETH"] = {
+                "mean_abs_bps": _distribution(deviation["sum_abs"] / max(self.ticks, 1)),
+                "max_abs_bps": _distribution(deviation["max_abs"]),
+                "end_bps": _distribution(np.where(oracle_usd > 0, (end / np.where(oracle_usd > 0, oracle_usd, 1) - 1) * 10000, 0))
+            }
+        simulated = self.ticks * self.tick
+        return {
+            "paths": model.paths,
+            "prices": self.source.name,
+            "ticks": self.ticks,
+            "tick_seconds": self.tick,
+            "simulated_seconds": simulated,
+            "wall_seconds": round(wall_seconds, 2),
+            "path_seconds_per_second": round(simulated * model.paths / wall_seconds) if wall_seconds else None,
+            "oracle_price_end": _distribution(oracle_usd),
+            "oracle_updates": _distribution(self.oracle_updates),
+            "peg_deviation": peg,
+            "liquidations": {
+                "succeeded": _distribution(self.liquidations),
+                "reverted": _distribution(self.liquidation_reverts),
+                "max_per_tick": _distribution(self.max_liquidations_per_tick),
+                # Paths where one tick saw more than one position liquidated
+                "cascade_paths": int((self.max_liquidations_per_tick > 1).sum()),
+                "seized_mweth": _distribution(self.seized.astype(float) / 1e18)
+            },
+            "transactions": _distribution(self.transactions),
+            "reverted_transactions": _distribution(self.reverted),
+            "retail_fallbacks": _distribution(self.retail_fallbacks),
+            "pnl_usd": {wallet: _distribution(model.wallet_value(wallet) - start)
+                        for wallet, start in self.start_values.items()}
+        }
+
+def _bot_wallets(w3: Web3) -> dict:
+    """Bot id -> address for every bot whose key is configured, as simulate.Simulation picks them"""
+    keys = ((retailer_bot_1, WALLET_1_KEY), (retailer_bot_2, WALLET_2_KEY), (profit_bot_1, WALLET_3_KEY), (profit_bot_2, WALLET_4_KEY))
+    return {module.BOT_ID: w3.eth.account.from_key(key).address for module, key in keys if key}
+
+def _zero_balance(w3: Web3, symbol: str, address: str):
+    """Clear an ERC20 balance in storage; OpenZeppelin's ERC20 keeps its balances mapping in slot 0"""
+    slot = int.from_bytes(Web3.solidity_keccak(["uint256", "uint256"], [int(address, 16), 0]), "big")
+    w3.provider.make_request("anvil_setStorageAt", [address_of(TOKENS[symbol]), hex(slot), "0x" + "00" * 32])
+
+def _differences(model: EcosystemModel, snap, lending_reserves: tuple) -> list:
+    """Every model value (path 0) that differs from the chain, as 'name: model != chain'"""
+    pairs = [("oracle price", model.oracle_price[0], snap.oracle_price)]
+    for pool, reserves in (("dUSD", snap.dusd_reserves), ("dUSC", snap.dusc_reserves)):
+        pairs += [(f"{pool} pool reserve {i}", model.pools[pool][i][0], reserves[i]) for i in range(2)]
+    pairs += [(f"{symbol} lending reserves", model.lending_reserves[symbol][0], value)
+              for symbol, value in zip(("dUSD", "dUSC"), lending_reserves)]
+    for wallet, address in model.addresses.items():
+        pairs += [(f"{wallet} {symbol}", model.balances[wallet][symbol][0], snap.balances[address][symbol]) for symbol in SYMBOLS]
+    for address in model.accounts:
+        pairs += [(f"position of {address}", tuple(model.positions[0, model.column[address]]), tuple(snap.positions[address]))]
+    return [f"{name}: {ours} != {theirs}" for name, ours, theirs in pairs if ours != theirs]
+
+def check_minter(w3: Web3, key: str) -> int:
+    """Mint and redeem dUSD of several sizes from one wallet, compare the event amounts with the model; failures"""
+    minter = get_contract(w3, "minter")
+    submitter = TransactionSubmitter(w3)
+    allowances = AllowanceManager(w3, submitter)
+    account = w3.eth.account.from_key(key)
+    failed = 0
+    balance = call_view(w3, "mweth", "balanceOf", account.address)
+    for amount in (1, 10**9, 10**15, balance // 2):
+        if not 0 < amount <= balance:
+            continue
+        price = call_view(w3, "oracle", "latestRoundData")[1]
+        allowances.ensure(account, MWETH_ADDRESS, MINTER_REDEEMER_ADDRESS, amount)
+        receipt = submitter.send(account, minter.functions.mintDUSD(amount), 200000, "mintDUSD").result(timeout=60)
+        minted = minter.events.MintDUSD().process_receipt(receipt)[0]["args"]["dusdAmount"]
+        expected = mint_amount(amount, price)
+        failed += minted != expected
+        print(f"  {'ok  ' if minted == expected else 'FAIL'} mintDUSD({amount}): model {expected}, contract {minted}")
+
+        allowances.ensure(account, address_of("dusd"), MINTER_REDEEMER_ADDRESS, minted)
+        receipt = submitter.send(account, minter.functions.redeemDUSD(minted), 200000, "redeemDUSD").result(timeout=60)
+        redeemed = minter.events.RedeemDUSD().process_receipt(receipt)[0]["args"]["mwethAmount"]
+        expected = int(redeem_amount(np.array([minted], dtype=object), price)[0])
+        failed += redeemed != expected
+        print(f"  {'ok  ' if redeemed == expected else 'FAIL'} redeemDUSD({minted}): model {expected}, contract {redeemed}")
+    return failed
+
+def verify(w3: Web3, ticks: int, seed: int, tick: float, volatility: float, borrower_count: int) -> int:
+    """Run simulate.py and a one-path model side by side from the same chain state; number of failed checks"""
+    from simulate import Simulation
+    simulation = Simulation(w3, seed, tick, volatility=volatility)
+    wallets = _bot_wallets(w3)
+    oracle_price = call_view(w3, "oracle", "latestRoundData")[1]
+    borrowers = make_borrowers(borrower_count, seed, oracle_price)
+    for address, position in borrowers.items():
+        # Written to storage like bench_positions, so the position book is told about them directly
+        set_position(w3, address, *position)
+        simulation.book.set_position(address, *position)
+
+    model = EcosystemModel.from_chain(w3, 1, wallets, list(borrowers))
+    clock = SimClock()
+    source = SourcePaths(RandomWalkSource(model.oracle_price[0], volatility, seed, clock=clock), clock, 1)
+    monte_carlo = MonteCarlo(model, source, RandomDraws(seed, 1), tick)
+    failures = []
+    # Halfway through, the retailers' stablecoins are taken after the snapshot they trade on, so a buy
+    # reverts and the fallback sell follows in the next block
+    drain_tick = ticks // 2
+    stale_view = None
+
+    def compare(index: int, _):
+        nonlocal stale_view
+        monte_carlo.step(index, stale_view)
+        stale_view = None
+        snap = snapshot(w3, list(wallets.values()), list(borrowers))
+        lending_reserves = (call_view(w3, "lending", "dusdReserves"), call_view(w3, "lending", "duscReserves"))
+        differences = _differences(model, snap, lending_reserves)
+        if differences and not failures:
+            print(f"  FAIL first divergence after tick {index}:")
+            for difference in differences:
+                print(f"    {difference}")
+        failures.extend(differences)
+        if index == drain_tick:
+            stale_view = model.view()
+            for module, pool in RETAILERS:
+                if module.BOT_ID in wallets:
+                    _zero_balance(w3, pool, wallets[module.BOT_ID])
+                    model.balances[module.BOT_ID][pool] = _ints(0, model.paths)
+
+    summary = simulation.run(ticks, on_tick=compare)
+    print(f"  {'ok  ' if not failures else 'FAIL'} {ticks} ticks, {summary['transactions']} transactions, "
+          f"{monte_carlo.retail_fallbacks[0]} retail fallbacks, {summary['step_errors']} bot step errors, "
+          f"{len(failures)} differing values")
+    failed = len(failures) > 0
+    if WALLET_1_KEY:
+        failed += check_minter(w3, WALLET_1_KEY)
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Monte Carlo over many paths")
+    run_parser.add_argument("--paths", type=int, default=1000)
+    run_parser.add_argument("--days", type=float, default=1, help="simulated days per path")
+    run_parser.add_argument("--tick", type=float, default=60, help="simulated seconds per block")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--volatility", type=float, default=DEFAULT_VOLATILITY, help="annualized random walk volatility")
+    run_parser.add_argument("--prices", help="CSV or Parquet price path replayed on every path instead of random walks")
+    run_parser.add_argument("--borrowers", type=int, default=0, help="synthetic lending positions")
+    run_parser.add_argument("--arb-funds", type=float, default=0, help="extra dUSD and dUSC given to each profit bot")
+    run_parser.add_argument("--keeper-weth", type=float, default=0, help="mWETH of the model-only peg keeper, 0 for none")
+    run_parser.add_argument("--from-chain", action="store_true", help="start from the deployment on RPC_URL")
+    run_parser.add_argument("--out", help="write the summary JSON here as well")
+    verify_parser = commands.add_parser("verify", help="compare one path with simulate.py on anvil")
+    verify_parser.add_argument("--ticks", type=int, default=120)
+    verify_parser.add_argument("--tick", type=float, default=60)
+    verify_parser.add_argument("--seed", type=int, default=0)
+    verify_parser.add_argument("--volatility", type=float, default=DEFAULT_VOLATILITY)
+    verify_parser.add_argument("--borrowers", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.command == "verify" or args.from_chain:
+        w3 = Web3(Web3.HTTPProvider(RPC_URL))
+        if not w3.is_connected():
+            print("Failed to connect to RPC")
+            return 1
+
+    if args.command == "verify":
+        snapshot_id = w3.provider.make_request("evm_snapshot", [])["result"]
+        try:
+            failed = verify(w3, args.ticks, args.seed, args.tick, args.volatility, args.borrowers)
+        finally:
+            w3.provider.make_request("evm_revert", [snapshot_id])
+        print("All checks passed" if not failed else f"{failed} checks failed")
+        return 1 if failed else 0
+
+    if args.from_chain:
+        if args.arb_funds or args.keeper_weth:
+            print("--arb-funds and --keeper-weth only apply to the deployed state")
+            return 1
+        # Synthetic positions are added to the model only, the chain is not touched
+        borrowers = make_borrowers(args.borrowers, args.seed, call_view(w3, "oracle", "latestRoundData")[1])
+        model = EcosystemModel.from_chain(w3, args.paths, _bot_wallets(w3), positions=borrowers)
+    else:
+        model = EcosystemModel.deployed(args.paths, make_borrowers(args.borrowers, args.seed),
+                                        int(args.arb_funds * WAD), int(args.keeper_weth * WAD))
+
+    if args.prices:
+        clock = SimClock()
+        source = SourcePaths(ReplaySource(args.prices, speedup=1, clock=clock), clock, args.paths)
+    else:
+        source = RandomWalkPaths(int(model.oracle_price[0]), args.volatility, args.seed, args.paths)
+    monte_carlo = MonteCarlo(model, source, NumpyDraws(args.seed, args.paths), args.tick)
+    summary = monte_carlo.run(int(args.days * 86400 / args.tick))
+
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
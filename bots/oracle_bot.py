@@ -1,74 +1,124 @@
 """
-Oracle bot that fetches ETH price from Binance and updates the oracle contract
+Oracle bot that reads the ETH price from a price source and updates the oracle contract
+
+The price is checked every ORACLE_UPDATE_INTERVAL seconds but only sent on
+chain when it moved ORACLE_DEVIATION_BPS from the last price sent or the
+ORACLE_HEARTBEAT expired, so a quiet market costs a transaction per
+heartbeat instead of one per check.
 """
 import time
-import requests
 from web3 import Web3
-from config import RPC_URL, ORACLE_ADDRESS, LOG_FILE
-from utils import log_message, check_kill_switch
+from transport import connect_rpc
+from utils import log_message, log_when_confirmed, TransactionSubmitter
+from contracts import get_contract
+from control import CONTROL
+from metrics import instrument
+from prices import PriceSource, make_source
+
+# Use a default account (you may need to set up a dedicated account)
+# For local Anvil, we can use the default account
+ORACLE_KEY = "0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80"  # Anvil default
+
+# Name used to pause this bot through the control plane
+BOT_ID = "oracle_bot"
+
+class UpdatePolicy:
+    """Remembers the last price sent on chain and decides whether a new one is worth a transaction"""
 
-def get_binance_price():
-    """Fetch ETH/USDT price from Binance"""
-    try:
-        response = requests.get("https://api.binance.com/api/v3/ticker/price?symbol=ETHUSDT", timeout=5)
-        data = response.json()
-        price = float(data["price"])
-        return int(price * 1e8)  # Convert to 8 decimals (Chainlink format)
-    except Exception as e:
-        log_message(f"Error fetching Binance price: {e}", "ERROR")
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.last_price = None
+        self.last_sent = None
+        self.sent = 0
+        self.skipped = 0
+        self.pending = None  # update sent but not mined yet
+
+    def reason(self, price: int, deviation_bps: float, heartbeat: float):
+        """Why price should be sent now, or None if it should not"""
+        if self.pending is not None:
+            # The chain may still move to the last price sent; a second update would race it
+            return None
+        if self.last_price is None:
+            return "first price"
+        deviation = abs(price - self.last_price) * 10000 / self.last_price
+        if deviation >= deviation_bps:
+            return f"moved {deviation:.1f} bps"
+        if heartbeat and self.clock() - self.last_sent >= heartbeat:
+            return "heartbeat"
         return None
 
-def update_oracle_price(w3: Web3, account, oracle_address: str, price: int):
+    def record(self, price: int):
+        self.last_price = price
+        self.last_sent = self.clock()
+        self.sent += 1
+
+    def track(self, pending, price: int):
+        """Record price once its update is mined; a reverted or dropped update leaves the last price as it was"""
+        self.pending = pending
+
+        def settled(future):
+            self.pending = None
+            if future.exception() is None:
+                self.record(price)
+        pending.add_done_callback(settled)
+
+def update_oracle_price(w3: Web3, submitter: TransactionSubmitter, account, price: int, reason: str = ""):
     """Update oracle price on chain"""
-    abi = [{"inputs": [{"internalType": "int256", "name": "_price", "type": "int256"}], "name": "setPrice", "outputs": [], "stateMutability": "nonpayable", "type": "function"}]
-    contract = w3.eth.contract(address=oracle_address, abi=abi)
+    contract = get_contract(w3, "oracle")
     
-    tx = contract.functions.setPrice(price).build_transaction({
-        "from": account.address,
-        "nonce": w3.eth.get_transaction_count(account.address),
-        "gas": 100000,
-        "gasPrice": w3.eth.gas_price
+    pending = submitter.send(account, contract.functions.setPrice(price), 100000, "setPrice")
+    log_when_confirmed(pending, f"Oracle price updated to ${price / 1e8:.2f}" + (f" ({reason})" if reason else ""), "ORACLE", {
+        "type": "oracle_update",
+        "oracle_price": price
     })
-    
-    signed_tx = account.sign_transaction(tx)
-    tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-    
-    log_message(f"Oracle price updated to ${price / 1e8:.2f} (tx: {tx_hash.hex()})")
-    return receipt
+    return pending
+
+def step(w3: Web3, submitter: TransactionSubmitter, account, source: PriceSource, policy: UpdatePolicy):
+    """Read the current price and push it on chain if the policy says it is due"""
+    price = source.fetch()
+    if not price:
+        return
+    reason = policy.reason(price, CONTROL.get("ORACLE_DEVIATION_BPS"), CONTROL.get("ORACLE_HEARTBEAT"))
+    if reason is None:
+        # Small moves would only wake every subscribed bot for nothing
+        policy.skipped += 1
+        return
+    policy.track(update_oracle_price(w3, submitter, account, price, reason), price)
 
 def main():
     """Main oracle bot loop"""
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    w3 = instrument(connect_rpc(), BOT_ID)
     
     if not w3.is_connected():
         log_message("Failed to connect to RPC", "ERROR")
         return
     
-    # Use a default account (you may need to set up a dedicated account)
-    # For local Anvil, we can use the default account
-    account = w3.eth.account.from_key("0xac0974bec39a17e36ba4a6b4d238ff944bacb478cbed5efcae784d7bf4f2ff80")  # Anvil default
+    account = w3.eth.account.from_key(ORACLE_KEY)
+    submitter = TransactionSubmitter(w3)
+    CONTROL.start()
     
-    log_message("Oracle bot started")
+    source = make_source()
+    policy = UpdatePolicy()
+    log_message(f"Oracle bot started (prices from {source.name})")
     
     # Initial price update
-    price = get_binance_price()
+    price = source.fetch()
     if price:
-        update_oracle_price(w3, account, ORACLE_ADDRESS, price)
+        # The rest of the ecosystem must not start before the first price is on chain
+        update_oracle_price(w3, submitter, account, price, "initial price").result()
+        policy.record(price)
         log_message("Initial oracle price set")
     
-    # Main loop
-    while not check_kill_switch():
+    # Main loop; the sleep ends early on a stop
+    while not CONTROL.stopped:
         try:
-            price = get_binance_price()
-            if price:
-                update_oracle_price(w3, account, ORACLE_ADDRESS, price)
-            time.sleep(5)  # Update every 5 seconds
+            if not CONTROL.paused(BOT_ID):
+                step(w3, submitter, account, source, policy)
         except Exception as e:
             log_message(f"Error in oracle bot loop: {e}", "ERROR")
-            time.sleep(5)
+        CONTROL.wait(CONTROL.get("ORACLE_UPDATE_INTERVAL"))
     
-    log_message("Oracle bot stopped")
+    log_message(f"Oracle bot stopped ({policy.sent} updates sent, {policy.skipped} checks skipped)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,153 @@
+"""
+Off-chain LendingProtocol position book with precomputed liquidation prices
+
+Positions are rebuilt from DepositCollateral / WithdrawCollateral / Borrow /
+Repay / Liquidate logs and mirror LendingProtocol.positions. For every borrower
+the oracle price below which canLiquidate turns true is computed once per
+position change and kept in a sorted list, so finding the liquidatable
+accounts for a new oracle price is a binary search instead of one eth_call per
+borrower. get_positions / get_liquidatable read many positions on chain in one
+eth_call through LendingProtocol's batch views.
+"""
+import bisect
+import threading
+from web3 import Web3
+from config import INDEX_CHUNK_SIZE
+from contracts import address_of, call_view, decode_log, event_topics
+
+# LendingProtocol.LIQUIDATION_THRESHOLD
+LIQUIDATION_THRESHOLD = 120 * 10**16
+
+# Addresses per batch view eth_call, keeping 1000 cold positions well under the node's call gas cap
+VIEW_BATCH_SIZE = 1000
+
+def get_positions(w3: Web3, users: list, block_identifier="latest") -> dict:
+    """user -> (collateral, dusdDebt, duscDebt, collateralization ratio, liquidatable) via getPositions.
+
+    The ratio is 2**256 - 1 for positions without debt. Reverts while the
+    oracle price is unset, like getCollateralizationRatio.
+    """
+    positions = {}
+    for start in range(0, len(users), VIEW_BATCH_SIZE):
+        batch = users[start:start + VIEW_BATCH_SIZE]
+        for user, *fields in call_view(w3, "lending", "getPositions", batch, block_identifier=block_identifier):
+            positions[Web3.to_checksum_address(user)] = tuple(fields)
+    return positions
+
+def get_liquidatable(w3: Web3, users: list, block_identifier="latest") -> list:
+    """The users whose position canLiquidate, in input order, via getLiquidatable"""
+    liquidatable = []
+    for start in range(0, len(users), VIEW_BATCH_SIZE):
+        batch = users[start:start + VIEW_BATCH_SIZE]
+        liquidatable += [Web3.to_checksum_address(user) for user in call_view(w3, "lending", "getLiquidatable", batch, block_identifier=block_identifier)]
+    return liquidatable
+
+def liquidation_price(collateral: int, dusd_debt: int, dusc_debt: int) -> int:
+    """Lowest 8-decimal oracle price at which the position is safe, 0 if it can never be liquidated.
+
+    canLiquidate computes collateralValue = collateral * price * 1e10 / 1e18 and
+    ratio = collateralValue * 1e18 / (debt * 1e18) with floor divisions, and
+    ratio < LIQUIDATION_THRESHOLD reduces exactly to
+    collateral * price < LIQUIDATION_THRESHOLD * debt * 1e8. The position is
+    liquidatable iff price < the returned value.
+    """
+    debt = dusd_debt + dusc_debt
+    if collateral == 0 or debt == 0:
+        return 0
+    return -(-LIQUIDATION_THRESHOLD * debt * 10**8 // collateral)
+
+class PositionBook:
+    """All lending positions, indexed by liquidation price"""
+
+    def __init__(self):
+        self.positions = {}  # user -> [collateral, dusdDebt, duscDebt]
+        self.block_number = -1  # last block whose logs were applied
+        self._prices = {}  # user -> liquidation price
+        self._sorted = []  # (liquidation price, user), ascending
+        self._lock = threading.RLock()
+
+    def _reindex(self, user: str):
+        old = self._prices.pop(user, None)
+        if old is not None:
+            del self._sorted[bisect.bisect_left(self._sorted, (old, user))]
+        price = liquidation_price(*self.positions[user])
+        if price:
+            self._prices[user] = price
+            bisect.insort(self._sorted, (price, user))
+
+    def set_position(self, user: str, collateral: int, dusd_debt: int, dusc_debt: int):
+        user = Web3.to_checksum_address(user)
+        with self._lock:
+            self.positions[user] = [collateral, dusd_debt, dusc_debt]
+            self._reindex(user)
+
+    def apply(self, event: str, args: dict):
+        """Apply one decoded LendingProtocol event except Liquidate, which needs the chain (see sync)"""
+        with self._lock:
+            # Decoded logs carry lowercase addresses; bots compare against checksummed account addresses
+            user = Web3.to_checksum_address(args["user"])
+            position = self.positions.setdefault(user, [0, 0, 0])
+            if event == "DepositCollateral":
+                position[0] += args["amount"]
+            elif event == "WithdrawCollateral":
+                position[0] -= args["amount"]
+            elif event == "Borrow":
+                position[1] += args["dusdAmount"]
+                position[2] += args["duscAmount"]
+            elif event == "Repay":
+                position[1] -= args["dusdAmount"]
+                position[2] -= args["duscAmount"]
+            else:
+                return
+            self._reindex(user)
+
+    def liquidatable(self, oracle_price: int) -> list:
+        """Users whose position canLiquidate at this 8-decimal oracle price"""
+        if oracle_price <= 0:
+            # getEthPrice reverts, and so does canLiquidate
+            return []
+        with self._lock:
+            # Entries with a liquidation price above oracle_price; (p,) sorts before every (p, user)
+            start = bisect.bisect_left(self._sorted, (oracle_price + 1,))
+            return [user for _, user in self._sorted[start:]]
+
+    def crossed(self, old_price: int, new_price: int) -> list:
+        """Users that became liquidatable when the oracle moved from old_price to new_price"""
+        if new_price >= old_price:
+            return []
+        with self._lock:
+            start = bisect.bisect_left(self._sorted, (new_price + 1,))
+            end = bisect.bisect_left(self._sorted, (old_price + 1,))
+            return [user for _, user in self._sorted[start:end]]
+
+    def sync(self, w3: Web3, to_block: int, chunk_size: int = INDEX_CHUNK_SIZE):
+        """Apply LendingProtocol logs up to to_block.
+
+        Liquidate only reports the total debt repaid, so the liquidated position
+        is re-read with positions() at that block. If the chain got shorter
+        (evm_revert on anvil) the book is rebuilt from genesis.
+        """
+        with self._lock:
+            if to_block < self.block_number:
+                self.positions, self._prices, self._sorted = {}, {}, []
+                self.block_number = -1
+            lending = address_of("lending")
+            topics = list(event_topics("lending"))
+            from_block = self.block_number + 1
+            while from_block <= to_block:
+                chunk_end = min(from_block + chunk_size - 1, to_block)
+                logs = w3.eth.get_logs({"fromBlock": from_block, "toBlock": chunk_end, "address": lending, "topics": [topics]})
+                # Positions re-read at the end of a block already include that block's later events
+                resynced = set()
+                for log in logs:
+                    event, args = decode_log("lending", ["0x" + bytes(topic).hex() for topic in log["topics"]], bytes(log["data"]))
+                    if (args["user"], log["blockNumber"]) in resynced:
+                        continue
+                    if event == "Liquidate":
+                        user = args["user"]
+                        self.set_position(user, *call_view(w3, "lending", "positions", user, block_identifier=log["blockNumber"]))
+                        resynced.add((user, log["blockNumber"]))
+                    else:
+                        self.apply(event, args)
+                self.block_number = chunk_end
+                from_block = chunk_end + 1
@@ -0,0 +1,239 @@
+"""
+ETH/USD price sources for the oracle bot
+
+BinanceSource polls the Binance ticker over one pooled HTTPS session.
+ReplaySource plays back historical prices from a CSV or Parquet file, sped up
+by a constant factor and looping at the end, so the ecosystem runs without
+network access. RandomWalkSource generates a seeded path for simulations.
+make_source() picks one from an ORACLE_SOURCE spec.
+
+Prices are integers with 8 decimals, as the oracle stores them.
+
+Usage:
+    python prices.py download eth_prices.csv --days 7      # Binance 1m closes for offline replay
+    python prices.py replay eth_prices.csv --speedup 60    # print the replayed price every second
+"""
+import argparse
+import csv
+import math
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import ORACLE_SOURCE, ORACLE_REPLAY_SPEEDUP
+from utils import log_message
+
+PRICE_DECIMALS = 8
+
+BINANCE_API = "https://api.binance.com/api/v3"
+
+# Column names accepted for replay files, first match wins
+TIME_COLUMNS = ("timestamp", "time", "open_time", "date", "datetime")
+PRICE_COLUMNS = ("price", "close", "eth_usd")
+
+def binance_session() -> requests.Session:
+    """Keep-alive session that retries transient failures instead of reconnecting per request"""
+    session = requests.Session()
+    retries = Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504))
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retries))
+    return session
+
+class PriceSource(ABC):
+    """Latest ETH/USD price with PRICE_DECIMALS decimals, None when it cannot be read"""
+
+    name = "price source"
+
+    @abstractmethod
+    def fetch(self):
+        ...
+
+class BinanceSource(PriceSource):
+    """ETHUSDT ticker price"""
+
+    name = "Binance"
+
+    def __init__(self, symbol: str = "ETHUSDT", timeout: float = 5.0, session: requests.Session = None):
+        self.symbol = symbol
+        self.timeout = timeout
+        self.session = session or binance_session()
+
+    def fetch(self):
+        try:
+            response = self.session.get(f"{BINANCE_API}/ticker/price", params={"symbol": self.symbol}, timeout=self.timeout)
+            response.raise_for_status()
+            return int(float(response.json()["price"]) * 10**PRICE_DECIMALS)
+        except Exception as e:
+            log_message(f"Error fetching Binance price: {e}", "ERROR")
+            return None
+
+def parse_time(value) -> float:
+    """Unix seconds from seconds, milliseconds or an ISO 8601 string"""
+    try:
+        timestamp = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed.timestamp()
+    # Binance and most exchange exports use milliseconds
+    return timestamp / 1000 if timestamp > 1e11 else timestamp
+
+def pick_column(columns, candidates: tuple, path: str) -> str:
+    lowered = {column.lower(): column for column in columns}
+    for candidate in candidates:
+        if candidate in lowered:
+            return lowered[candidate]
+    raise ValueError(f"{path} has none of the columns {', '.join(candidates)}")
+
+def load_prices(path: str) -> tuple:
+    """(timestamps, prices) sorted by time from a CSV or Parquet file, prices in USD as float"""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError(f"reading {path} needs pyarrow (pip install pyarrow)") from None
+        table = pq.read_table(path)
+        time_column = pick_column(table.column_names, TIME_COLUMNS, path)
+        price_column = pick_column(table.column_names, PRICE_COLUMNS, path)
+        times = table.column(time_column).to_pylist()
+        prices = table.column(price_column).to_pylist()
+        if times and isinstance(times[0], datetime):
+            times = [t.replace(tzinfo=t.tzinfo or timezone.utc).timestamp() for t in times]
+    else:
+        with open(path, newline="") as f:
+            reader = csv.DictReader(f)
+            time_column = pick_column(reader.fieldnames or (), TIME_COLUMNS, path)
+            price_column = pick_column(reader.fieldnames or (), PRICE_COLUMNS, path)
+            rows = [(row[time_column], row[price_column]) for row in reader]
+        times = [row[0] for row in rows]
+        prices = [row[1] for row in rows]
+
+    if not prices:
+        raise ValueError(f"{path} contains no prices")
+    timestamps = np.array([parse_time(t) for t in times], dtype=np.float64)
+    prices = np.array(prices, dtype=np.float64)
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], prices[order]
+
+class ReplaySource(PriceSource):
+    """Historical prices replayed speedup times faster than they were recorded.
+
+    Replay starts at the first row on the first fetch. Each fetch returns the
+    last recorded price at or before the replayed time; after the last row
+    the file starts over unless loop is False, in which case the last price
+    is held.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: str, speedup: float = ORACLE_REPLAY_SPEEDUP, loop: bool = True, clock=time.monotonic):
+        if speedup <= 0:
+            raise ValueError("speedup must be positive")
+        self.path = path
+        self.speedup = speedup
+        self.loop = loop
+        self.clock = clock
+        self.timestamps, usd_prices = load_prices(path)
+        self.prices = np.rint(usd_prices * 10**PRICE_DECIMALS).astype(np.int64)
+        self.span = self.timestamps[-1] - self.timestamps[0]
+        self.started = None
+        self.name = f"replay of {path} at {speedup:g}x"
+
+    def replay_time(self) -> float:
+        """Recorded time currently being replayed"""
+        if self.started is None:
+            self.started = self.clock()
+        elapsed = (self.clock() - self.started) * self.speedup
+        if self.span > 0 and self.loop:
+            elapsed %= self.span
+        return self.timestamps[0] + min(elapsed, self.span)
+
+    def fetch(self):
+        index = np.searchsorted(self.timestamps, self.replay_time(), side="right") - 1
+        return int(self.prices[max(index, 0)])
+
+class RandomWalkSource(PriceSource):
+    """Seeded geometric random walk, for simulations without a recorded price file.
+
+    volatility is annualized (0.6 is typical for ETH). The walk advances by
+    the clock time elapsed since the previous fetch, so the same seed and the
+    same fetch times always give the same path.
+    """
+
+    name = "random walk"
+
+    def __init__(self, start_price: int, volatility: float, seed: int, clock=time.monotonic):
+        self.price = start_price / 10**PRICE_DECIMALS
+        self.sigma = volatility / math.sqrt(365 * 86400)
+        self.rng = np.random.default_rng(seed)
+        self.clock = clock
+        self.last = None
+        self.name = f"random walk at {volatility:.0%} volatility, seed {seed}"
+
+    def fetch(self):
+        now = self.clock()
+        if self.last is not None and now > self.last:
+            elapsed = now - self.last
+            self.price *= math.exp(self.sigma * math.sqrt(elapsed) * self.rng.standard_normal()
+                                   - self.sigma**2 * elapsed / 2)
+        self.last = now
+        return int(round(self.price * 10**PRICE_DECIMALS))
+
+def make_source(spec: str = ORACLE_SOURCE) -> PriceSource:
+    """"binance" or "replay:<file>" (CSV or Parquet)"""
+    kind, _, argument = spec.partition(":")
+    if kind == "binance":
+        return BinanceSource(argument or "ETHUSDT")
+    if kind == "replay" and argument:
+        return ReplaySource(argument)
+    raise ValueError(f"Unknown price source {spec!r}, expected 'binance' or 'replay:<file>'")
+
+def download(path: str, days: float, interval: str = "1m", symbol: str = "ETHUSDT"):
+    """Write Binance kline closes of the last days to a CSV file usable by ReplaySource"""
+    session = binance_session()
+    end = int(time.time() * 1000)
+    start = end - int(days * 86400 * 1000)
+    rows = 0
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(("timestamp", "price"))
+        while start < end:
+            response = session.get(f"{BINANCE_API}/klines", timeout=10, params={
+                "symbol": symbol, "interval": interval, "startTime": start, "endTime": end, "limit": 1000})
+            response.raise_for_status()
+            klines = response.json()
+            if not klines:
+                break
+            # Close time and close price of each candle
+            writer.writerows((kline[6] // 1000, kline[4]) for kline in klines)
+            rows += len(klines)
+            start = klines[-1][6] + 1
+    print(f"Wrote {rows} prices to {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    download_parser = commands.add_parser("download", help="save Binance prices for offline replay")
+    download_parser.add_argument("path")
+    download_parser.add_argument("--days", type=float, default=7)
+    download_parser.add_argument("--interval", default="1m", help="Binance kline interval")
+    replay_parser = commands.add_parser("replay", help="print a replayed price every second")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--speedup", type=float, default=ORACLE_REPLAY_SPEEDUP)
+    args = parser.parse_args()
+
+    if args.command == "download":
+        download(args.path, args.days, args.interval)
+        return
+    source = ReplaySource(args.path, args.speedup)
+    while True:
+        price = source.fetch()
+        recorded = datetime.fromtimestamp(source.replay_time(), timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        print(f"{recorded}  ${price / 10**PRICE_DECIMALS:,.2f}")
+        time.sleep(1)
+
+if __name__ == "__main__":
+    main()
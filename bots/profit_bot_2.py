@@ -1,169 +1,111 @@
 """
-Profit bot 2 - arbitrage and liquidation bot (monitors wallet 3)
+Profit bot 2 - arbitrage and liquidation bot (monitors every borrower)
 """
-import time
 from web3 import Web3
-from config import RPC_URL, DEX_ADDRESS, DUSD_ADDRESS, DUSC_ADDRESS, MWETH_ADDRESS, WALLET_4_KEY, LENDING_ADDRESS, ORACLE_ADDRESS, WALLET_3_KEY
-from utils import log_message, check_kill_switch, log_statistics, log_wallet_balances, format_ether, get_balance
+from config import DEX_ADDRESS, DUSD_ADDRESS, DUSC_ADDRESS, MWETH_ADDRESS, WALLET_4_KEY, LENDING_ADDRESS
+from transport import connect_rpc
+from utils import log_message, log_balances, format_ether, log_when_confirmed, TransactionSubmitter, AllowanceManager, MAX_UINT256
+from contracts import get_contract
+from control import CONTROL
+from metrics import instrument
+from snapshot import snapshot, Snapshot
+from positions import PositionBook
+from ledger import BalanceLedger
+from quote import find_arbitrage, Opportunity
+from events import ChainWatcher, SWAP_EVENTS, ORACLE_EVENTS, LENDING_EVENTS
 
-def get_oracle_price(w3: Web3, oracle_address: str) -> float:
-    """Get current ETH price from oracle"""
-    abi = [{"inputs": [], "name": "latestRoundData", "outputs": [{"name": "", "type": "uint80"}, {"name": "", "type": "int256"}, {"name": "", "type": "uint256"}, {"name": "", "type": "uint256"}, {"name": "", "type": "uint80"}], "stateMutability": "view", "type": "function"}]
-    contract = w3.eth.contract(address=oracle_address, abi=abi)
-    _, price, _, _, _ = contract.functions.latestRoundData().call()
-    return float(price) / 1e8
+# Pool prices, the oracle price and lending positions decide both arbitrage and liquidation
+WAKE_EVENTS = SWAP_EVENTS | ORACLE_EVENTS | LENDING_EVENTS
 
-def get_pool_prices(w3: Web3, dex_address: str) -> tuple:
-    """Get both pool prices"""
-    abi = [
-        {"inputs": [], "name": "getDUSDPrice", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"},
-        {"inputs": [], "name": "getDUSCPrice", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"}
-    ]
-    contract = w3.eth.contract(address=dex_address, abi=abi)
-    dusd_price = float(contract.functions.getDUSDPrice().call()) / 1e18
-    dusc_price = float(contract.functions.getDUSCPrice().call()) / 1e18
-    return dusd_price, dusc_price
+# Name used to pause this bot through the control plane
+BOT_ID = "profit_bot_2"
 
-def check_arbitrage_opportunity(w3: Web3, dex_address: str, oracle_price: float) -> tuple:
-    """Check for arbitrage opportunities between pools"""
-    dusd_price, dusc_price = get_pool_prices(w3, dex_address)
-    oracle_price_wei = oracle_price * 1e18
-    
-    price_diff = abs(dusd_price - dusc_price)
-    if price_diff > dusd_price * 0.01:  # 1% difference
-        if dusd_price < dusc_price:
-            return ("dusd_to_dusc", dusd_price, dusc_price)
-        else:
-            return ("dusc_to_dusd", dusd_price, dusc_price)
-    return (None, dusd_price, dusc_price)
+# dUSD and dUSC kept on hand to repay liquidated debt, borrowed when short
+LIQUIDATION_FUNDS = 1000 * 10**18
+
+# Router swap of each cycle: (SimpleDEX function, its input token, route for logs)
+ARBITRAGE_ROUTES = {
+    "dusd_to_dusc": ("swapDUSDForDUSC", DUSD_ADDRESS, "dUSD->mWETH->dUSC"),
+    "dusc_to_dusd": ("swapDUSCForDUSD", DUSC_ADDRESS, "dUSC->mWETH->dUSD")
+}
+
+# Event and argument carrying the output of each cycle's second leg
+ARBITRAGE_OUTPUTS = {
+    "dusd_to_dusc": ("SwapWETHForDUSC", "duscOut"),
+    "dusc_to_dusd": ("SwapWETHForDUSD", "dusdOut")
+}
 
-def execute_arbitrage(w3: Web3, account, dex_address: str, direction: str, amount: int) -> bool:
+def realized_profit(swap, opportunity: Opportunity) -> str:
+    """Profit of a mined router swap, from its second leg's event"""
+    event, output = ARBITRAGE_OUTPUTS[opportunity.direction]
+    return f"realized profit {format_ether(swap.event(event)[output] - opportunity.amount_in):.4f}"
+
+def execute_arbitrage(w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, account, dex_address: str, opportunity: Opportunity, deadline: int, prices: dict) -> bool:
     """Execute arbitrage trade"""
     try:
-        if direction == "dusd_to_dusc":
-            abi = [
-                {"inputs": [{"name": "dusdIn", "type": "uint256"}], "name": "swapDUSDForWETH", "outputs": [{"name": "wethOut", "type": "uint256"}], "stateMutability": "nonpayable", "type": "function"},
-                {"inputs": [{"name": "wethIn", "type": "uint256"}], "name": "swapWETHForDUSC", "outputs": [{"name": "duscOut", "type": "uint256"}], "stateMutability": "nonpayable", "type": "function"}
-            ]
-            contract = w3.eth.contract(address=dex_address, abi=abi)
-            
-            approve_abi = [{"inputs": [{"name": "spender", "type": "address"}, {"name": "amount", "type": "uint256"}], "name": "approve", "outputs": [{"name": "", "type": "bool"}], "stateMutability": "nonpayable", "type": "function"}]
-            dusd_contract = w3.eth.contract(address=DUSD_ADDRESS, abi=approve_abi)
-            dusd_contract.functions.approve(dex_address, amount).transact({
-                "from": account.address,
-                "gas": 100000,
-                "gasPrice": w3.eth.gas_price
-            })
-            
-            tx1 = contract.functions.swapDUSDForWETH(amount).build_transaction({
-                "from": account.address,
-                "nonce": w3.eth.get_transaction_count(account.address),
-                "gas": 200000,
-                "gasPrice": w3.eth.gas_price
-            })
-            signed_tx1 = account.sign_transaction(tx1)
-            tx_hash1 = w3.eth.send_raw_transaction(signed_tx1.rawTransaction)
-            receipt1 = w3.eth.wait_for_transaction_receipt(tx_hash1)
-            
-            mweth_balance = get_balance(w3, account.address, MWETH_ADDRESS)
-            mweth_contract = w3.eth.contract(address=MWETH_ADDRESS, abi=approve_abi)
-            mweth_contract.functions.approve(dex_address, mweth_balance).transact({
-                "from": account.address,
-                "gas": 100000,
-                "gasPrice": w3.eth.gas_price
-            })
-            
-            tx2 = contract.functions.swapWETHForDUSC(mweth_balance).build_transaction({
-                "from": account.address,
-                "nonce": w3.eth.get_transaction_count(account.address),
-                "gas": 200000,
-                "gasPrice": w3.eth.gas_price
-            })
-            signed_tx2 = account.sign_transaction(tx2)
-            tx_hash2 = w3.eth.send_raw_transaction(signed_tx2.rawTransaction)
-            receipt2 = w3.eth.wait_for_transaction_receipt(tx_hash2)
-            
-            log_message(f"Arbitrage executed: dUSD->mWETH->dUSC (tx1: {tx_hash1.hex()}, tx2: {tx_hash2.hex()})")
-            log_statistics("AMM_TRANSACTION", {
-                "type": "arbitrage",
-                "direction": direction,
-                "amount": str(amount),
-                "tx_hash": tx_hash1.hex()
-            })
-            return True
+        router_swap, input_token, route = ARBITRAGE_ROUTES[opportunity.direction]
+        contract = get_contract(w3, "dex")
+        
+        # Both legs run in one transaction, so nobody can move the second pool in between.
+        # It reverts instead of completing if the cycle no longer returns ARB_MIN_PROFIT.
+        min_out = opportunity.amount_in + CONTROL.get("ARB_MIN_PROFIT")
+        allowances.ensure(account, input_token, dex_address, opportunity.amount_in)
+        swap = submitter.send(account, getattr(contract.functions, router_swap)(opportunity.amount_in, min_out, deadline), 250000, router_swap)
+        allowances.watch(swap, account.address, input_token, dex_address)
+        
+        log_message(f"Arbitrage submitted: {route} (tx: {swap.tx_hash.hex()})")
+        log_when_confirmed(swap, f"Arbitrage executed: {route}, expected profit {format_ether(opportunity.profit):.4f}", "AMM_TRANSACTION", {
+            "type": "arbitrage",
+            "direction": opportunity.direction,
+            "amount": str(opportunity.amount_in),
+            "expected_out": str(opportunity.amount_out),
+            "min_out": str(min_out),
+            "expected_profit": str(opportunity.profit),
+            **prices
+        }, outcome=lambda swap: realized_profit(swap, opportunity))
+        return True
     except Exception as e:
         log_message(f"Arbitrage failed: {e}", "ERROR")
         return False
 
-def check_liquidation(w3: Web3, lending_address: str, target_wallet: str) -> bool:
-    """Check if target wallet can be liquidated"""
-    abi = [{"inputs": [{"name": "user", "type": "address"}], "name": "canLiquidate", "outputs": [{"name": "", "type": "bool"}], "stateMutability": "view", "type": "function"}]
-    contract = w3.eth.contract(address=lending_address, abi=abi)
-    return contract.functions.canLiquidate(target_wallet).call()
-
-def execute_liquidation(w3: Web3, account, lending_address: str, target_wallet: str) -> bool:
+def execute_liquidation(w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, account, lending_address: str, target_wallet: str, prices: dict) -> bool:
     """Execute liquidation"""
     try:
-        abi = [{"inputs": [{"name": "user", "type": "address"}], "name": "liquidate", "outputs": [], "stateMutability": "nonpayable", "type": "function"}]
-        contract = w3.eth.contract(address=lending_address, abi=abi)
-        
-        tx = contract.functions.liquidate(target_wallet).build_transaction({
-            "from": account.address,
-            "nonce": w3.eth.get_transaction_count(account.address),
-            "gas": 500000,
-            "gasPrice": w3.eth.gas_price
-        })
+        contract = get_contract(w3, "lending")
         
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+        # The lending protocol pulls the repaid debt, which is only known on chain
+        allowances.ensure(account, DUSD_ADDRESS, lending_address, MAX_UINT256)
+        allowances.ensure(account, DUSC_ADDRESS, lending_address, MAX_UINT256)
+        pending = submitter.send(account, contract.functions.liquidate(target_wallet), 500000, "liquidate")
+        allowances.watch(pending, account.address, DUSD_ADDRESS, lending_address)
+        allowances.watch(pending, account.address, DUSC_ADDRESS, lending_address)
         
-        log_message(f"Liquidation executed for {target_wallet} (tx: {tx_hash.hex()})")
-        log_statistics("LENDING", {
+        log_when_confirmed(pending, f"Liquidation executed for {target_wallet}", "LENDING", {
             "type": "liquidation",
             "target": target_wallet,
             "liquidator": account.address,
-            "tx_hash": tx_hash.hex()
-        })
+            **prices
+        }, outcome=lambda liquidation: f"seized {format_ether(liquidation.event('Liquidate')['collateralSeized']):.6f} mWETH")
         return True
     except Exception as e:
         log_message(f"Liquidation failed: {e}", "ERROR")
         return False
 
-def borrow_if_needed(w3: Web3, account, lending_address: str, dusd_needed: int, dusc_needed: int) -> bool:
+def borrow_if_needed(w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, account, lending_address: str, mweth_balance: int, dusd_needed: int, dusc_needed: int) -> bool:
     """Borrow tokens if needed and profitable"""
     try:
-        mweth_balance = get_balance(w3, account.address, MWETH_ADDRESS)
         if mweth_balance == 0:
             return False
         
-        abi = [
-            {"inputs": [{"name": "amount", "type": "uint256"}], "name": "depositCollateral", "outputs": [], "stateMutability": "nonpayable", "type": "function"},
-            {"inputs": [{"name": "dusdAmount", "type": "uint256"}, {"name": "duscAmount", "type": "uint256"}], "name": "borrow", "outputs": [], "stateMutability": "nonpayable", "type": "function"}
-        ]
-        contract = w3.eth.contract(address=lending_address, abi=abi)
+        contract = get_contract(w3, "lending")
         
-        approve_abi = [{"inputs": [{"name": "spender", "type": "address"}, {"name": "amount", "type": "uint256"}], "name": "approve", "outputs": [{"name": "", "type": "bool"}], "stateMutability": "nonpayable", "type": "function"}]
-        mweth_contract = w3.eth.contract(address=MWETH_ADDRESS, abi=approve_abi)
-        mweth_contract.functions.approve(lending_address, mweth_balance).transact({
-            "from": account.address,
-            "gas": 100000,
-            "gasPrice": w3.eth.gas_price
-        })
-        
-        contract.functions.depositCollateral(mweth_balance).transact({
-            "from": account.address,
-            "gas": 200000,
-            "gasPrice": w3.eth.gas_price
-        })
+        allowances.ensure(account, MWETH_ADDRESS, lending_address, mweth_balance)
+        pending = submitter.send(account, contract.functions.depositCollateral(mweth_balance), 200000, "depositCollateral")
+        allowances.watch(pending, account.address, MWETH_ADDRESS, lending_address)
         
         if dusd_needed > 0 or dusc_needed > 0:
-            contract.functions.borrow(dusd_needed, dusc_needed).transact({
-                "from": account.address,
-                "gas": 300000,
-                "gasPrice": w3.eth.gas_price
-            })
-            log_statistics("LENDING", {
+            pending = submitter.send(account, contract.functions.borrow(dusd_needed, dusc_needed), 300000, "borrow")
+            log_when_confirmed(pending, f"Borrowed {format_ether(dusd_needed):.2f} dUSD, {format_ether(dusc_needed):.2f} dUSC", "LENDING", {
                 "type": "borrow",
                 "borrower": account.address,
                 "dusd_amount": str(dusd_needed),
@@ -175,9 +117,30 @@ def borrow_if_needed(w3: Web3, account, lending_address: str, dusd_needed: int,
         log_message(f"Borrow failed: {e}", "ERROR")
         return False
 
+def step(w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, account, book: PositionBook, snap: Snapshot):
+    """One round of liquidation and arbitrage checks against a snapshot that includes our wallet"""
+    balances = snap.balances[account.address]
+    log_balances("Profit Bot 2", balances)
+    
+    # Every borrower below its liquidation price, found with one range lookup
+    book.sync(w3, snap.block_number)
+    targets = [user for user in book.liquidatable(snap.oracle_price) if user != account.address]
+    if targets:
+        log_message(f"{len(targets)} liquidatable positions at oracle price ${snap.oracle_price_usd:.2f}")
+        if balances["dUSD"] < LIQUIDATION_FUNDS or balances["dUSC"] < LIQUIDATION_FUNDS:
+            borrow_if_needed(w3, submitter, allowances, account, LENDING_ADDRESS, balances["mWETH"], LIQUIDATION_FUNDS, LIQUIDATION_FUNDS)
+        
+        for target_wallet in targets:
+            execute_liquidation(w3, submitter, allowances, account, LENDING_ADDRESS, target_wallet, snap.prices)
+    
+    # Size the cycle exactly against this block's reserves; nothing is sent unless it pays
+    opportunity = find_arbitrage(snap, balances, CONTROL.get("ARB_MAX_TRADE"), CONTROL.get("ARB_MIN_PROFIT"))
+    if opportunity:
+        execute_arbitrage(w3, submitter, allowances, account, DEX_ADDRESS, opportunity, snap.timestamp + CONTROL.get("ARB_DEADLINE"), snap.prices)
+
 def main():
     """Main profit bot 2 loop"""
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    w3 = instrument(connect_rpc(), BOT_ID)
     
     if not w3.is_connected():
         log_message("Failed to connect to RPC", "ERROR")
@@ -188,43 +151,37 @@ def main():
         return
     
     account = w3.eth.account.from_key(WALLET_4_KEY)
-    target_wallet = w3.eth.account.from_key(WALLET_3_KEY).address
+    submitter = TransactionSubmitter(w3)
+    allowances = AllowanceManager(w3, submitter)
+    watcher = ChainWatcher(w3).on_block(submitter.new_block).start()
+    # A stop, pause or setting change wakes the loop at once
+    CONTROL.start().on_change(watcher.interrupt)
+    book = PositionBook()
+    ledger = BalanceLedger([account.address])
     
-    log_message(f"Profit bot 2 started (wallet: {account.address}, monitoring: {target_wallet})")
+    log_message(f"Profit bot 2 started (wallet: {account.address})")
     
-    while not check_kill_switch():
+    # Evaluate once at startup, then only after a block that moved prices or positions
+    stale = True
+    control_version = CONTROL.version
+    while not CONTROL.stopped:
+        changes = watcher.wait(timeout=1)
+        if changes is not None and changes.any_of(WAKE_EVENTS):
+            stale = True
+        if CONTROL.version != control_version:
+            # Resumed or retuned: evaluate again with the new settings
+            control_version = CONTROL.version
+            stale = True
+        if not stale or CONTROL.paused(BOT_ID):
+            continue
+        
         try:
-            oracle_price = get_oracle_price(w3, ORACLE_ADDRESS)
-            log_wallet_balances(w3, account.address, "Profit Bot 2", 
-                              MWETH_ADDRESS, DUSD_ADDRESS, DUSC_ADDRESS)
-            
-            if check_liquidation(w3, LENDING_ADDRESS, target_wallet):
-                dusd_balance = get_balance(w3, account.address, DUSD_ADDRESS)
-                dusc_balance = get_balance(w3, account.address, DUSC_ADDRESS)
-                
-                if dusd_balance < 1000e18 or dusc_balance < 1000e18:
-                    borrow_if_needed(w3, account, LENDING_ADDRESS, 1000e18, 1000e18)
-                
-                execute_liquidation(w3, account, LENDING_ADDRESS, target_wallet)
-            
-            direction, dusd_price, dusc_price = check_arbitrage_opportunity(w3, DEX_ADDRESS, oracle_price)
-            if direction:
-                dusd_balance = get_balance(w3, account.address, DUSD_ADDRESS)
-                dusc_balance = get_balance(w3, account.address, DUSC_ADDRESS)
-                
-                if direction == "dusd_to_dusc" and dusd_balance > 0:
-                    amount = min(dusd_balance // 2, 1000e18)
-                    if amount > 0:
-                        execute_arbitrage(w3, account, DEX_ADDRESS, direction, amount)
-                elif direction == "dusc_to_dusd" and dusc_balance > 0:
-                    amount = min(dusc_balance // 2, 1000e18)
-                    if amount > 0:
-                        execute_arbitrage(w3, account, DEX_ADDRESS, direction, amount)
-            
-            time.sleep(15)
+            # One eth_call for prices and reserves; our balances follow Transfer logs
+            snap = snapshot(w3, [account.address], ledger=ledger)
+            step(w3, submitter, allowances, account, book, snap)
+            stale = False
         except Exception as e:
             log_message(f"Error in profit bot 2 loop: {e}", "ERROR")
-            time.sleep(15)
     
     log_message("Profit bot 2 stopped")
 
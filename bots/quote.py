@@ -0,0 +1,122 @@
+"""
+Off-chain SimpleDEX quote engine and optimal two-pool arbitrage sizing
+
+All amounts are integers in wei and every formula reproduces the contract's
+integer arithmetic exactly (no fee, floor division), so a quote computed here
+equals the amount the swap returns on chain for the same reserves.
+"""
+from dataclasses import dataclass
+from math import isqrt
+import numpy as np
+
+# Cycle direction -> (first pool, second pool) as snapshot attribute names.
+# Each pool's reserves are (stablecoin, mWETH).
+CYCLES = {
+    "dusd_to_dusc": ("dusd_reserves", "dusc_reserves"),
+    "dusc_to_dusd": ("dusc_reserves", "dusd_reserves")
+}
+
+# First-leg outputs (in mWETH wei) evaluated on each side of the closed-form
+# optimum to absorb the rounding of the two floor divisions
+REFINE_WINDOW = 8
+
+@dataclass
+class Opportunity:
+    """A sized arbitrage trade and its exact expected outcome"""
+    direction: str
+    amount_in: int
+    weth_out: int
+    amount_out: int
+
+    @property
+    def profit(self) -> int:
+        return self.amount_out - self.amount_in
+
+def get_amount_out(amount_in: int, reserve_in: int, reserve_out: int) -> int:
+    """Output of one SimpleDEX swap, e.g. swapDUSDForWETH: (in * reserveOut) / (reserveIn + in)"""
+    return (amount_in * reserve_out) // (reserve_in + amount_in)
+
+def quote_cycle(amount_in: int, first_pool: tuple, second_pool: tuple) -> tuple:
+    """Stable -> mWETH in first_pool, then mWETH -> other stable in second_pool.
+
+    Returns (mWETH received from the first leg, stablecoin received from the second).
+    """
+    stable_a, weth_a = first_pool
+    stable_b, weth_b = second_pool
+    weth_out = get_amount_out(amount_in, stable_a, weth_a)
+    return weth_out, get_amount_out(weth_out, weth_b, stable_b)
+
+def quote_cycle_batch(amounts: np.ndarray, first_pool: tuple, second_pool: tuple) -> tuple:
+    """Vectorized quote_cycle over an array of input sizes.
+
+    Amounts are held as Python integers (object dtype) because reserve products
+    exceed 64 bits; results are identical to quote_cycle element by element.
+    """
+    stable_a, weth_a = first_pool
+    stable_b, weth_b = second_pool
+    amounts = np.asarray(amounts, dtype=object)
+    weth_out = (amounts * weth_a) // (amounts + stable_a)
+    return weth_out, (weth_out * stable_b) // (weth_out + weth_b)
+
+def optimal_cycle_input(first_pool: tuple, second_pool: tuple) -> int:
+    """Closed-form profit-maximizing input of a two-pool cycle, 0 if the cycle is unprofitable.
+
+    Chaining two constant-product pools without fees gives another constant
+    product with virtual reserves Ein = xA*wB/(wA+wB), Eout = wA*yB/(wA+wB).
+    Profit Eout*x/(Ein+x) - x is maximized at x = sqrt(Ein*Eout) - Ein, i.e.
+    (sqrt(xA*wA*wB*yB) - xA*wB) / (wA+wB).
+    """
+    stable_a, weth_a = first_pool
+    stable_b, weth_b = second_pool
+    if weth_a + weth_b == 0:
+        return 0
+    optimum = (isqrt(stable_a * weth_a * weth_b * stable_b) - stable_a * weth_b) // (weth_a + weth_b)
+    return max(optimum, 0)
+
+def min_input_for(weth_out: np.ndarray, pool: tuple) -> np.ndarray:
+    """Smallest stablecoin input whose first-leg output is at least weth_out (vectorized)"""
+    stable, weth = pool
+    weth_out = np.asarray(weth_out, dtype=object)
+    # floor(x*w/(s+x)) >= o  <=>  x >= o*s/(w-o)
+    return -((-weth_out * stable) // (weth - weth_out))
+
+def best_cycle(direction: str, first_pool: tuple, second_pool: tuple, max_input: int) -> Opportunity:
+    """Most profitable input of at most max_input for one cycle, evaluated exactly.
+
+    The first leg's output only takes integer values, and for each value the
+    cheapest input reaching it dominates every larger one, so candidates are
+    enumerated in mWETH around the closed-form optimum and priced back to the
+    minimal stablecoin input. The input cap itself is always a candidate.
+    """
+    optimum = optimal_cycle_input(first_pool, second_pool)
+    if optimum <= 0 or max_input <= 0:
+        return Opportunity(direction, 0, 0, 0)
+
+    _, weth_a = first_pool
+    center, _ = quote_cycle(min(optimum, max_input), first_pool, second_pool)
+    low = max(center - REFINE_WINDOW, 1)
+    high = min(center + REFINE_WINDOW, weth_a - 1)
+    targets = np.array(range(low, high + 1), dtype=object)
+    inputs = min_input_for(targets, first_pool)
+    inputs = np.append(inputs[inputs <= max_input], max_input)
+
+    weth_out, amount_out = quote_cycle_batch(inputs, first_pool, second_pool)
+    best = int(np.argmax(amount_out - inputs))
+    return Opportunity(direction, int(inputs[best]), int(weth_out[best]), int(amount_out[best]))
+
+def find_arbitrage(snap, balances: dict, max_trade: int, min_profit: int = 1):
+    """Best profitable cycle given a snapshot and our stablecoin balances, or None.
+
+    balances maps token symbols to wei (as in Snapshot.balances); each cycle's
+    input is limited to what we hold of its input stablecoin and to max_trade.
+    """
+    funds = {"dusd_to_dusc": balances["dUSD"], "dusc_to_dusd": balances["dUSC"]}
+    best = None
+    for direction, (first, second) in CYCLES.items():
+        max_input = min(funds[direction], max_trade)
+        if max_input <= 0:
+            continue
+        opportunity = best_cycle(direction, getattr(snap, first), getattr(snap, second), max_input)
+        if opportunity.profit >= min_profit and (best is None or opportunity.profit > best.profit):
+            best = opportunity
+    return best
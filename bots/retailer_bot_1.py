@@ -4,108 +4,119 @@ Retailer bot 1 - trades mWETH in dUSD/mWETH pool
 import time
 import random
 from web3 import Web3
-from config import RPC_URL, DEX_ADDRESS, DUSD_ADDRESS, MWETH_ADDRESS, WALLET_1_KEY, ORACLE_ADDRESS
-from utils import log_message, check_kill_switch, log_statistics, log_wallet_balances, format_ether, get_balance
+from config import DEX_ADDRESS, DUSD_ADDRESS, MWETH_ADDRESS, WALLET_1_KEY
+from transport import connect_rpc
+from utils import log_message, log_balances, format_ether, log_when_confirmed, TransactionSubmitter, AllowanceManager
+from contracts import get_contract
+from control import CONTROL
+from metrics import instrument
+from snapshot import snapshot, Snapshot
+from ledger import BalanceLedger
+from events import ChainWatcher, DUSD_POOL_EVENTS, ORACLE_EVENTS
 
-def get_oracle_price(w3: Web3, oracle_address: str) -> float:
-    """Get current ETH price from oracle"""
-    abi = [{"inputs": [], "name": "latestRoundData", "outputs": [{"name": "", "type": "uint80"}, {"name": "", "type": "int256"}, {"name": "", "type": "uint256"}, {"name": "", "type": "uint256"}, {"name": "", "type": "uint80"}], "stateMutability": "view", "type": "function"}]
-    contract = w3.eth.contract(address=oracle_address, abi=abi)
-    _, price, _, _, _ = contract.functions.latestRoundData().call()
-    return float(price) / 1e8
+# Our pool's price and the oracle price drive the trading decision
+WAKE_EVENTS = DUSD_POOL_EVENTS | ORACLE_EVENTS
 
-def get_pool_price(w3: Web3, dex_address: str) -> float:
-    """Get current pool price (dUSD per mWETH)"""
-    abi = [{"inputs": [], "name": "getDUSDPrice", "outputs": [{"name": "", "type": "uint256"}], "stateMutability": "view", "type": "function"}]
-    contract = w3.eth.contract(address=dex_address, abi=abi)
-    price = contract.functions.getDUSDPrice().call()
-    return float(price) / 1e18
+# Name used to pause this bot through the control plane
+BOT_ID = "retailer_bot_1"
 
-def calculate_profit(w3: Web3, wallet_address: str, oracle_price: float) -> float:
+def calculate_profit(balances: dict, oracle_price: float) -> float:
     """Calculate current profit"""
-    dusd_balance = get_balance(w3, wallet_address, DUSD_ADDRESS)
-    mweth_balance = get_balance(w3, wallet_address, MWETH_ADDRESS)
-    return format_ether(dusd_balance) + format_ether(mweth_balance) * oracle_price
+    return format_ether(balances["dUSD"]) + format_ether(balances["mWETH"]) * oracle_price
 
-def try_buy_mweth(w3: Web3, account, dex_address: str, amount_dusd: int) -> bool:
-    """Try to buy mWETH with dUSD"""
+def try_buy_mweth(w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, account, dex_address: str, amount_dusd: int, prices: dict, on_failure=None) -> bool:
+    """Try to buy mWETH with dUSD; on_failure() runs if the swap cannot be sent or fails on chain"""
     try:
-        abi = [{"inputs": [{"name": "dusdIn", "type": "uint256"}], "name": "swapDUSDForWETH", "outputs": [{"name": "wethOut", "type": "uint256"}], "stateMutability": "nonpayable", "type": "function"}]
-        contract = w3.eth.contract(address=dex_address, abi=abi)
+        contract = get_contract(w3, "dex")
         
-        # Approve if needed
-        approve_abi = [{"inputs": [{"name": "spender", "type": "address"}, {"name": "amount", "type": "uint256"}], "name": "approve", "outputs": [{"name": "", "type": "bool"}], "stateMutability": "nonpayable", "type": "function"}]
-        token_contract = w3.eth.contract(address=DUSD_ADDRESS, abi=approve_abi)
-        token_contract.functions.approve(dex_address, amount_dusd).transact({
-            "from": account.address,
-            "gas": 100000,
-            "gasPrice": w3.eth.gas_price
-        })
+        allowances.ensure(account, DUSD_ADDRESS, dex_address, amount_dusd)
+        pending = submitter.send(account, contract.functions.swapDUSDForWETH(amount_dusd), 200000, "swapDUSDForWETH")
+        allowances.watch(pending, account.address, DUSD_ADDRESS, dex_address)
         
-        tx = contract.functions.swapDUSDForWETH(amount_dusd).build_transaction({
-            "from": account.address,
-            "nonce": w3.eth.get_transaction_count(account.address),
-            "gas": 200000,
-            "gasPrice": w3.eth.gas_price
-        })
-        
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        
-        log_message(f"Bought mWETH with {format_ether(amount_dusd):.2f} dUSD (tx: {tx_hash.hex()})")
-        log_statistics("AMM_TRANSACTION", {
+        log_when_confirmed(pending, f"Bought mWETH with {format_ether(amount_dusd):.2f} dUSD", "AMM_TRANSACTION", {
             "type": "buy",
             "pool": "dUSD/mWETH",
             "amount_dusd": str(amount_dusd),
-            "tx_hash": tx_hash.hex()
-        })
+            **prices
+        }, outcome=lambda swap: f"received {format_ether(swap.event('SwapDUSDForWETH')['wethOut']):.6f} mWETH")
+        if on_failure:
+            pending.add_done_callback(lambda future: future.exception() and on_failure())
         return True
     except Exception as e:
         log_message(f"Failed to buy mWETH: {e}", "ERROR")
+        if on_failure:
+            on_failure()
         return False
 
-def try_sell_mweth(w3: Web3, account, dex_address: str, amount_mweth: int) -> bool:
-    """Try to sell mWETH for dUSD"""
+def try_sell_mweth(w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, account, dex_address: str, amount_mweth: int, prices: dict, on_failure=None) -> bool:
+    """Try to sell mWETH for dUSD; on_failure() runs if the swap cannot be sent or fails on chain"""
     try:
-        abi = [{"inputs": [{"name": "wethIn", "type": "uint256"}], "name": "swapWETHForDUSD", "outputs": [{"name": "dusdOut", "type": "uint256"}], "stateMutability": "nonpayable", "type": "function"}]
-        contract = w3.eth.contract(address=dex_address, abi=abi)
-        
-        # Approve if needed
-        approve_abi = [{"inputs": [{"name": "spender", "type": "address"}, {"name": "amount", "type": "uint256"}], "name": "approve", "outputs": [{"name": "", "type": "bool"}], "stateMutability": "nonpayable", "type": "function"}]
-        token_contract = w3.eth.contract(address=MWETH_ADDRESS, abi=approve_abi)
-        token_contract.functions.approve(dex_address, amount_mweth).transact({
-            "from": account.address,
-            "gas": 100000,
-            "gasPrice": w3.eth.gas_price
-        })
+        contract = get_contract(w3, "dex")
         
-        tx = contract.functions.swapWETHForDUSD(amount_mweth).build_transaction({
-            "from": account.address,
-            "nonce": w3.eth.get_transaction_count(account.address),
-            "gas": 200000,
-            "gasPrice": w3.eth.gas_price
-        })
+        allowances.ensure(account, MWETH_ADDRESS, dex_address, amount_mweth)
+        pending = submitter.send(account, contract.functions.swapWETHForDUSD(amount_mweth), 200000, "swapWETHForDUSD")
+        allowances.watch(pending, account.address, MWETH_ADDRESS, dex_address)
         
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        
-        log_message(f"Sold {format_ether(amount_mweth):.6f} mWETH for dUSD (tx: {tx_hash.hex()})")
-        log_statistics("AMM_TRANSACTION", {
+        log_when_confirmed(pending, f"Sold {format_ether(amount_mweth):.6f} mWETH for dUSD", "AMM_TRANSACTION", {
             "type": "sell",
             "pool": "dUSD/mWETH",
             "amount_mweth": str(amount_mweth),
-            "tx_hash": tx_hash.hex()
-        })
+            **prices
+        }, outcome=lambda swap: f"received {format_ether(swap.event('SwapWETHForDUSD')['dusdOut']):.2f} dUSD")
+        if on_failure:
+            pending.add_done_callback(lambda future: future.exception() and on_failure())
         return True
     except Exception as e:
         log_message(f"Failed to sell mWETH: {e}", "ERROR")
+        if on_failure:
+            on_failure()
         return False
 
+def step(w3: Web3, submitter: TransactionSubmitter, allowances: AllowanceManager, account, snap: Snapshot, rng=random):
+    """One trading decision against a snapshot that includes our wallet; rng draws the trade size"""
+    balances = snap.balances[account.address]
+    oracle_price = snap.oracle_price_usd
+    pool_price = snap.dusd_pool_price
+    profit = calculate_profit(balances, oracle_price)
+    
+    dusd_balance = balances["dUSD"]
+    mweth_balance = balances["mWETH"]
+    
+    log_balances("Retailer Bot 1", balances)
+    log_message(f"Profit: ${profit:.2f}, Oracle: ${oracle_price:.2f}, Pool: {pool_price:.6f}")
+    
+    # Random amount between RETAIL_MIN_TRADE and RETAIL_MAX_TRADE mWETH
+    amount_mweth = rng.randint(CONTROL.get("RETAIL_MIN_TRADE"), CONTROL.get("RETAIL_MAX_TRADE"))
+    amount_dusd = int(amount_mweth * pool_price)
+    
+    # Strategy: try to maximize profit
+    # If pool price is lower than oracle, buy mWETH
+    # If pool price is higher than oracle, sell mWETH
+    # If the buy fails (not sent, or reverted once mined), sell instead
+    # If the sell fails, sell half the balance
+    def sell_half():
+        if mweth_balance // 2 > 0:
+            try_sell_mweth(w3, submitter, allowances, account, DEX_ADDRESS, mweth_balance // 2, snap.prices)
+    
+    def sell_instead():
+        if mweth_balance >= amount_mweth:
+            try_sell_mweth(w3, submitter, allowances, account, DEX_ADDRESS, amount_mweth, snap.prices)
+        else:
+            sell_half()
+    
+    if pool_price < oracle_price * 1e18 and dusd_balance >= amount_dusd:
+        # Buy mWETH
+        try_buy_mweth(w3, submitter, allowances, account, DEX_ADDRESS, amount_dusd, snap.prices, on_failure=sell_instead)
+    elif mweth_balance >= amount_mweth:
+        # Sell mWETH
+        try_sell_mweth(w3, submitter, allowances, account, DEX_ADDRESS, amount_mweth, snap.prices, on_failure=sell_half)
+    elif dusd_balance >= amount_dusd:
+        # Can't sell, try to buy
+        try_buy_mweth(w3, submitter, allowances, account, DEX_ADDRESS, amount_dusd, snap.prices)
+
 def main():
     """Main retailer bot 1 loop"""
-    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    w3 = instrument(connect_rpc(), BOT_ID)
     
     if not w3.is_connected():
         log_message("Failed to connect to RPC", "ERROR")
@@ -116,57 +127,38 @@ def main():
         return
     
     account = w3.eth.account.from_key(WALLET_1_KEY)
+    submitter = TransactionSubmitter(w3)
+    allowances = AllowanceManager(w3, submitter)
+    ledger = BalanceLedger([account.address])
+    watcher = ChainWatcher(w3, contracts=("dex", "oracle")).on_block(submitter.new_block).start()
+    # A stop, pause or setting change wakes the loop at once
+    CONTROL.start().on_change(watcher.interrupt)
     log_message(f"Retailer bot 1 started (wallet: {account.address})")
     
-    while not check_kill_switch():
+    # Trade once at startup, then only after our pool or the oracle moved
+    stale = True
+    next_trade = 0.0
+    control_version = CONTROL.version
+    while not CONTROL.stopped:
+        changes = watcher.wait(timeout=1)
+        if changes is not None and changes.any_of(WAKE_EVENTS):
+            stale = True
+        if CONTROL.version != control_version:
+            # Resumed or retuned: decide again with the new settings
+            control_version = CONTROL.version
+            stale = True
+        if not stale or time.monotonic() < next_trade or CONTROL.paused(BOT_ID):
+            continue
+        stale = False
+        next_trade = time.monotonic() + CONTROL.get("RETAIL_TRADE_INTERVAL")
+        
         try:
-            oracle_price = get_oracle_price(w3, ORACLE_ADDRESS)
-            pool_price = get_pool_price(w3, DEX_ADDRESS)
-            profit = calculate_profit(w3, account.address, oracle_price)
-            
-            dusd_balance = get_balance(w3, account.address, DUSD_ADDRESS)
-            mweth_balance = get_balance(w3, account.address, MWETH_ADDRESS)
-            
-            log_wallet_balances(w3, account.address, "Retailer Bot 1", 
-                              MWETH_ADDRESS, DUSD_ADDRESS, "")
-            log_message(f"Profit: ${profit:.2f}, Oracle: ${oracle_price:.2f}, Pool: {pool_price:.6f}")
-            
-            # Random amount between 0.01 and 0.3 mWETH
-            amount_mweth = random.randint(1e16, 3e17)  # 0.01 to 0.3 ETH in wei
-            amount_dusd = int(amount_mweth * pool_price)
-            
-            # Strategy: try to maximize profit
-            # If pool price is lower than oracle, buy mWETH
-            # If pool price is higher than oracle, sell mWETH
-            # If can't buy, try to sell
-            # If can't sell, decrease amount and try again
-            
-            if pool_price < oracle_price * 1e18 and dusd_balance >= amount_dusd:
-                # Buy mWETH
-                if not try_buy_mweth(w3, account, DEX_ADDRESS, amount_dusd):
-                    # If buy fails, try to sell
-                    if mweth_balance >= amount_mweth:
-                        try_sell_mweth(w3, account, DEX_ADDRESS, amount_mweth)
-                    else:
-                        # Decrease amount
-                        amount_mweth = mweth_balance // 2
-                        if amount_mweth > 0:
-                            try_sell_mweth(w3, account, DEX_ADDRESS, amount_mweth)
-            elif mweth_balance >= amount_mweth:
-                # Sell mWETH
-                if not try_sell_mweth(w3, account, DEX_ADDRESS, amount_mweth):
-                    # If sell fails, decrease amount
-                    amount_mweth = mweth_balance // 2
-                    if amount_mweth > 0:
-                        try_sell_mweth(w3, account, DEX_ADDRESS, amount_mweth)
-            elif dusd_balance >= amount_dusd:
-                # Can't sell, try to buy
-                try_buy_mweth(w3, account, DEX_ADDRESS, amount_dusd)
-            
-            time.sleep(10)  # Wait 10 seconds between trades
+            snap = snapshot(w3, [account.address], ledger=ledger)
+            step(w3, submitter, allowances, account, snap)
         except Exception as e:
             log_message(f"Error in retailer bot 1 loop: {e}", "ERROR")
-            time.sleep(10)
+            # Retry once the trade interval has passed instead of waiting for the next event
+            stale = True
     
     log_message("Retailer bot 1 stopped")
 
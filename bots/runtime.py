@@ -0,0 +1,236 @@
+"""
+Single-process runtime hosting the oracle, retailer and profit bots, scheduled by one asyncio loop
+
+The event loop only schedules: it fans block and event wakeups out to the
+bots, applies pause intervals and step timeouts, and reacts to the control
+plane. The bots' steps are the same blocking code the standalone bots run,
+executed in worker threads over one shared synchronous Web3 connection (the
+configured transport, see transport.py). Every block is read once, with a
+single Multicall covering every hosted wallet, into a state cache shared by
+all bots, and transactions go through one shared TransactionSubmitter. Paused
+bots skip their steps, and a stop through the control plane cancels every
+task at once.
+
+Usage:
+    python runtime.py
+"""
+import asyncio
+from dataclasses import dataclass, field
+from functools import partial
+from web3 import Web3
+from config import BOT_STEP_TIMEOUT, WALLET_1_KEY, WALLET_2_KEY, WALLET_3_KEY, WALLET_4_KEY
+from transport import connect_rpc
+from utils import log_message, TransactionSubmitter, AllowanceManager
+from control import CONTROL
+from metrics import instrument
+from snapshot import snapshot, Snapshot
+from events import ChainWatcher
+from positions import PositionBook
+from ledger import BalanceLedger
+from prices import make_source
+import oracle_bot
+import profit_bot_1
+import profit_bot_2
+import retailer_bot_1
+import retailer_bot_2
+
+class StateCache:
+    """Latest-block snapshot shared by every bot, re-read at most once per block"""
+
+    def __init__(self, w3: Web3, wallets: list):
+        self.w3 = w3
+        self.wallets = wallets
+        # Balances of every hosted wallet, kept current from Transfer logs instead of read per block
+        self.ledger = BalanceLedger(wallets)
+        self.reads = 0
+        self.hits = 0
+        self._snap = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        """Called on every new block"""
+        self._snap = None
+        self._generation += 1
+
+    async def get(self) -> Snapshot:
+        async with self._lock:
+            if self._snap is not None:
+                self.hits += 1
+                return self._snap
+            generation = self._generation
+            snap = await asyncio.to_thread(snapshot, self.w3, self.wallets, ledger=self.ledger)
+            self.reads += 1
+            # A block that arrived during the read makes this snapshot stale for later callers
+            if generation == self._generation:
+                self._snap = snap
+            return snap
+
+@dataclass
+class BotTask:
+    """An event-driven bot: step(snapshot) runs when one of wake_events was seen"""
+    name: str
+    bot_id: str
+    step: callable
+    wake_events: frozenset
+    # Tunable holding the least seconds between two steps
+    interval_setting: str = None
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    # Worker thread of the latest step; one that timed out keeps running until its blocking call returns
+    running: asyncio.Task = None
+
+class Runtime:
+    """Schedules all bots from one event loop; their steps run in worker threads"""
+
+    def __init__(self, step_timeout: float = BOT_STEP_TIMEOUT):
+        self.step_timeout = step_timeout
+        # Snapshots, bot steps, transactions and event polling all share one connection
+        self.w3 = instrument(connect_rpc(), "runtime")
+        self.submitter = TransactionSubmitter(self.w3)
+        self.allowances = AllowanceManager(self.w3, self.submitter)
+        self.watcher = ChainWatcher(self.w3).on_block(self.submitter.new_block)
+        self.oracle_account = self.w3.eth.account.from_key(oracle_bot.ORACLE_KEY)
+        self.oracle_source = make_source()
+        self.oracle_policy = oracle_bot.UpdatePolicy()
+        self.bots = []
+        wallets = []
+
+        common = (self.w3, self.submitter, self.allowances)
+        for name, module, key in (("Retailer bot 1", retailer_bot_1, WALLET_1_KEY),
+                                  ("Retailer bot 2", retailer_bot_2, WALLET_2_KEY)):
+            if not key:
+                log_message(f"{name} not started: wallet key not set", "WARNING")
+                continue
+            account = self.w3.eth.account.from_key(key)
+            wallets.append(account.address)
+            self.bots.append(BotTask(name, module.BOT_ID, partial(module.step, *common, account), module.WAKE_EVENTS,
+                                     "RETAIL_TRADE_INTERVAL"))
+
+        # Both profit bots read liquidation candidates from the same position book
+        self.book = PositionBook()
+        for name, module, key in (("Profit bot 1", profit_bot_1, WALLET_3_KEY),
+                                  ("Profit bot 2", profit_bot_2, WALLET_4_KEY)):
+            if not key:
+                log_message(f"{name} not started: wallet key not set", "WARNING")
+                continue
+            account = self.w3.eth.account.from_key(key)
+            wallets.append(account.address)
+            self.bots.append(BotTask(name, module.BOT_ID, partial(module.step, *common, account, self.book), module.WAKE_EVENTS))
+
+        self.cache = StateCache(self.w3, wallets)
+
+    async def _dispatch(self):
+        """Fan watcher wakeups out to the bots that care about them"""
+        while True:
+            changes = await asyncio.to_thread(self.watcher.wait, 1)
+            if changes is None:
+                continue
+            if changes.new_blocks:
+                self.cache.invalidate()
+            for bot in self.bots:
+                if changes.any_of(bot.wake_events):
+                    bot.wake.set()
+
+    async def _step(self, bot: BotTask):
+        bot.running = None
+        snap = await self.cache.get()
+        bot.running = asyncio.create_task(asyncio.to_thread(bot.step, snap), name=f"{bot.bot_id}-step")
+        # A timeout abandons the wait, not the step
+        await asyncio.shield(bot.running)
+
+    def _abandoned_step_done(self, bot: BotTask, task: asyncio.Task):
+        """Report how a timed-out step ended, and evaluate the wakeups skipped meanwhile"""
+        if not task.cancelled() and task.exception() is not None:
+            log_message(f"Error in {bot.name} loop: {task.exception()}", "ERROR")
+        bot.wake.set()
+
+    async def _run_bot(self, bot: BotTask):
+        log_message(f"{bot.name} started")
+        # Evaluate once at startup, then only after a relevant event
+        bot.wake.set()
+        while True:
+            await bot.wake.wait()
+            bot.wake.clear()
+            if CONTROL.paused(bot.bot_id):
+                # Resuming wakes every bot again
+                continue
+            if bot.running is not None and not bot.running.done():
+                # Never two steps of one bot at once; the bot is woken again when the stuck one returns
+                log_message(f"{bot.name} wakeup skipped: its timed-out step is still running", "WARNING")
+                continue
+            try:
+                # A step stuck in a blocking call keeps its worker thread, but no longer holds up the loop
+                await asyncio.wait_for(self._step(bot), self.step_timeout)
+            except asyncio.TimeoutError:
+                log_message(f"{bot.name} step timed out after {self.step_timeout}s", "ERROR")
+                if bot.running is not None:
+                    bot.running.add_done_callback(partial(self._abandoned_step_done, bot))
+            except Exception as e:
+                log_message(f"Error in {bot.name} loop: {e}", "ERROR")
+            if bot.interval_setting:
+                # Wakeups during the pause are kept and acted on afterwards
+                await asyncio.sleep(CONTROL.get(bot.interval_setting))
+
+    async def _run_oracle(self):
+        log_message(f"Oracle bot started (prices from {self.oracle_source.name})")
+        while True:
+            if not CONTROL.paused(oracle_bot.BOT_ID):
+                try:
+                    await asyncio.wait_for(
+                        asyncio.to_thread(oracle_bot.step, self.w3, self.submitter, self.oracle_account,
+                                          self.oracle_source, self.oracle_policy),
+                        self.step_timeout)
+                except asyncio.TimeoutError:
+                    log_message(f"Oracle bot step timed out after {self.step_timeout}s", "ERROR")
+                except Exception as e:
+                    log_message(f"Error in oracle bot loop: {e}", "ERROR")
+            await asyncio.sleep(CONTROL.get("ORACLE_UPDATE_INTERVAL"))
+
+    def _control_changed(self, stopped: asyncio.Event):
+        """Runs on the event loop after every control plane change"""
+        if CONTROL.stopped:
+            stopped.set()
+        # Resumed or retuned bots evaluate again right away
+        for bot in self.bots:
+            bot.wake.set()
+
+    async def run(self):
+        if not await asyncio.to_thread(self.w3.is_connected):
+            log_message("Failed to connect to RPC", "ERROR")
+            return
+
+        # The other bots must not start before the first price is on chain
+        price = await asyncio.to_thread(self.oracle_source.fetch)
+        if price:
+            pending = oracle_bot.update_oracle_price(self.w3, self.submitter, self.oracle_account, price, "initial price")
+            await asyncio.wrap_future(pending)
+            self.oracle_policy.record(price)
+            log_message("Initial oracle price set")
+
+        stopped = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        CONTROL.start().on_change(lambda: loop.call_soon_threadsafe(self._control_changed, stopped))
+        if CONTROL.stopped:
+            return
+
+        self.watcher.start()
+        tasks = [asyncio.create_task(self._dispatch(), name="dispatch"),
+                 asyncio.create_task(self._run_oracle(), name="Oracle bot")]
+        tasks += [asyncio.create_task(self._run_bot(bot), name=bot.name) for bot in self.bots]
+        log_message(f"Runtime started with {len(tasks) - 1} bots in one process")
+
+        try:
+            await stopped.wait()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.watcher.stop()
+            log_message(f"Runtime stopped ({self.cache.reads} snapshots read, {self.cache.hits} served from cache, "
+                        f"{self.oracle_policy.sent} oracle updates sent, {self.oracle_policy.skipped} skipped)")
+
+def main():
+    asyncio.run(Runtime().run())
+
+if __name__ == "__main__":
+    main()
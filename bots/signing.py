@@ -0,0 +1,110 @@
+"""
+Faster transaction signing: cached keys, and a process pool for batches
+
+Signing is pure-Python secp256k1 and keccak. account.sign_transaction also
+derives the public key from the private key on every call, about a fifth of
+the cost, so sign() keeps the derived key objects instead. SigningPool signs
+whole batches of prepared transactions in worker processes, SIGNING_CHUNK_SIZE
+per task, and returns them in the order given: sent in that order, every
+account's transactions reach the node in nonce order.
+
+Usage (see bench_signing.py for the throughput per process count):
+    with SigningPool() as pool:
+        signed = pool.sign([(account, tx), ...])
+        send_signed(w3, signed)
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from eth_account import Account
+# The step of Account.sign_transaction after the key derivation
+from eth_account._utils.signing import sign_transaction_dict
+from eth_utils import keccak
+from hexbytes import HexBytes
+from config import SIGNING_PROCESSES, SIGNING_CHUNK_SIZE
+
+@dataclass
+class SignedTx:
+    """A signed transaction ready for eth_sendRawTransaction"""
+    raw: bytes
+    hash: HexBytes
+    sender: str
+    nonce: int
+
+@lru_cache(maxsize=4096)
+def _key_object(private_key: bytes):
+    return Account.from_key(private_key)._key_obj
+
+def sign(private_key: bytes, tx: dict) -> SignedTx:
+    """Sign tx (a complete transaction dict, "from" optional) with private_key"""
+    key = _key_object(bytes(private_key))
+    sender = key.public_key.to_checksum_address()
+    if "from" in tx:
+        if tx["from"] != sender:
+            raise TypeError(f"from field {tx['from']} does not match the signing key's {sender}")
+        tx = {field: value for field, value in tx.items() if field != "from"}
+    _, _, _, raw = sign_transaction_dict(key, tx)
+    return SignedTx(bytes(raw), HexBytes(keccak(raw)), sender, tx["nonce"])
+
+def _sign_chunk(chunk: list) -> list:
+    """Worker side: [(private key, tx), ...] -> [SignedTx, ...]"""
+    return [sign(private_key, tx) for private_key, tx in chunk]
+
+class SigningPool:
+    """Signs batches of transactions in worker processes, each with its own key cache"""
+
+    def __init__(self, processes: int = SIGNING_PROCESSES, chunk_size: int = SIGNING_CHUNK_SIZE):
+        self.processes = processes or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.processes)
+        return self._executor
+
+    def sign(self, transactions: list) -> list:
+        """[(account, tx), ...] -> [SignedTx, ...] in the same order.
+
+        Nonces must already be set. Batches smaller than one chunk are signed
+        in the calling process, where a round trip to a worker costs more than
+        it saves.
+        """
+        items = [(bytes(account.key), tx) for account, tx in transactions]
+        if len(items) <= self.chunk_size or self.processes == 1:
+            return _sign_chunk(items)
+        chunks = [items[start:start + self.chunk_size] for start in range(0, len(items), self.chunk_size)]
+        return [signed for chunk in self._ensure_executor().map(_sign_chunk, chunks) for signed in chunk]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> "SigningPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def send_signed(w3, signed: list) -> list:
+    """Send signed transactions in order; returns None for each one sent and the exception for the others.
+
+    Once a transaction of an account fails, its later ones are not sent: they
+    would wait forever behind the missing nonce.
+    """
+    errors = []
+    failed = {}
+    for tx in signed:
+        if tx.sender in failed:
+            errors.append(RuntimeError(f"Not sent: nonce {failed[tx.sender]} of {tx.sender} failed before it"))
+            continue
+        try:
+            w3.eth.send_raw_transaction(tx.raw)
+        except Exception as e:
+            failed[tx.sender] = tx.nonce
+            errors.append(e)
+        else:
+            errors.append(None)
+    return errors
@@ -0,0 +1,255 @@
+"""
+Lockstep simulation of the ecosystem on anvil, faster than real time and reproducible
+
+Instead of sleeping, a coordinator drives simulated time: every tick it reads
+one snapshot, steps the oracle, retailer and profit bots' decision functions
+in a fixed order, then mines all their transactions in one block whose
+timestamp is exactly tick seconds after the previous one (automine is
+switched off for the run). Receipts are collected on the coordinator's
+thread right after mining, so no background thread can reorder anything.
+
+The oracle reads a recorded price path (--prices, replayed in simulated
+time) or a seeded random walk, and the retailers draw their trade sizes from
+random.Random seeded with --seed and their bot id. The same seed, price path
+and starting chain state therefore give the same blocks; the summary ends
+with a digest of the final state to compare runs. Chain state is restored
+with evm_snapshot/evm_revert afterwards unless --keep is given. ARB_DEADLINE
+is raised to the tick where it is shorter, or no arbitrage could be mined.
+
+Usage:
+    python simulate.py --days 7 --seed 1
+    python simulate.py --days 30 --tick 60 --prices eth_prices.csv --out sim.json --trace sim.csv
+"""
+import argparse
+import csv
+import hashlib
+import json
+import math
+import random
+import sys
+import time
+import numpy as np
+from web3 import Web3
+from config import WALLET_1_KEY, WALLET_2_KEY, WALLET_3_KEY, WALLET_4_KEY
+from utils import log_message, TransactionSubmitter, AllowanceManager
+from control import CONTROL
+from transport import connect_rpc
+from metrics import instrument
+from snapshot import snapshot, Snapshot
+from positions import PositionBook
+from prices import ReplaySource, RandomWalkSource
+import oracle_bot
+import profit_bot_1
+import profit_bot_2
+import retailer_bot_1
+import retailer_bot_2
+
+# Annualized volatility of the random walk used when no price file is given
+DEFAULT_VOLATILITY = 0.6
+
+class SimClock:
+    """Simulated seconds since the start of the run, callable like time.monotonic"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def _deviation_bps(pool_price: float, oracle_price: float) -> float:
+    return (pool_price / oracle_price - 1) * 10000 if oracle_price else 0.0
+
+def _wallet_value(balances: dict, oracle_price: float) -> float:
+    """Stablecoins at $1 plus mWETH at the oracle price, in USD"""
+    return (balances["dUSD"] + balances["dUSC"]) / 1e18 + balances["mWETH"] / 1e18 * oracle_price
+
+def fit_deadline(tick: float):
+    """Raise ARB_DEADLINE to at least one tick for this process.
+
+    An arbitrage is quoted on one block and mined in the next, tick simulated
+    seconds later, so with a shorter deadline every router swap would revert.
+    """
+    deadline = CONTROL.get("ARB_DEADLINE")
+    if tick > deadline:
+        CONTROL.override("ARB_DEADLINE", math.ceil(tick))
+        log_message(f"ARB_DEADLINE raised from {deadline}s to the {tick:g}s tick for the simulation", "WARNING")
+
+def state_digest(snap: Snapshot) -> str:
+    """Hash of the prices, reserves and balances in a snapshot, equal between identical runs"""
+    state = [snap.timestamp, snap.oracle_price, list(snap.dusd_reserves), list(snap.dusc_reserves),
+             sorted((wallet, sorted(balances.items())) for wallet, balances in snap.balances.items())]
+    return hashlib.sha256(json.dumps(state).encode()).hexdigest()
+
+class Simulation:
+    """Steps every bot once per simulated tick against a chain whose clock only moves when mined"""
+
+    def __init__(self, w3: Web3, seed: int, tick: float, prices_path: str = None,
+                 volatility: float = DEFAULT_VOLATILITY):
+        self.w3 = w3
+        self.seed = seed
+        self.tick = tick
+        fit_deadline(tick)
+        self.clock = SimClock()
+        # Receipts are polled by run() right after each block is mined
+        self.submitter = TransactionSubmitter(w3, background=False)
+        self.allowances = AllowanceManager(w3, self.submitter)
+        self.book = PositionBook()
+        self.oracle_account = w3.eth.account.from_key(oracle_bot.ORACLE_KEY)
+        self.policy = oracle_bot.UpdatePolicy(clock=self.clock)
+        self.prices_path = prices_path
+        self.volatility = volatility
+        self.source = None
+
+        self.retailers = []  # (module, account, rng)
+        for module, key in ((retailer_bot_1, WALLET_1_KEY), (retailer_bot_2, WALLET_2_KEY)):
+            if key:
+                self.retailers.append((module, w3.eth.account.from_key(key), random.Random(f"{seed}:{module.BOT_ID}")))
+        self.profit_bots = []  # (module, account)
+        for module, key in ((profit_bot_1, WALLET_3_KEY), (profit_bot_2, WALLET_4_KEY)):
+            if key:
+                self.profit_bots.append((module, w3.eth.account.from_key(key)))
+        self.wallets = [account.address for _, account, _ in self.retailers] + [account.address for _, account in self.profit_bots]
+        self.errors = 0
+
+    def rpc(self, method: str, params: list):
+        response = self.w3.provider.make_request(method, params)
+        if "error" in response:
+            raise RuntimeError(f"{method} failed: {response['error']}")
+        return response.get("result")
+
+    def _make_source(self, start_price: int):
+        if self.prices_path:
+            # Recorded time advances one second per simulated second
+            return ReplaySource(self.prices_path, speedup=1, clock=self.clock)
+        return RandomWalkSource(start_price, self.volatility, self.seed, clock=self.clock)
+
+    def _step(self, name: str, fn, *args):
+        try:
+            fn(*args)
+        except Exception as e:
+            self.errors += 1
+            log_message(f"Error in {name} at simulated second {self.clock.now:.0f}: {e}", "ERROR")
+
+    def run(self, ticks: int, trace_path: str = None, on_tick=None) -> dict:
+        """Run ticks blocks; on_tick(index, snap) is called with the snapshot after each one"""
+        first = snapshot(self.w3, self.wallets)
+        self.source = self._make_source(first.oracle_price)
+        start_timestamp = first.timestamp
+        next_oracle = 0.0
+        next_trade = {module.BOT_ID: 0.0 for module, _, _ in self.retailers}
+        samples = np.zeros((ticks, 3))  # oracle USD, dUSD pool deviation bps, dUSC pool deviation bps
+        transactions = gas_used = 0
+        started = time.perf_counter()
+
+        trace = open(trace_path, "w", newline="") if trace_path else None
+        writer = csv.writer(trace) if trace else None
+        if writer:
+            writer.writerow(("time", "block", "oracle_price", "dusd_pool_price", "dusc_pool_price", "transactions", "gas_used"))
+        self.rpc("evm_setAutomine", [False])
+        try:
+            snap = first
+            for index in range(ticks):
+                self.clock.now = index * self.tick
+                samples[index] = (snap.oracle_price_usd,
+                                  _deviation_bps(snap.dusd_pool_price, snap.oracle_price_usd),
+                                  _deviation_bps(snap.dusc_pool_price, snap.oracle_price_usd))
+
+                # Fixed order; intervals are honored in simulated time
+                if self.clock.now >= next_oracle:
+                    self._step("oracle bot", oracle_bot.step, self.w3, self.submitter, self.oracle_account, self.source, self.policy)
+                    next_oracle = self.clock.now + CONTROL.get("ORACLE_UPDATE_INTERVAL")
+                for module, account, rng in self.retailers:
+                    if self.clock.now >= next_trade[module.BOT_ID]:
+                        self._step(module.BOT_ID, module.step, self.w3, self.submitter, self.allowances, account, snap, rng)
+                        next_trade[module.BOT_ID] = self.clock.now + CONTROL.get("RETAIL_TRADE_INTERVAL")
+                for module, account in self.profit_bots:
+                    self._step(module.BOT_ID, module.step, self.w3, self.submitter, self.allowances, account, self.book, snap)
+
+                self.rpc("evm_setNextBlockTimestamp", [start_timestamp + round((index + 1) * self.tick)])
+                self.rpc("evm_mine", [])
+                block = self.w3.eth.get_block("latest")
+                self.submitter.new_block(block["number"])
+                self.submitter.poll()
+                transactions += len(block["transactions"])
+                gas_used += block["gasUsed"]
+                if writer:
+                    writer.writerow((self.clock.now, block["number"], snap.oracle_price, snap.prices["dusd_price"],
+                                     snap.prices["dusc_price"], len(block["transactions"]), block["gasUsed"]))
+                snap = snapshot(self.w3, self.wallets)
+                if on_tick:
+                    on_tick(index, snap)
+        finally:
+            self.rpc("evm_setAutomine", [True])
+            if trace:
+                trace.close()
+        wall_seconds = time.perf_counter() - started
+
+        pnl = {}
+        for wallet in self.wallets:
+            pnl[wallet] = round(_wallet_value(snap.balances[wallet], snap.oracle_price_usd)
+                                - _wallet_value(first.balances[wallet], first.oracle_price_usd), 2)
+        peg = {}
+        for column, pool in ((1, "dUSD/mWETH"), (2, "dUSC/mWETH")):
+            deviation = samples[:, column]
+            peg[pool] = {
+                "mean_bps": round(float(deviation.mean()), 2) if ticks else 0.0,
+                "mean_abs_bps": round(float(np.abs(deviation).mean()), 2) if ticks else 0.0,
+                "max_abs_bps": round(float(np.abs(deviation).max()), 2) if ticks else 0.0
+            }
+        simulated = ticks * self.tick
+        return {
+            "seed": self.seed,
+            "prices": self.source.name,
+            "ticks": ticks,
+            "tick_seconds": self.tick,
+            "simulated_seconds": simulated,
+            "wall_seconds": round(wall_seconds, 2),
+            "speedup": round(simulated / wall_seconds, 1) if wall_seconds else None,
+            "oracle_updates": self.policy.sent,
+            "transactions": transactions,
+            "gas_used": gas_used,
+            "step_errors": self.errors,
+            "oracle_price": {"start": first.oracle_price_usd, "end": snap.oracle_price_usd,
+                             "min": float(samples[:, 0].min()) if ticks else None,
+                             "max": float(samples[:, 0].max()) if ticks else None},
+            "peg_deviation": peg,
+            "pnl_usd": pnl,
+            "final_block": snap.block_number,
+            "state_digest": state_digest(snap)
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=float, default=1, help="simulated days")
+    parser.add_argument("--tick", type=float, default=60, help="simulated seconds per block")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prices", help="CSV or Parquet price path to replay, default a seeded random walk")
+    parser.add_argument("--volatility", type=float, default=DEFAULT_VOLATILITY, help="annualized random walk volatility")
+    parser.add_argument("--out", help="write the summary JSON here as well")
+    parser.add_argument("--trace", help="write one CSV row per tick here")
+    parser.add_argument("--keep", action="store_true", help="do not revert the simulated blocks afterwards")
+    args = parser.parse_args()
+
+    w3 = instrument(connect_rpc(), "simulate")
+    if not w3.is_connected():
+        print("Failed to connect to RPC")
+        return 1
+
+    simulation = Simulation(w3, args.seed, args.tick, args.prices, args.volatility)
+    ticks = int(args.days * 86400 / args.tick)
+    snapshot_id = simulation.rpc("evm_snapshot", [])
+    try:
+        summary = simulation.run(ticks, args.trace)
+    finally:
+        if not args.keep:
+            simulation.rpc("evm_revert", [snapshot_id])
+
+    text = json.dumps(summary, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Per-block state snapshot read through the Multicall contract in a single eth_call,
+plus the balance ledger's log sync when one is used
+"""
+from dataclasses import dataclass, field
+from web3 import Web3
+from contracts import TOKENS, address_of, encode_call, decode_result, get_contract
+from ledger import BalanceLedger
+
+def pool_price(reserves: tuple) -> int:
+    """Stablecoin per mWETH with 18 decimals, as computed by SimpleDEX.getDUSDPrice/getDUSCPrice"""
+    reserve0, reserve1 = reserves
+    if reserve1 == 0:
+        return 0
+    return (reserve0 * 10**18) // reserve1
+
+@dataclass
+class Snapshot:
+    """Ecosystem state as of one block"""
+    block_number: int
+    parent_hash: bytes  # hash of block_number - 1, as Multicall.blockAndAggregate returns it
+    timestamp: int  # block.timestamp of the block read
+    oracle_price: int  # 8 decimals, as returned by latestRoundData
+    dusd_reserves: tuple  # (dUSD, mWETH)
+    dusc_reserves: tuple  # (dUSC, mWETH)
+    balances: dict = field(default_factory=dict)  # wallet -> {"mWETH": int, "dUSD": int, "dUSC": int}
+    positions: dict = field(default_factory=dict)  # wallet -> (collateral, dusdDebt, duscDebt)
+    liquidatable: dict = field(default_factory=dict)  # wallet -> bool
+
+    @property
+    def oracle_price_usd(self) -> float:
+        return self.oracle_price / 1e8
+
+    @property
+    def dusd_pool_price(self) -> float:
+        return pool_price(self.dusd_reserves) / 1e18
+
+    @property
+    def dusc_pool_price(self) -> float:
+        return pool_price(self.dusc_reserves) / 1e18
+
+    @property
+    def prices(self) -> dict:
+        """Oracle and pool prices in on-chain units, as recorded with statistics"""
+        return {
+            "oracle_price": self.oracle_price,
+            "dusd_price": pool_price(self.dusd_reserves),
+            "dusc_price": pool_price(self.dusc_reserves)
+        }
+
+def _snapshot_calls(wallets: list, monitored: list, balances: bool = True) -> tuple:
+    """Multicall batch for a snapshot: (all wallets, [(contract, allowFailure, function, args), ...])"""
+    all_wallets = list(dict.fromkeys(list(wallets) + list(monitored)))
+
+    # (contract, allowFailure, function, args) in the order results are decoded
+    calls = [
+        ("multicall", False, "getCurrentBlockTimestamp", ()),
+        ("oracle", False, "latestRoundData", ()),
+        ("dex", False, "getDUSDPoolReserves", ()),
+        ("dex", False, "getDUSCPoolReserves", ())
+    ]
+    for wallet in all_wallets:
+        if balances:
+            for token in TOKENS.values():
+                calls.append((token, False, "balanceOf", (wallet,)))
+        calls.append(("lending", False, "positions", (wallet,)))
+    for wallet in monitored:
+        # canLiquidate reverts while the oracle price is unset
+        calls.append(("lending", True, "canLiquidate", (wallet,)))
+    return all_wallets, calls
+
+def _multicall_args(calls: list) -> list:
+    return [(address_of(name), allow_failure, encode_call(name, fn_name, *args)) for name, allow_failure, fn_name, args in calls]
+
+def _decode_snapshot(calls: list, all_wallets: list, monitored: list, block_number: int, parent_hash: bytes, results: list,
+                     balances: bool = True) -> Snapshot:
+    decoded = iter(
+        decode_result(name, fn_name, return_data) if success else None
+        for (name, _, fn_name, _), (success, return_data) in zip(calls, results)
+    )
+
+    timestamp = next(decoded)[0]
+    _, price, _, _, _ = next(decoded)
+    snap = Snapshot(
+        block_number=block_number,
+        parent_hash=parent_hash,
+        timestamp=timestamp,
+        oracle_price=price,
+        dusd_reserves=tuple(next(decoded)),
+        dusc_reserves=tuple(next(decoded))
+    )
+    for wallet in all_wallets:
+        if balances:
+            snap.balances[wallet] = {symbol: next(decoded)[0] for symbol in TOKENS}
+        snap.positions[wallet] = tuple(next(decoded))
+    for wallet in monitored:
+        result = next(decoded)
+        snap.liquidatable[wallet] = bool(result[0]) if result is not None else False
+    return snap
+
+def _ledger_balances(snap: Snapshot, all_wallets: list, ledger: BalanceLedger):
+    for wallet in all_wallets:
+        snap.balances[wallet] = ledger.balances(wallet)
+
+def snapshot(w3: Web3, wallets: list, monitored: list = (), block_identifier="latest", ledger: BalanceLedger = None) -> Snapshot:
+    """Read oracle price, pool reserves, wallet balances and lending positions in one eth_call.
+
+    wallets get their token balances and lending positions read; monitored
+    wallets additionally get canLiquidate evaluated. All values come from the
+    same block, whose number and parent hash are returned with the data.
+    With a ledger the balances are left out of the eth_call and taken from
+    the ledger, synced to exactly the snapshot's block; that sync adds an
+    eth_getLogs for the blocks since the last one, and a balanceOf multicall
+    when wallets are seeded or reconciled.
+    """
+    all_wallets, calls = _snapshot_calls(wallets, monitored, balances=ledger is None)
+    multicall = get_contract(w3, "multicall")
+    block_number, parent_hash, results = multicall.functions.blockAndAggregate(
+        _multicall_args(calls)
+    ).call(block_identifier=block_identifier)
+    snap = _decode_snapshot(calls, all_wallets, monitored, block_number, parent_hash, results, balances=ledger is None)
+    if ledger is not None:
+        ledger.track(all_wallets)
+        ledger.sync(w3, block_number)
+        _ledger_balances(snap, all_wallets, ledger)
+    return snap
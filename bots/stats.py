@@ -0,0 +1,320 @@
+"""
+Time-segmented statistics store and query CLI
+
+log_statistics records land in fixed-size binary records (RECORD below) with
+typed numeric fields, appended to one segment file per STATS_SEGMENT_SECONDS
+of wall-clock time under STATS_DIR. Records are timestamped under the
+segment's append lock, so every segment is sorted by time, and every
+INDEX_INTERVAL-th record's timestamp goes to a sparse .idx file next to it.
+A query only opens the segments overlapping its range, memory-maps them and
+uses the index to find where the range starts in the boundary segments, so
+the aggregates are computed with NumPy over just the matching records.
+
+Token amounts are stored in whole tokens as float64, stablecoins counted at
+$1, which is plenty for volume and PnL reporting; exact wei amounts stay on
+chain and in the event index.
+
+Usage:
+    python stats.py summary --since 1h        # volume, trades, PnL per wallet, peg deviation
+    python stats.py summary --from 2026-10-01 --to 2026-10-02
+    python stats.py dump --since 10m          # matching records as JSON lines
+"""
+import argparse
+import bisect
+import fcntl
+import json
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+import numpy as np
+from web3 import Web3
+from config import STATS_DIR, STATS_SEGMENT_SECONDS
+from contracts import decode_events
+
+RECORD = np.dtype([
+    ("timestamp", "<f8"),
+    ("kind", "u1"),
+    ("pool", "u1"),
+    ("wallet", "V20"),
+    ("tx_hash", "V32"),
+    ("block_number", "<u8"),
+    ("gas_used", "<u8"),
+    # Net changes for the wallet, in tokens
+    ("stable_delta", "<f8"),
+    ("weth_delta", "<f8"),
+    ("debt_delta", "<f8"),
+    ("collateral_delta", "<f8"),
+    # Stablecoin side of the swaps in each pool
+    ("volume_dusd", "<f8"),
+    ("volume_dusc", "<f8"),
+    # USD per mWETH when the transaction was decided, 0 if unknown
+    ("oracle_price", "<f8"),
+    ("dusd_price", "<f8"),
+    ("dusc_price", "<f8")
+])
+_PACK = struct.Struct("<dBB20s32sQQ9d")
+assert _PACK.size == RECORD.itemsize
+
+# Sparse index entries: (timestamp, record number) of every INDEX_INTERVAL-th record
+INDEX = np.dtype([("timestamp", "<f8"), ("record", "<u8")])
+INDEX_INTERVAL = 1024
+
+# Record kinds, from the "type" of the logged data
+KINDS = ("other", "buy", "sell", "arbitrage", "liquidation", "borrow", "repay", "oracle_update")
+TRADE_KINDS = (KINDS.index("buy"), KINDS.index("sell"), KINDS.index("arbitrage"))
+
+# Pools touched: 1 dUSD/mWETH, 2 dUSC/mWETH, 3 both
+POOL_CODES = {"dUSD/mWETH": 1, "dUSC/mWETH": 2}
+
+# Swap event -> (pool, stablecoin amount arg, stablecoin sign, mWETH amount arg, mWETH sign) for the sender
+SWAP_FLOWS = {
+    "SwapDUSDForWETH": (1, "dusdIn", -1, "wethOut", 1),
+    "SwapWETHForDUSD": (1, "dusdOut", 1, "wethIn", -1),
+    "SwapDUSCForWETH": (2, "duscIn", -1, "wethOut", 1),
+    "SwapWETHForDUSC": (2, "duscOut", 1, "wethIn", -1)
+}
+
+WEI = 10**18
+
+def _tokens(value) -> float:
+    return int(value) / WEI
+
+def _apply_receipt(fields: dict, receipt):
+    """Fill the flow fields from the SimpleDEX and LendingProtocol events the wallet caused"""
+    wallet = receipt["from"].lower()
+    for name, event, args in decode_events(receipt["logs"]):
+        if name not in ("dex", "lending"):
+            continue
+        if event in SWAP_FLOWS:
+            pool, stable_arg, stable_sign, weth_arg, weth_sign = SWAP_FLOWS[event]
+            fields["pool"] |= pool
+            fields["volume_dusd" if pool == 1 else "volume_dusc"] += _tokens(args[stable_arg])
+            if args["user"].lower() == wallet:
+                fields["stable_delta"] += stable_sign * _tokens(args[stable_arg])
+                fields["weth_delta"] += weth_sign * _tokens(args[weth_arg])
+        elif event == "Liquidate" and args["liquidator"].lower() == wallet:
+            fields["stable_delta"] -= _tokens(args["debtRepaid"])
+            fields["weth_delta"] += _tokens(args["collateralSeized"])
+        elif args.get("user", "").lower() != wallet:
+            continue
+        elif event == "Borrow":
+            borrowed = _tokens(args["dusdAmount"]) + _tokens(args["duscAmount"])
+            fields["stable_delta"] += borrowed
+            fields["debt_delta"] += borrowed
+        elif event == "Repay":
+            repaid = _tokens(args["dusdAmount"]) + _tokens(args["duscAmount"])
+            fields["stable_delta"] -= repaid
+            fields["debt_delta"] -= repaid
+        elif event == "DepositCollateral":
+            fields["weth_delta"] -= _tokens(args["amount"])
+            fields["collateral_delta"] += _tokens(args["amount"])
+        elif event == "WithdrawCollateral":
+            fields["weth_delta"] += _tokens(args["amount"])
+            fields["collateral_delta"] -= _tokens(args["amount"])
+
+def pack_record(event_type: str, data: dict, receipt=None) -> bytes:
+    """One RECORD for a log_statistics call, timestamp left at 0 for the writer to set.
+
+    Known keys of data: type, pool, wallet, oracle_price (8 decimals, as on
+    chain), dusd_price and dusc_price (18 decimals, as SimpleDEX reports them).
+    With a receipt the wallet, block, gas and token flows come from the
+    transaction itself.
+    """
+    fields = dict.fromkeys(RECORD.names[7:], 0.0)
+    kind = data.get("type", "oracle_update" if event_type == "ORACLE" else "other")
+    fields["pool"] = POOL_CODES.get(data.get("pool"), 0)
+    fields["oracle_price"] = int(data.get("oracle_price", 0)) / 1e8
+    fields["dusd_price"] = _tokens(data.get("dusd_price", 0))
+    fields["dusc_price"] = _tokens(data.get("dusc_price", 0))
+    wallet = data.get("wallet")
+    tx_hash, block_number, gas_used = bytes(32), 0, 0
+    if receipt is not None:
+        _apply_receipt(fields, receipt)
+        wallet = receipt["from"]
+        tx_hash, block_number, gas_used = bytes(receipt["transactionHash"]), receipt["blockNumber"], receipt["gasUsed"]
+    return _PACK.pack(
+        0.0, KINDS.index(kind) if kind in KINDS else 0, fields.pop("pool"),
+        bytes.fromhex(wallet[2:]) if wallet else bytes(20), tx_hash, block_number, gas_used,
+        *fields.values()
+    )
+
+def segment_start(timestamp: float, segment_seconds: int = STATS_SEGMENT_SECONDS) -> int:
+    return int(timestamp // segment_seconds * segment_seconds)
+
+class StatsStore:
+    """Appends packed records to the segment of the current time; safe across processes"""
+
+    def __init__(self, directory: str = STATS_DIR, segment_seconds: int = STATS_SEGMENT_SECONDS):
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self._lock_fd = None
+
+    def append(self, records: list):
+        if not records:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self._lock_fd is None:
+            self._lock_fd = os.open(os.path.join(self.directory, ".lock"), os.O_WRONLY | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+        try:
+            # Stamped under the lock, so records of all processes are appended in time order
+            now = time.time()
+            path = os.path.join(self.directory, f"{segment_start(now, self.segment_seconds)}.seg")
+            fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                size = os.fstat(fd).st_size
+                first = size // RECORD.itemsize
+                if size % RECORD.itemsize:
+                    # A writer died mid-record: drop the partial one
+                    os.ftruncate(fd, first * RECORD.itemsize)
+                if first:
+                    # Never go backwards if the wall clock did
+                    now = max(now, struct.unpack("<d", os.pread(fd, 8, (first - 1) * RECORD.itemsize))[0])
+                stamp = struct.pack("<d", now)
+                os.write(fd, b"".join(stamp + record[8:] for record in records))
+            finally:
+                os.close(fd)
+            index = [(now, number) for number in range(first, first + len(records)) if number % INDEX_INTERVAL == 0]
+            if index:
+                with open(path[:-4] + ".idx", "ab") as f:
+                    f.write(np.array(index, dtype=INDEX).tobytes())
+        finally:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+def _segments(directory: str, start: float, end: float, segment_seconds: int) -> list:
+    """Segment start times overlapping [start, end), ascending"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    starts = sorted(int(name[:-4]) for name in names if name.endswith(".seg") and name[:-4].isdigit())
+    return [s for s in starts if s + segment_seconds > start and s < end]
+
+def _search(path: str, records: np.ndarray, timestamp: float) -> int:
+    """First record at or after timestamp, narrowed with the sparse index"""
+    lo, hi = 0, len(records)
+    try:
+        index = np.fromfile(path[:-4] + ".idx", dtype=INDEX)
+    except FileNotFoundError:
+        index = np.empty(0, dtype=INDEX)
+    if len(index):
+        block = bisect.bisect_left(index["timestamp"], timestamp)
+        if block > 0:
+            lo = min(int(index["record"][block - 1]), hi)
+        if block < len(index):
+            hi = min(int(index["record"][block]), hi)
+    return lo + int(np.searchsorted(records["timestamp"][lo:hi], timestamp, side="left"))
+
+def read_records(start: float, end: float, directory: str = STATS_DIR,
+                 segment_seconds: int = STATS_SEGMENT_SECONDS) -> np.ndarray:
+    """All records with start <= timestamp < end, in time order"""
+    parts = []
+    for segment in _segments(directory, start, end, segment_seconds):
+        path = os.path.join(directory, f"{segment}.seg")
+        with open(path, "rb") as f:
+            count = os.fstat(f.fileno()).st_size // RECORD.itemsize
+            if not count:
+                continue
+            with mmap.mmap(f.fileno(), count * RECORD.itemsize, access=mmap.ACCESS_READ) as mm:
+                records = np.frombuffer(mm, dtype=RECORD, count=count)
+                lo = _search(path, records, start) if segment < start else 0
+                hi = _search(path, records, end) if segment + segment_seconds > end else count
+                # Copy out the matching slice so the map can be closed
+                parts.append(records[lo:hi].copy())
+                del records
+    return np.concatenate(parts) if parts else np.empty(0, dtype=RECORD)
+
+def summarize(records: np.ndarray, mark_price: float = None) -> dict:
+    """Volume and trade count per pool, PnL per wallet and peg deviation per pool"""
+    trades = records[np.isin(records["kind"], TRADE_KINDS)]
+    priced = records[records["oracle_price"] > 0]
+    if mark_price is None:
+        mark_price = float(priced["oracle_price"][-1]) if len(priced) else 0.0
+
+    summary = {"records": len(records), "mark_price": mark_price, "pools": {}, "wallets": {}, "peg_deviation": {}}
+    for pool, code, volume, price in (("dUSD/mWETH", 1, "volume_dusd", "dusd_price"),
+                                      ("dUSC/mWETH", 2, "volume_dusc", "dusc_price")):
+        in_pool = trades[(trades["pool"] & code) != 0]
+        summary["pools"][pool] = {"trades": len(in_pool), "volume": float(in_pool[volume].sum())}
+
+        pool_prices = priced[priced[price] > 0]
+        if len(pool_prices):
+            deviation = pool_prices[price] / pool_prices["oracle_price"] - 1
+            summary["peg_deviation"][pool] = {
+                "samples": len(deviation),
+                "mean": float(deviation.mean()),
+                "max_abs": float(np.abs(deviation).max())
+            }
+
+    wallets, inverse = np.unique(records["wallet"], return_inverse=True)
+    for i, wallet in enumerate(wallets):
+        if not bytes(wallet).strip(b"\0"):
+            continue
+        mine = records[inverse == i]
+        stable = float(mine["stable_delta"].sum())
+        weth = float(mine["weth_delta"].sum() + mine["collateral_delta"].sum())
+        debt = float(mine["debt_delta"].sum())
+        summary["wallets"][Web3.to_checksum_address(bytes(wallet))] = {
+            "trades": int(np.isin(mine["kind"], TRADE_KINDS).sum()),
+            "gas_used": int(mine["gas_used"].sum()),
+            "pnl": stable + weth * mark_price - debt
+        }
+    return summary
+
+def _record_json(record) -> dict:
+    entry = {name: record[name].item() for name in RECORD.names}
+    entry["timestamp"] = datetime.fromtimestamp(entry["timestamp"]).strftime("%Y-%m-%d %H:%M:%S.%f")
+    entry["kind"] = KINDS[entry["kind"]]
+    entry["wallet"] = Web3.to_checksum_address(bytes(record["wallet"]))
+    entry["tx_hash"] = "0x" + bytes(record["tx_hash"]).hex()
+    return entry
+
+def parse_time(value: str, now: float) -> float:
+    """Unix time, ISO date/time, or a duration before now such as 90s, 15m, 1h, 7d"""
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return now - float(value[:-1]) * units[value[-1]]
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("command", choices=("summary", "dump"))
+    parser.add_argument("--since", help="start of the range as a duration before now (1h, 7d) or a time")
+    parser.add_argument("--from", dest="start", help="start of the range (unix time or ISO)")
+    parser.add_argument("--to", dest="end", help="end of the range, default now")
+    parser.add_argument("--mark-price", type=float, help="USD per mWETH for PnL, default the last oracle price in range")
+    parser.add_argument("--dir", default=STATS_DIR, help="statistics directory")
+    args = parser.parse_args()
+
+    now = time.time()
+    start = parse_time(args.since or args.start, now) if (args.since or args.start) else 0.0
+    end = parse_time(args.end, now) if args.end else now
+
+    started = time.perf_counter()
+    records = read_records(start, end, args.dir)
+    if args.command == "dump":
+        for record in records:
+            print(json.dumps(_record_json(record)))
+        return
+
+    summary = summarize(records, args.mark_price)
+    elapsed = time.perf_counter() - started
+    print(f"{summary['records']} records between {datetime.fromtimestamp(start):%Y-%m-%d %H:%M:%S} "
+          f"and {datetime.fromtimestamp(end):%Y-%m-%d %H:%M:%S} ({elapsed * 1000:.0f} ms)")
+    print(f"\n{'pool':<12} {'trades':>8} {'volume':>16}")
+    for pool, entry in summary["pools"].items():
+        print(f"{pool:<12} {entry['trades']:>8} {entry['volume']:>16,.2f}")
+    print(f"\n{'wallet':<44} {'trades':>8} {'gas used':>12} {'PnL at $' + format(summary['mark_price'], '.2f'):>18}")
+    for wallet, entry in summary["wallets"].items():
+        print(f"{wallet:<44} {entry['trades']:>8} {entry['gas_used']:>12} {entry['pnl']:>18,.2f}")
+    print(f"\n{'peg deviation':<12} {'samples':>8} {'mean':>10} {'max abs':>10}")
+    for pool, entry in summary["peg_deviation"].items():
+        print(f"{pool:<12} {entry['samples']:>8} {entry['mean']:>10.4%} {entry['max_abs']:>10.4%}")
+
+if __name__ == "__main__":
+    main()
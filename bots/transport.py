@@ -0,0 +1,149 @@
+"""
+RPC transport of the bots: keep-alive HTTP with JSON-RPC batching, or anvil's IPC socket
+
+connect_rpc() returns the Web3 connection a bot uses. Over HTTP every thread of
+the process shares one requests session holding up to RPC_POOL_SIZE
+keep-alive connections, so no request pays for a TCP handshake. Reads are
+sent through a line of up to RPC_POOL_SIZE requests on the wire at once: a
+read issued while a connection is free goes out at once, and reads issued
+while all of them are busy wait for the first to come back and then leave
+together as one JSON-RPC batch of up to RPC_BATCH_SIZE requests. A read is
+never held back while a connection is free, and a burst larger than the
+pool costs one round trip per batch instead of one per read. eth_getLogs and
+eth_getBlockReceipts, which can take long to answer, would hold up every
+read batched with them and so are sent on their own, as are transactions,
+filters and anvil/evm control calls.
+
+With RPC_IPC_PATH set (anvil --ipc <path>), requests go over that Unix
+socket instead: one persistent connection, no HTTP framing, no batching.
+"""
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from web3 import Web3
+# The encoder HTTPProvider uses for a single request
+from web3._utils.encoding import FriendlyJsonSerde, Web3JsonEncoder
+from config import RPC_URL, RPC_IPC_PATH, RPC_POOL_SIZE, RPC_BATCH_SIZE, RPC_TIMEOUT
+
+# Read-only methods that may share a batch; anything else is sent on its own
+BATCHED_PREFIXES = ("eth_", "net_", "web3_")
+UNBATCHED_METHODS = {"eth_sendRawTransaction", "eth_sendTransaction", "eth_sign", "eth_signTransaction",
+                     "eth_newFilter", "eth_newBlockFilter", "eth_newPendingTransactionFilter", "eth_uninstallFilter",
+                     # A batch is answered when its slowest request is, so reads that may scan many blocks go alone
+                     "eth_getLogs", "eth_getBlockReceipts"}
+
+def rpc_session(pool_size: int = RPC_POOL_SIZE) -> requests.Session:
+    """Keep-alive session that reconnects after a dropped connection but never resends a request the node may have read"""
+    session = requests.Session()
+    retries = Retry(total=2, read=False, status=False, backoff_factor=0.1)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def batchable(method: str) -> bool:
+    return method.startswith(BATCHED_PREFIXES) and method not in UNBATCHED_METHODS
+
+class _Call:
+    """A read waiting for a batch"""
+
+    def __init__(self, method: str, params):
+        self.method = method
+        self.params = params
+        self.response = None
+        self.error = None
+        self.sent = False
+        self.done = False
+
+class BatchingHTTPProvider(Web3.HTTPProvider):
+    """HTTPProvider over a shared keep-alive session that batches the reads issued while every connection is busy"""
+
+    def __init__(self, endpoint_uri: str = RPC_URL, pool_size: int = RPC_POOL_SIZE, batch_size: int = RPC_BATCH_SIZE,
+                 timeout: float = RPC_TIMEOUT):
+        super().__init__(endpoint_uri)
+        self.session = rpc_session(pool_size)
+        self.pool_size = pool_size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.posts = 0  # HTTP requests sent
+        self.batched = 0  # JSON-RPC requests that shared a batch with others
+        self._queue = []
+        self._in_flight = 0  # batches on the wire
+        self._line = threading.Condition()
+
+    def _post(self, payload: bytes):
+        self.posts += 1
+        response = self.session.post(self.endpoint_uri, data=payload, headers=self.get_request_headers(), timeout=self.timeout)
+        response.raise_for_status()
+        return self.decode_rpc_response(response.content)
+
+    def make_request(self, method, params):
+        if self.batch_size <= 1 or not batchable(method):
+            return self._post(self.encode_rpc_request(method, params))
+        call = _Call(method, params)
+        with self._line:
+            self._queue.append(call)
+            while True:
+                # Wait until our batch was answered, or it is still queued and a connection is free to send the next one
+                while not call.done and (call.sent or self._in_flight >= self.pool_size):
+                    self._line.wait()
+                if call.done:
+                    break
+                self._in_flight += 1
+                batch = self._queue[:self.batch_size]
+                del self._queue[:len(batch)]
+                for queued in batch:
+                    queued.sent = True
+                self._line.release()
+                try:
+                    self._send(batch)
+                finally:
+                    self._line.acquire()
+                    self._in_flight -= 1
+                    self._line.notify_all()
+        if call.error is not None:
+            raise call.error
+        return call.response
+
+    def _send(self, batch: list):
+        """Send the calls as one request (one batch when there are several) and hand out the responses"""
+        try:
+            if len(batch) == 1:
+                batch[0].response = self._post(self.encode_rpc_request(batch[0].method, batch[0].params))
+            else:
+                calls = {next(self.request_counter): call for call in batch}
+                payload = FriendlyJsonSerde().json_encode([
+                    {"jsonrpc": "2.0", "method": call.method, "params": call.params or [], "id": request_id}
+                    for request_id, call in calls.items()
+                ], Web3JsonEncoder)
+                responses = self._post(payload.encode())
+                self.batched += len(batch)
+                if isinstance(responses, dict):
+                    # The node refused the batch as a whole
+                    for call in batch:
+                        call.response = responses
+                else:
+                    for response in responses:
+                        call = calls.get(response.get("id"))
+                        if call is not None:
+                            call.response = response
+                    for call in batch:
+                        if call.response is None:
+                            call.error = ValueError(f"No response to {call.method} in a batch of {len(batch)}")
+        except Exception as e:
+            for call in batch:
+                if call.response is None:
+                    call.error = e
+        for call in batch:
+            call.done = True
+
+def make_provider():
+    """The configured provider: IPC when RPC_IPC_PATH is set, batching HTTP otherwise"""
+    if RPC_IPC_PATH:
+        return Web3.IPCProvider(RPC_IPC_PATH, timeout=RPC_TIMEOUT)
+    return BatchingHTTPProvider(RPC_URL)
+
+def connect_rpc() -> Web3:
+    """A Web3 connection over the configured transport"""
+    return Web3(make_provider())
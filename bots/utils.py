@@ -1,35 +1,33 @@
 """
 Utility functions for bots
 """
-import json
+import threading
 import time
-from datetime import datetime
+from concurrent.futures import Future
 from web3 import Web3
-from config import LOG_FILE, STATS_FILE
+from web3.exceptions import TransactionNotFound
+# web3 6 has no eth_getBlockReceipts method; its receipt formatter gives the same result as get_transaction_receipt
+from web3._utils.method_formatters import receipt_formatter
+from config import KILL_SWITCH_FILE, FEE_MAX_AGE, FEE_PRIORITY_PERCENTILE, MIN_PRIORITY_FEE, GAS_LIMIT_MARGIN
+from logger import LOGGER
+from contracts import call_view, decode_events, get_contract, token_name
+from signing import SigningPool, send_signed, sign
 
 def log_message(message: str, level: str = "INFO"):
-    """Log a message to the log file"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = f"[{timestamp}] [{level}] {message}\n"
-    with open(LOG_FILE, "a") as f:
-        f.write(log_entry)
-    print(log_entry.strip())
-
-def log_statistics(event_type: str, data: dict):
-    """Log statistics to the statistics file"""
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    entry = {
-        "timestamp": timestamp,
-        "event_type": event_type,
-        "data": data
-    }
-    with open(STATS_FILE, "a") as f:
-        f.write(json.dumps(entry) + "\n")
-
-def check_kill_switch():
+    """Log a message to the log file and stdout, written in the background"""
+    LOGGER.log(message, level)
+
+def log_statistics(event_type: str, data: dict, receipt=None):
+    """Record statistics in the statistics store, written in the background.
+
+    With the receipt of the transaction, the token flows are taken from its events.
+    """
+    LOGGER.stats(event_type, data, receipt)
+
+def check_kill_switch(path: str = KILL_SWITCH_FILE):
     """Check if kill switch is activated"""
     try:
-        with open(".kill_switch", "r") as f:
+        with open(path, "r") as f:
             return f.read().strip() == "1"
     except FileNotFoundError:
         return False
@@ -46,9 +44,7 @@ def get_balance(w3: Web3, address: str, token_address: str = None) -> int:
     """Get balance of an address (native or ERC20)"""
     if token_address:
         # ERC20 balance
-        abi = [{"constant": True, "inputs": [{"name": "_owner", "type": "address"}], "name": "balanceOf", "outputs": [{"name": "balance", "type": "uint256"}], "type": "function"}]
-        contract = w3.eth.contract(address=token_address, abi=abi)
-        return contract.functions.balanceOf(address).call()
+        return call_view(w3, token_name(token_address), "balanceOf", address)
     else:
         # Native balance
         return w3.eth.get_balance(address)
@@ -60,5 +56,539 @@ def log_wallet_balances(w3: Web3, wallet_address: str, wallet_name: str,
     dusd_balance = get_balance(w3, wallet_address, dusd_address)
     dusc_balance = get_balance(w3, wallet_address, dusc_address)
     
-    log_message(f"{wallet_name} balances - mWETH: {format_ether(mweth_balance):.6f}, "
-                f"dUSD: {format_ether(dusd_balance):.2f}, dUSC: {format_ether(dusc_balance):.2f}")
+    log_balances(wallet_name, {"mWETH": mweth_balance, "dUSD": dusd_balance, "dUSC": dusc_balance})
+
+def log_balances(wallet_name: str, balances: dict):
+    """Log already-fetched wallet balances (token name -> wei)"""
+    log_message(f"{wallet_name} balances - mWETH: {format_ether(balances['mWETH']):.6f}, "
+                f"dUSD: {format_ether(balances['dUSD']):.2f}, dUSC: {format_ether(balances['dUSC']):.2f}")
+
+class TransactionReverted(Exception):
+    """Raised when a submitted transaction is mined with a failed status"""
+
+    def __init__(self, tx_hash, receipt, reason: str = ""):
+        message = f"Transaction {tx_hash.hex()} reverted in block {receipt.blockNumber}"
+        super().__init__(f"{message}: {reason}" if reason else message)
+        self.tx_hash = tx_hash
+        self.receipt = receipt
+        self.reason = reason
+
+class TransactionDropped(Exception):
+    """Raised when a transaction's nonce was consumed by another transaction"""
+
+class PendingTransaction(Future):
+    """Future resolved with the receipt of a submitted transaction"""
+
+    def __init__(self, account, tx: dict, tx_hash, description: str = "", gas_key: tuple = None):
+        super().__init__()
+        self.account = account
+        self.tx = tx
+        self.tx_hash = tx_hash
+        self.description = description
+        # GasLimits entry the gas limit came from, None when it was the caller's fallback
+        self.gas_key = gas_key
+        self.sent_at = time.monotonic()
+        self.hashes = [tx_hash]
+
+    @property
+    def nonce(self) -> int:
+        return self.tx["nonce"]
+
+    def events(self) -> list:
+        """(contract, event, args) decoded from the receipt's logs, in order; waits for the receipt"""
+        if not hasattr(self, "_events"):
+            self._events = decode_events(self.result()["logs"])
+        return self._events
+
+    def event(self, name: str) -> dict:
+        """Arguments of the last event called name, e.g. event("SwapDUSDForWETH")["wethOut"]; None if not emitted"""
+        for _, event, args in reversed(self.events()):
+            if event == name:
+                return args
+        return None
+
+def _is_nonce_error(error: Exception) -> bool:
+    """Check whether a send error was caused by a stale or out-of-order nonce"""
+    message = str(error).lower()
+    return "nonce" in message and ("low" in message or "high" in message or "already" in message)
+
+class FeeOracle:
+    """Fee fields for new transactions, read from the chain at most once per block.
+
+    On chains with a base fee the quote comes from one eth_feeHistory call:
+    maxPriorityFeePerGas is the FEE_PRIORITY_PERCENTILE tip of the latest block
+    (at least MIN_PRIORITY_FEE) and maxFeePerGas adds twice the next block's
+    base fee, which stays valid through six full blocks of base fee increases.
+    Elsewhere a legacy gasPrice is used. The quote is reused until new_block()
+    reports a later block, or for max_age seconds where nobody reports blocks.
+    """
+
+    def __init__(self, w3: Web3, max_age: float = FEE_MAX_AGE, clock=time.monotonic):
+        self.w3 = w3
+        self.max_age = max_age
+        self.clock = clock
+        self.reads = 0
+        self._fees = None
+        self._block = -1
+        self._read_at = 0.0
+        self._eip1559 = None
+        self._lock = threading.Lock()
+
+    def new_block(self, block_number: int):
+        """Drop the quote if it was read before block_number"""
+        with self._lock:
+            if block_number > self._block:
+                self._fees = None
+
+    def invalidate(self):
+        with self._lock:
+            self._fees = None
+
+    def _read(self) -> tuple:
+        """(block number, fee fields) from the node"""
+        if self._eip1559 is not False:
+            try:
+                history = self.w3.eth.fee_history(1, "latest", [FEE_PRIORITY_PERCENTILE])
+                # baseFeePerGas holds the latest block's base fee and the next one's
+                next_base_fee = history["baseFeePerGas"][-1]
+                if next_base_fee:
+                    self._eip1559 = True
+                    tip = max(history["reward"][0][0] if history.get("reward") else 0, MIN_PRIORITY_FEE)
+                    return history["oldestBlock"], {"maxFeePerGas": 2 * next_base_fee + tip, "maxPriorityFeePerGas": tip}
+            except Exception as e:
+                log_message(f"eth_feeHistory unavailable ({e}), using legacy gas prices", "WARNING")
+            self._eip1559 = False
+        return self._block, {"gasPrice": self.w3.eth.gas_price}
+
+    def fees(self) -> dict:
+        """maxFeePerGas and maxPriorityFeePerGas, or gasPrice, for a transaction sent now"""
+        with self._lock:
+            if self._fees is None or self.clock() - self._read_at > self.max_age:
+                self._block, self._fees = self._read()
+                self._read_at = self.clock()
+                self.reads += 1
+            return dict(self._fees)
+
+class GasLimits:
+    """Gas limit per contract function, estimated once and raised after an out-of-gas failure.
+
+    The first transaction calling a function is estimated with eth_estimateGas
+    and given margin on top; later calls reuse that limit without a round trip.
+    If the estimate fails, e.g. because the call depends on a transaction that
+    is not mined yet, the caller's fallback limit is used and nothing is cached.
+    A transaction that runs out of gas drops its entry, and the next estimate
+    is raised to at least margin times the limit that was too small.
+    """
+
+    def __init__(self, w3: Web3, margin: float = GAS_LIMIT_MARGIN):
+        self.w3 = w3
+        self.margin = margin
+        self.estimates = 0
+        self._limits = {}
+        self._floors = {}
+        self._lock = threading.Lock()
+
+    def limit(self, account, contract_function, fallback: int) -> tuple:
+        """(cache key or None, gas limit) for calling contract_function from account"""
+        key = (contract_function.address, contract_function.fn_name)
+        with self._lock:
+            if key in self._limits:
+                return key, self._limits[key]
+        try:
+            estimate = contract_function.estimate_gas({"from": account.address})
+        except Exception:
+            return None, fallback
+        with self._lock:
+            self.estimates += 1
+            gas = max(int(estimate * self.margin), self._floors.get(key, 0))
+            self._limits[key] = gas
+        return key, gas
+
+    def out_of_gas(self, key: tuple, gas: int):
+        with self._lock:
+            self._limits.pop(key, None)
+            self._floors[key] = max(self._floors.get(key, 0), int(gas * self.margin))
+
+# Most blocks scanned with eth_getBlockReceipts in one poll before falling back to a receipt per transaction
+MAX_SCANNED_BLOCKS = 32
+
+class TransactionSubmitter:
+    """Sends signed transactions with locally tracked nonces and confirms them in the background.
+
+    Nonces are read from the chain once per account and incremented locally, so
+    dependent transactions (approve, swap, swap) can be sent back to back without
+    waiting for each other to be mined. A daemon thread resolves the returned
+    PendingTransaction futures: on every new block (reported with new_block(),
+    or found with eth_blockNumber every poll_interval seconds) it reads all the
+    block's receipts in one eth_getBlockReceipts call and matches them against
+    every transaction in flight, so confirming costs one call per block however
+    many transactions wait. Transactions that stay unmined for longer than
+    stuck_timeout are rebroadcast or replaced with a higher gas price. With
+    background=False no thread is started and the caller resolves the futures
+    itself with poll(), e.g. right after mining.
+    Fees come from a per-block FeeOracle and gas limits from GasLimits, so a
+    send costs no fee or estimate round trip once both are warm.
+    """
+
+    def __init__(self, w3: Web3, poll_interval: float = 0.5, stuck_timeout: float = 30.0,
+                 gas_price_bump: float = 1.125, background: bool = True):
+        self.w3 = w3
+        self.background = background
+        self.poll_interval = poll_interval
+        self.stuck_timeout = stuck_timeout
+        self.gas_price_bump = gas_price_bump
+        self.fees = FeeOracle(w3)
+        self.gas_limits = GasLimits(w3)
+        self._chain_id = None
+        self._nonces = {}
+        self._pending = {}
+        self._lock = threading.RLock()
+        self._watcher = None
+        # Highest block reported by new_block() since the last poll, and the last block whose receipts were read
+        self._head = None
+        self._scanned = None
+        self._block_receipts = True
+        self._wake = threading.Event()
+
+    @property
+    def chain_id(self) -> int:
+        if self._chain_id is None:
+            self._chain_id = self.w3.eth.chain_id
+        return self._chain_id
+
+    def resync_nonce(self, address: str) -> int:
+        """Reload the next nonce for an account from the chain's pending state"""
+        with self._lock:
+            self._nonces[address] = self.w3.eth.get_transaction_count(address, "pending")
+            return self._nonces[address]
+
+    def _reserve_nonce(self, address: str) -> int:
+        if address not in self._nonces:
+            self.resync_nonce(address)
+        nonce = self._nonces[address]
+        self._nonces[address] = nonce + 1
+        return nonce
+
+    def _sign_and_send(self, account, tx: dict):
+        return self.w3.eth.send_raw_transaction(sign(account.key, tx).raw)
+
+    def send(self, account, contract_function, gas: int, description: str = "") -> PendingTransaction:
+        """Build, sign and send a contract call without waiting for it to be mined.
+
+        gas is only used when the function's gas limit cannot be estimated.
+        """
+        gas_key, gas = self.gas_limits.limit(account, contract_function, gas)
+        with self._lock:
+            tx = contract_function.build_transaction({
+                "from": account.address,
+                "nonce": self._reserve_nonce(account.address),
+                "gas": gas,
+                "chainId": self.chain_id,
+                **self.fees.fees()
+            })
+            try:
+                tx_hash = self._sign_and_send(account, tx)
+            except ValueError as e:
+                if not _is_nonce_error(e):
+                    # Nothing was broadcast, so the nonce is still free
+                    self._nonces[account.address] = tx["nonce"]
+                    raise
+                log_message(f"Nonce {tx['nonce']} rejected for {account.address}, resyncing: {e}", "WARNING")
+                self.resync_nonce(account.address)
+                tx["nonce"] = self._reserve_nonce(account.address)
+                tx_hash = self._sign_and_send(account, tx)
+
+            pending = PendingTransaction(account, tx, tx_hash, description, gas_key)
+            self._pending[tx_hash] = pending
+            self._ensure_watcher()
+        return pending
+
+    def send_many(self, orders: list, pool: SigningPool) -> list:
+        """send() for many (account, contract_function, gas, description) orders, signed in parallel by pool.
+
+        Nonces are reserved in the given order, so each account's transactions
+        reach the node in that order. A transaction the node rejects resolves
+        its PendingTransaction with the error, and the account's later ones in
+        the batch are not sent.
+        """
+        limits = [self.gas_limits.limit(account, contract_function, gas) for account, contract_function, gas, _ in orders]
+        with self._lock:
+            fees = self.fees.fees()
+            txs = [contract_function.build_transaction({
+                "from": account.address,
+                "nonce": self._reserve_nonce(account.address),
+                "gas": gas,
+                "chainId": self.chain_id,
+                **fees
+            }) for (account, contract_function, _, _), (_, gas) in zip(orders, limits)]
+            signed = pool.sign([(account, tx) for (account, _, _, _), tx in zip(orders, txs)])
+            errors = send_signed(self.w3, signed)
+            pendings = []
+            failed = set()
+            for (account, _, _, description), (gas_key, _), tx, signed_tx, error in zip(orders, limits, txs, signed, errors):
+                pending = PendingTransaction(account, tx, signed_tx.hash, description, gas_key)
+                if error is None:
+                    self._pending[pending.tx_hash] = pending
+                else:
+                    if account.address not in failed:
+                        # Nothing from this nonce on was broadcast; a nonce error means our count is off
+                        failed.add(account.address)
+                        if _is_nonce_error(error):
+                            self.resync_nonce(account.address)
+                        else:
+                            self._nonces[account.address] = tx["nonce"]
+                    pending.set_exception(error)
+                pendings.append(pending)
+            self._ensure_watcher()
+        return pendings
+
+    def replace(self, pending: PendingTransaction, gas_price: int = None):
+        """Resend a pending transaction with the same nonce and higher fees.
+
+        gas_price replaces gasPrice, or maxFeePerGas of an EIP-1559 transaction.
+        """
+        with self._lock:
+            if pending.done():
+                return pending.tx_hash
+            tx = dict(pending.tx)
+            self.fees.invalidate()
+            current = self.fees.fees()
+            for field in ("gasPrice", "maxFeePerGas", "maxPriorityFeePerGas"):
+                if field in tx:
+                    tx[field] = max(int(tx[field] * self.gas_price_bump), current.get(field, 0))
+            if gas_price:
+                tx["gasPrice" if "gasPrice" in tx else "maxFeePerGas"] = gas_price
+            tx_hash = self._sign_and_send(pending.account, tx)
+            fee = f"gasPrice {tx['gasPrice']}" if "gasPrice" in tx else f"maxFeePerGas {tx['maxFeePerGas']}"
+            log_message(f"Replaced stuck tx {pending.tx_hash.hex()} with {tx_hash.hex()} "
+                        f"(nonce {tx['nonce']}, {fee})", "WARNING")
+            pending.tx = tx
+            pending.tx_hash = tx_hash
+            pending.hashes.append(tx_hash)
+            pending.sent_at = time.monotonic()
+            self._pending[tx_hash] = pending
+            return tx_hash
+
+    def wait(self, pendings, timeout: float = None) -> list:
+        """Block until the given transactions are mined and return their receipts"""
+        return [pending.result(timeout=timeout) for pending in pendings]
+
+    def _ensure_watcher(self):
+        if not self.background:
+            return
+        if self._watcher is None or not self._watcher.is_alive():
+            self._watcher = threading.Thread(target=self._watch, name="tx-watcher", daemon=True)
+            self._watcher.start()
+
+    def new_block(self, block_number: int):
+        """Report a new block, e.g. from ChainWatcher.on_block(): fees are re-read and receipts checked"""
+        self.fees.new_block(block_number)
+        with self._lock:
+            if not self._pending:
+                # Nothing in flight can be in this block or an earlier one
+                self._scanned = max(self._scanned or 0, block_number)
+                return
+            self._head = max(self._head or 0, block_number)
+        self._wake.set()
+
+    def _get_block_receipts(self, block_number: int) -> list:
+        raw = self.w3.manager.request_blocking("eth_getBlockReceipts", [hex(block_number)])
+        return [receipt_formatter(receipt) for receipt in raw or ()]
+
+    def _scan(self, first: int, last: int, pending: dict) -> set:
+        """Resolve the transactions in pending mined in blocks first...last; returns their hashes"""
+        found = set()
+        for block_number in range(first, last + 1):
+            for receipt in self._get_block_receipts(block_number):
+                tx_hash = receipt.transactionHash
+                if tx_hash in pending and tx_hash not in found:
+                    found.update(pending[tx_hash].hashes)
+                    self._resolve(pending[tx_hash], receipt)
+        return found
+
+    def poll(self) -> int:
+        """Check every pending transaction once and return how many were checked"""
+        with self._lock:
+            if not self._pending:
+                self._head = None
+                return 0
+            # Read under the lock: whatever send() registered so far is in pending_items, and
+            # anything sent afterwards can only be mined after head
+            head = self._head
+            if head is None and self._block_receipts:
+                head = self.w3.eth.block_number
+            self._head = None
+            pending_items = list(self._pending.items())
+            scanned = self._scanned
+        found = set()
+        if self._block_receipts and head is not None and scanned is not None and 0 <= head - scanned <= MAX_SCANNED_BLOCKS:
+            try:
+                found = self._scan(scanned + 1, head, dict(pending_items))
+            except Exception as e:
+                log_message(f"eth_getBlockReceipts failed ({e}), reading receipts one by one", "WARNING")
+                self._block_receipts = False
+            else:
+                with self._lock:
+                    self._scanned = max(self._scanned, head)
+                now = time.monotonic()
+                # The rest are not mined yet; only those waiting too long need a closer look
+                pending_items = [(tx_hash, pending) for tx_hash, pending in pending_items
+                                 if tx_hash not in found and now - pending.sent_at >= self.stuck_timeout]
+        else:
+            with self._lock:
+                self._scanned = head
+        for tx_hash, pending in pending_items:
+            try:
+                self._check(tx_hash, pending)
+            except Exception as e:
+                log_message(f"Error checking tx {tx_hash.hex()}: {e}", "ERROR")
+        return len(found) + len(pending_items)
+
+    def _watch(self):
+        while True:
+            # Woken by new_block(); without block reports the chain head is polled instead
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            self.poll()
+
+    def _resolve(self, pending: PendingTransaction, receipt=None, error: Exception = None):
+        with self._lock:
+            for tx_hash in pending.hashes:
+                self._pending.pop(tx_hash, None)
+        if pending.done():
+            return
+        if error is not None:
+            pending.set_exception(error)
+        elif receipt.status == 1:
+            pending.set_result(receipt)
+        else:
+            if pending.gas_key and receipt.gasUsed >= pending.tx["gas"]:
+                # A revert returns the unused gas; only running out of it uses the whole limit
+                self.gas_limits.out_of_gas(pending.gas_key, pending.tx["gas"])
+                log_message(f"Tx {receipt.transactionHash.hex()} ({pending.description}) ran out of its "
+                            f"{pending.tx['gas']} gas, its limit will be estimated again", "WARNING")
+            reason = self._revert_reason(pending, receipt)
+            pending.set_exception(TransactionReverted(receipt.transactionHash, receipt, reason))
+
+    def _revert_reason(self, pending: PendingTransaction, receipt) -> str:
+        """Replay a reverted transaction against the previous block to recover its error"""
+        call = {key: pending.tx[key] for key in ("from", "to", "data", "value", "gas") if key in pending.tx}
+        try:
+            self.w3.eth.call(call, receipt.blockNumber - 1)
+        except Exception as e:
+            return str(e)
+        return ""
+
+    def _check(self, tx_hash, pending: PendingTransaction):
+        if pending.done():
+            self._resolve(pending)
+            return
+        try:
+            receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+        except TransactionNotFound:
+            receipt = None
+        if receipt is not None:
+            self._resolve(pending, receipt)
+            return
+        if tx_hash != pending.tx_hash or time.monotonic() - pending.sent_at < self.stuck_timeout:
+            return
+
+        address = pending.account.address
+        if self.w3.eth.get_transaction_count(address, "latest") > pending.nonce:
+            # The nonce was used by a transaction we are not tracking
+            self.resync_nonce(address)
+            self._resolve(pending, error=TransactionDropped(
+                f"Nonce {pending.nonce} of {address} consumed by another transaction"))
+            return
+        try:
+            self.w3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            # Dropped from the mempool: rebroadcast to fill the nonce gap
+            log_message(f"Tx {tx_hash.hex()} missing from mempool, rebroadcasting nonce {pending.nonce}", "WARNING")
+            self._sign_and_send(pending.account, pending.tx)
+            pending.sent_at = time.monotonic()
+            return
+        self.replace(pending)
+
+def log_when_confirmed(pending: PendingTransaction, message: str, event_type: str = None, data: dict = None,
+                       outcome=None):
+    """Log a message (and optionally statistics) once a pending transaction is mined.
+
+    outcome(pending) may describe the result from the decoded events; it is appended to the message.
+    """
+    def _done(future):
+        error = future.exception()
+        if error is not None:
+            log_message(f"{message} failed (tx: {future.tx_hash.hex()}): {error}", "ERROR")
+            return
+        try:
+            result = f", {outcome(future)}" if outcome else ""
+        except Exception as e:
+            result = f", outcome unknown: {e}"
+        log_message(f"{message}{result} (tx: {future.tx_hash.hex()})")
+        if event_type:
+            log_statistics(event_type, data or {}, future.result())
+    pending.add_done_callback(_done)
+
+MAX_UINT256 = 2 ** 256 - 1
+
+# OpenZeppelin v5 ERC20InsufficientAllowance(address,uint256,uint256) selector
+ERC20_INSUFFICIENT_ALLOWANCE = "0xfb8f41b2"
+
+def is_allowance_error(error: Exception) -> bool:
+    """Check whether an error was caused by a missing or exhausted ERC20 allowance"""
+    message = str(error).lower()
+    return "allowance" in message or ERC20_INSUFFICIENT_ALLOWANCE in message
+
+class AllowanceManager:
+    """Keeps one max approval per (owner, token, spender) and caches it in memory.
+
+    The current allowance is read from the chain the first time a pair is used.
+    If it does not cover the requested amount, a single approve(MAX_UINT256) is
+    sent through the submitter; because nonces are assigned locally it is mined
+    before the transaction that spends it. The cache entry is only dropped when
+    a transaction watched with watch() reverts for an allowance-related reason.
+    """
+
+    def __init__(self, w3: Web3, submitter: TransactionSubmitter):
+        self.w3 = w3
+        self.submitter = submitter
+        self._allowances = {}
+        self._lock = threading.Lock()
+
+    def _read_allowance(self, owner: str, token_address: str, spender: str) -> int:
+        return call_view(self.w3, token_name(token_address), "allowance", owner, spender)
+
+    def ensure(self, account, token_address: str, spender: str, amount: int):
+        """Make sure spender may pull amount of token from account, approving once if needed"""
+        key = (account.address, token_address, spender)
+        with self._lock:
+            if key not in self._allowances:
+                self._allowances[key] = self._read_allowance(account.address, token_address, spender)
+            if self._allowances[key] >= amount:
+                # OpenZeppelin does not decrease an infinite allowance
+                if self._allowances[key] != MAX_UINT256:
+                    self._allowances[key] -= amount
+                return None
+
+            contract = get_contract(self.w3, token_name(token_address))
+            pending = self.submitter.send(account, contract.functions.approve(spender, MAX_UINT256), 100000, "approve")
+            self._allowances[key] = MAX_UINT256
+        log_message(f"Approved {spender} to spend token {token_address} for {account.address} (tx: {pending.tx_hash.hex()})")
+        # A failed approval leaves the real allowance unchanged
+        pending.add_done_callback(
+            lambda future: future.exception() and self.invalidate(account.address, token_address, spender))
+        return pending
+
+    def invalidate(self, owner: str, token_address: str, spender: str):
+        """Forget the cached allowance so the next ensure() reads it again"""
+        with self._lock:
+            self._allowances.pop((owner, token_address, spender), None)
+
+    def watch(self, pending: PendingTransaction, owner: str, token_address: str, spender: str):
+        """Invalidate the cached allowance if a transaction fails because of it"""
+        def _done(future):
+            error = future.exception()
+            if error is not None and is_allowance_error(error):
+                self.invalidate(owner, token_address, spender)
+        pending.add_done_callback(_done)
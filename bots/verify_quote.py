@@ -0,0 +1,162 @@
+"""
+Check the off-chain quote engine against SimpleDEX on anvil, bit for bit
+
+Sends real swaps from wallets 1 (dUSD) and 2 (dUSC) - single legs of several
+sizes, then the optimally sized cycle in each direction, as two swaps and as
+one router swap - and compares every amount in the Swap* events with the quote
+computed from the reserves read just before. Chain state is restored with evm_snapshot/evm_revert afterwards.
+
+Usage:
+    python verify_quote.py           # against a freshly deployed ecosystem on RPC_URL
+    python verify_quote.py --keep    # leave the swaps on chain
+"""
+import argparse
+import sys
+from web3 import Web3
+from config import RPC_URL, DEX_ADDRESS, DUSD_ADDRESS, DUSC_ADDRESS, MWETH_ADDRESS, WALLET_1_KEY, WALLET_2_KEY
+from utils import TransactionSubmitter, AllowanceManager
+from contracts import call_view, get_contract
+from quote import CYCLES, best_cycle, get_amount_out
+
+# Single-leg input sizes in wei, from dust to a large share of the pool
+LEG_SIZES = [1, 10**9, 10**15, 10**18, 123456789 * 10**12, 500 * 10**18]
+
+# (wallet key, input token, stablecoin -> mWETH swap, mWETH -> stablecoin swap, pool reserves view)
+WALLETS = {
+    "dusd_to_dusc": (WALLET_1_KEY, DUSD_ADDRESS, "swapDUSDForWETH", "swapWETHForDUSD", "getDUSDPoolReserves"),
+    "dusc_to_dusd": (WALLET_2_KEY, DUSC_ADDRESS, "swapDUSCForWETH", "swapWETHForDUSC", "getDUSCPoolReserves")
+}
+
+# The opposite cycle, whose pool holds the second leg of each direction
+REVERSE = {"dusd_to_dusc": "dusc_to_dusd", "dusc_to_dusd": "dusd_to_dusc"}
+
+# SimpleDEX router swap running both legs of each cycle in one call
+ROUTER_SWAPS = {"dusd_to_dusc": "swapDUSDForDUSC", "dusc_to_dusd": "swapDUSCForDUSD"}
+
+class Checker:
+    """Sends swaps and compares their event amounts with the quotes"""
+
+    def __init__(self, w3: Web3):
+        self.w3 = w3
+        self.dex = get_contract(w3, "dex")
+        self.submitter = TransactionSubmitter(w3)
+        self.allowances = AllowanceManager(w3, self.submitter)
+        self.checked = 0
+        self.failed = 0
+
+    def swap(self, account, token_address: str, fn_name: str, amount: int) -> tuple:
+        """Send one swap, wait for it and return its event's (amount in, amount out)"""
+        self.allowances.ensure(account, token_address, DEX_ADDRESS, amount)
+        receipt = self.submitter.send(account, getattr(self.dex.functions, fn_name)(amount), 200000, fn_name).result(timeout=60)
+        return self.event_amounts(receipt, fn_name)
+
+    def event_amounts(self, receipt, fn_name: str) -> tuple:
+        """(amount in, amount out) of the Swap* event a swap function emits"""
+        event = getattr(self.dex.events, fn_name[0].upper() + fn_name[1:])().process_receipt(receipt)[0]
+        amount_in, amount_out = list(event["args"].values())[1:]
+        return amount_in, amount_out
+
+    def check(self, label: str, quoted: int, actual: int):
+        self.checked += 1
+        if quoted == actual:
+            print(f"  ok   {label}: {actual}")
+        else:
+            self.failed += 1
+            print(f"  FAIL {label}: quoted {quoted}, contract returned {actual}")
+
+    def check_legs(self, direction: str):
+        """Round trips stablecoin -> mWETH -> stablecoin in one pool for every LEG_SIZES entry"""
+        key, token_address, buy, sell, reserves_view = WALLETS[direction]
+        account = self.w3.eth.account.from_key(key)
+        for amount in LEG_SIZES:
+            stable, weth = call_view(self.w3, "dex", reserves_view)
+            quoted = get_amount_out(amount, stable, weth)
+            _, weth_out = self.swap(account, token_address, buy, amount)
+            self.check(f"{buy}({amount})", quoted, weth_out)
+
+            stable, weth = call_view(self.w3, "dex", reserves_view)
+            quoted = get_amount_out(weth_out, weth, stable)
+            _, stable_out = self.swap(account, MWETH_ADDRESS, sell, weth_out)
+            self.check(f"{sell}({weth_out})", quoted, stable_out)
+
+    def quote_cycle(self, direction: str, account, token_address: str):
+        """Optimally sized cycle at the current reserves and balance"""
+        first, second = CYCLES[direction]
+        reserves = {
+            "dusd_reserves": tuple(call_view(self.w3, "dex", "getDUSDPoolReserves")),
+            "dusc_reserves": tuple(call_view(self.w3, "dex", "getDUSCPoolReserves"))
+        }
+        balance = call_view(self.w3, "dusd" if token_address == DUSD_ADDRESS else "dusc", "balanceOf", account.address)
+        return best_cycle(direction, reserves[first], reserves[second], balance)
+
+    def check_cycle(self, direction: str):
+        """Optimally sized cycle, both legs quoted before the first is sent"""
+        key, token_address, buy, _, _ = WALLETS[direction]
+        account = self.w3.eth.account.from_key(key)
+        opportunity = self.quote_cycle(direction, account, token_address)
+        if opportunity.amount_in == 0:
+            print(f"  skip {direction}: cycle is not profitable at current reserves")
+            return
+
+        _, weth_out = self.swap(account, token_address, buy, opportunity.amount_in)
+        self.check(f"{direction} leg 1 ({opportunity.amount_in})", opportunity.weth_out, weth_out)
+        second_swap = WALLETS[REVERSE[direction]][3]
+        _, amount_out = self.swap(account, MWETH_ADDRESS, second_swap, weth_out)
+        self.check(f"{direction} leg 2 ({weth_out})", opportunity.amount_out, amount_out)
+
+    def check_router(self, direction: str):
+        """Optimally sized cycle through the router swap, both leg events checked"""
+        key, token_address, buy, _, _ = WALLETS[direction]
+        account = self.w3.eth.account.from_key(key)
+        opportunity = self.quote_cycle(direction, account, token_address)
+        if opportunity.amount_in == 0:
+            print(f"  skip {direction} router: cycle is not profitable at current reserves")
+            return
+
+        fn_name = ROUTER_SWAPS[direction]
+        deadline = self.w3.eth.get_block("latest")["timestamp"] + 60
+        self.allowances.ensure(account, token_address, DEX_ADDRESS, opportunity.amount_in)
+        swap = getattr(self.dex.functions, fn_name)(opportunity.amount_in, opportunity.amount_out, deadline)
+        receipt = self.submitter.send(account, swap, 250000, fn_name).result(timeout=60)
+        _, weth_out = self.event_amounts(receipt, buy)
+        self.check(f"{fn_name} leg 1 ({opportunity.amount_in})", opportunity.weth_out, weth_out)
+        _, amount_out = self.event_amounts(receipt, WALLETS[REVERSE[direction]][3])
+        self.check(f"{fn_name} leg 2 ({weth_out})", opportunity.amount_out, amount_out)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keep", action="store_true", help="do not revert the swaps afterwards")
+    args = parser.parse_args()
+
+    w3 = Web3(Web3.HTTPProvider(RPC_URL))
+    if not w3.is_connected():
+        print("Failed to connect to RPC")
+        return 1
+    if not WALLET_1_KEY or not WALLET_2_KEY:
+        print("WALLET_1_KEY and WALLET_2_KEY must be set")
+        return 1
+
+    snapshot_id = w3.provider.make_request("evm_snapshot", [])["result"]
+    checker = Checker(w3)
+    try:
+        for direction in CYCLES:
+            print(f"Single legs ({direction.split('_')[0]} pool)")
+            checker.check_legs(direction)
+        for direction in CYCLES:
+            # Make mWETH dearer in the second pool so the cycle has something to take
+            key, token_address, buy, _, _ = WALLETS[REVERSE[direction]]
+            checker.swap(w3.eth.account.from_key(key), token_address, buy, 200 * 10**18)
+            print(f"Optimal cycle {direction}")
+            checker.check_cycle(direction)
+            checker.swap(w3.eth.account.from_key(key), token_address, buy, 200 * 10**18)
+            print(f"Optimal cycle {direction} through {ROUTER_SWAPS[direction]}")
+            checker.check_router(direction)
+    finally:
+        if not args.keep:
+            w3.provider.make_request("evm_revert", [snapshot_id])
+
+    print(f"{checker.checked - checker.failed}/{checker.checked} amounts matched")
+    return 1 if checker.failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -43,38 +43,46 @@ fi
 cd bots
 source venv/bin/activate
 
-# Start bots in background
-echo "Starting Oracle bot..."
-python oracle_bot.py > ../oracle_bot.log 2>&1 &
-ORACLE_PID=$!
-echo $ORACLE_PID > ../.oracle_pid
-
-# Wait for oracle to set initial price
-sleep 5
-
-echo "Starting Retailer bot 1..."
-python retailer_bot_1.py > ../retailer_bot_1.log 2>&1 &
-RETAILER1_PID=$!
-echo $RETAILER1_PID > ../.retailer1_pid
-
-echo "Starting Retailer bot 2..."
-python retailer_bot_2.py > ../retailer_bot_2.log 2>&1 &
-RETAILER2_PID=$!
-echo $RETAILER2_PID > ../.retailer2_pid
-
-echo "Starting Profit bot 1..."
-python profit_bot_1.py > ../profit_bot_1.log 2>&1 &
-PROFIT1_PID=$!
-echo $PROFIT1_PID > ../.profit1_pid
-
-echo "Starting Profit bot 2..."
-python profit_bot_2.py > ../profit_bot_2.log 2>&1 &
-PROFIT2_PID=$!
-echo $PROFIT2_PID > ../.profit2_pid
+if [ "$1" == "--single-process" ]; then
+    # All bots as asyncio tasks in one interpreter, sharing one connection and state cache
+    echo "Starting bot runtime..."
+    python runtime.py > ../runtime.log 2>&1 &
+    RUNTIME_PID=$!
+    echo $RUNTIME_PID > ../.runtime_pid
+else
+    # Start bots in background
+    echo "Starting Oracle bot..."
+    python oracle_bot.py > ../oracle_bot.log 2>&1 &
+    ORACLE_PID=$!
+    echo $ORACLE_PID > ../.oracle_pid
+
+    # Wait for oracle to set initial price
+    sleep 5
+
+    echo "Starting Retailer bot 1..."
+    python retailer_bot_1.py > ../retailer_bot_1.log 2>&1 &
+    RETAILER1_PID=$!
+    echo $RETAILER1_PID > ../.retailer1_pid
+
+    echo "Starting Retailer bot 2..."
+    python retailer_bot_2.py > ../retailer_bot_2.log 2>&1 &
+    RETAILER2_PID=$!
+    echo $RETAILER2_PID > ../.retailer2_pid
+
+    echo "Starting Profit bot 1..."
+    python profit_bot_1.py > ../profit_bot_1.log 2>&1 &
+    PROFIT1_PID=$!
+    echo $PROFIT1_PID > ../.profit1_pid
+
+    echo "Starting Profit bot 2..."
+    python profit_bot_2.py > ../profit_bot_2.log 2>&1 &
+    PROFIT2_PID=$!
+    echo $PROFIT2_PID > ../.profit2_pid
+fi
 
 cd ..
 
 echo "Ecosystem started!"
 echo "All processes are running in the background."
-echo "Logs are in: ecosystem.log, statistics.log, and individual bot logs"
+echo "Logs are in: ecosystem.log, stats/ (python bots/stats.py summary), and individual bot logs"
 echo "Use ./stop_ecosystem.sh to stop everything"
@@ -9,6 +9,7 @@ import "../src/mocks/MockOracle.sol";
 import "../src/SimpleDEX.sol";
 import "../src/LendingProtocol.sol";
 import "../src/MinterRedeemer.sol";
+import "../src/Multicall.sol";
 
 contract DeployEcosystem is Script {
     function run() external {
@@ -35,6 +36,7 @@ contract DeployEcosystem is Script {
             address(dusc),
             address(oracle)
         );
+        Multicall multicall = new Multicall();
 
         // Set permissions
         dusd.setMinterRedeemer(address(minterRedeemer));
@@ -115,6 +117,7 @@ contract DeployEcosystem is Script {
         console.log("DEX:", address(dex));
         console.log("Lending:", address(lending));
         console.log("MinterRedeemer:", address(minterRedeemer));
+        console.log("Multicall:", address(multicall));
         console.log("Wallet 1:", vm.addr(1));
         console.log("Wallet 2:", vm.addr(2));
         console.log("Wallet 3:", vm.addr(3));
@@ -23,6 +23,15 @@ contract LendingProtocol {
         uint256 duscDebt;
     }
 
+    struct PositionView {
+        address user;
+        uint256 collateralAmount;
+        uint256 dusdDebt;
+        uint256 duscDebt;
+        uint256 collateralizationRatio; // type(uint256).max without debt
+        bool liquidatable;
+    }
+
     mapping(address => Position) public positions;
     uint256 public dusdReserves;
     uint256 public duscReserves;
@@ -30,6 +39,7 @@ contract LendingProtocol {
     event DepositCollateral(address indexed user, uint256 amount);
     event Borrow(address indexed user, uint256 dusdAmount, uint256 duscAmount);
     event Repay(address indexed user, uint256 dusdAmount, uint256 duscAmount);
+    event WithdrawCollateral(address indexed user, uint256 amount);
     event Liquidate(address indexed user, address indexed liquidator, uint256 collateralSeized, uint256 debtRepaid);
 
     constructor(
@@ -113,34 +123,72 @@ contract LendingProtocol {
 
         pos.collateralAmount -= amount;
         mweth.transfer(msg.sender, amount);
+        emit WithdrawCollateral(msg.sender, amount);
     }
 
     function getCollateralizationRatio(address user) external view returns (uint256) {
         Position memory pos = positions[user];
-        uint256 totalDebtValue = (pos.dusdDebt * 1e18) + (pos.duscDebt * 1e18);
-        if (totalDebtValue == 0) return type(uint256).max;
-        
-        uint256 collateralValue = (pos.collateralAmount * getEthPrice()) / 1e18;
-        return (collateralValue * 1e18) / totalDebtValue;
+        if (pos.dusdDebt + pos.duscDebt == 0) return type(uint256).max;
+        return _collateralizationRatio(pos, getEthPrice());
     }
 
     function canLiquidate(address user) external view returns (bool) {
         Position memory pos = positions[user];
-        if (pos.collateralAmount == 0) return false;
+        if (pos.collateralAmount == 0 || pos.dusdDebt + pos.duscDebt == 0) return false;
+        return _canLiquidate(pos, getEthPrice());
+    }
 
-        uint256 totalDebtValue = (pos.dusdDebt * 1e18) + (pos.duscDebt * 1e18);
-        if (totalDebtValue == 0) return false;
+    /// @notice Positions, collateralization ratios and liquidatability of many users, reading the oracle once
+    /// @dev Reverts while the oracle price is unset, even for users without debt
+    function getPositions(address[] calldata users) external view returns (PositionView[] memory views) {
+        uint256 ethPrice = getEthPrice();
+        views = new PositionView[](users.length);
+        for (uint256 i = 0; i < users.length; i++) {
+            Position memory pos = positions[users[i]];
+            bool hasDebt = pos.dusdDebt + pos.duscDebt > 0;
+            views[i] = PositionView({
+                user: users[i],
+                collateralAmount: pos.collateralAmount,
+                dusdDebt: pos.dusdDebt,
+                duscDebt: pos.duscDebt,
+                collateralizationRatio: hasDebt ? _collateralizationRatio(pos, ethPrice) : type(uint256).max,
+                liquidatable: _canLiquidate(pos, ethPrice)
+            });
+        }
+    }
 
-        uint256 collateralValue = (pos.collateralAmount * getEthPrice()) / 1e18;
-        uint256 collateralizationRatio = (collateralValue * 1e18) / totalDebtValue;
+    /// @notice The subset of users whose positions can be liquidated, reading the oracle once
+    function getLiquidatable(address[] calldata users) external view returns (address[] memory liquidatable) {
+        uint256 ethPrice = getEthPrice();
+        liquidatable = new address[](users.length);
+        uint256 count;
+        for (uint256 i = 0; i < users.length; i++) {
+            if (_canLiquidate(positions[users[i]], ethPrice)) {
+                liquidatable[count++] = users[i];
+            }
+        }
+        // Shrink the array to the number of matches
+        assembly {
+            mstore(liquidatable, count)
+        }
+    }
+
+    function _collateralizationRatio(Position memory pos, uint256 ethPrice) internal pure returns (uint256) {
+        uint256 totalDebtValue = (pos.dusdDebt * 1e18) + (pos.duscDebt * 1e18);
+        uint256 collateralValue = (pos.collateralAmount * ethPrice) / 1e18;
+        return (collateralValue * 1e18) / totalDebtValue;
+    }
 
-        return collateralizationRatio < LIQUIDATION_THRESHOLD;
+    function _canLiquidate(Position memory pos, uint256 ethPrice) internal pure returns (bool) {
+        if (pos.collateralAmount == 0) return false;
+        if (pos.dusdDebt + pos.duscDebt == 0) return false;
+        return _collateralizationRatio(pos, ethPrice) < LIQUIDATION_THRESHOLD;
     }
 
     function liquidate(address user) external {
-        require(canLiquidate(user), "Position not liquidatable");
-        
         Position storage pos = positions[user];
+        require(_canLiquidate(pos, getEthPrice()), "Position not liquidatable");
+        
         uint256 totalDebtValue = (pos.dusdDebt * 1e18) + (pos.duscDebt * 1e18);
         uint256 collateralValue = (pos.collateralAmount * getEthPrice()) / 1e18;
         
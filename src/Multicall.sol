@@ -0,0 +1,41 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+contract Multicall {
+    struct Call {
+        address target;
+        bool allowFailure;
+        bytes callData;
+    }
+
+    struct Result {
+        bool success;
+        bytes returnData;
+    }
+
+    function aggregate(Call[] calldata calls) public returns (Result[] memory results) {
+        results = new Result[](calls.length);
+        for (uint256 i = 0; i < calls.length; i++) {
+            (bool success, bytes memory returnData) = calls[i].target.call(calls[i].callData);
+            require(success || calls[i].allowFailure, "Multicall: call failed");
+            results[i] = Result({success: success, returnData: returnData});
+        }
+    }
+
+    function blockAndAggregate(Call[] calldata calls)
+        external
+        returns (uint256 blockNumber, bytes32 blockHash, Result[] memory results)
+    {
+        blockNumber = block.number;
+        blockHash = blockhash(block.number - 1);
+        results = aggregate(calls);
+    }
+
+    function getBlockNumber() external view returns (uint256) {
+        return block.number;
+    }
+
+    function getCurrentBlockTimestamp() external view returns (uint256) {
+        return block.timestamp;
+    }
+}
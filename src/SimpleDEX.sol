@@ -105,6 +105,44 @@ contract SimpleDEX {
         emit SwapWETHForDUSC(msg.sender, wethIn, duscOut);
     }
 
+    /// @notice dUSD -> mWETH -> dUSC in one call; the mWETH never leaves the DEX
+    function swapDUSDForDUSC(uint256 dusdIn, uint256 minDuscOut, uint256 deadline) external returns (uint256 duscOut) {
+        require(block.timestamp <= deadline, "Deadline expired");
+        poolDUSD.token0.transferFrom(msg.sender, address(this), dusdIn);
+
+        uint256 wethOut = (dusdIn * poolDUSD.reserve1) / (poolDUSD.reserve0 + dusdIn);
+        poolDUSD.reserve0 += dusdIn;
+        poolDUSD.reserve1 -= wethOut;
+
+        duscOut = (wethOut * poolDUSC.reserve0) / (poolDUSC.reserve1 + wethOut);
+        require(duscOut >= minDuscOut, "Insufficient output amount");
+        poolDUSC.reserve1 += wethOut;
+        poolDUSC.reserve0 -= duscOut;
+
+        poolDUSC.token0.transfer(msg.sender, duscOut);
+        emit SwapDUSDForWETH(msg.sender, dusdIn, wethOut);
+        emit SwapWETHForDUSC(msg.sender, wethOut, duscOut);
+    }
+
+    /// @notice dUSC -> mWETH -> dUSD in one call; the mWETH never leaves the DEX
+    function swapDUSCForDUSD(uint256 duscIn, uint256 minDusdOut, uint256 deadline) external returns (uint256 dusdOut) {
+        require(block.timestamp <= deadline, "Deadline expired");
+        poolDUSC.token0.transferFrom(msg.sender, address(this), duscIn);
+
+        uint256 wethOut = (duscIn * poolDUSC.reserve1) / (poolDUSC.reserve0 + duscIn);
+        poolDUSC.reserve0 += duscIn;
+        poolDUSC.reserve1 -= wethOut;
+
+        dusdOut = (wethOut * poolDUSD.reserve0) / (poolDUSD.reserve1 + wethOut);
+        require(dusdOut >= minDusdOut, "Insufficient output amount");
+        poolDUSD.reserve1 += wethOut;
+        poolDUSD.reserve0 -= dusdOut;
+
+        poolDUSD.token0.transfer(msg.sender, dusdOut);
+        emit SwapDUSCForWETH(msg.sender, duscIn, wethOut);
+        emit SwapWETHForDUSD(msg.sender, wethOut, dusdOut);
+    }
+
     function getDUSDPoolReserves() external view returns (uint256, uint256) {
         return (poolDUSD.reserve0, poolDUSD.reserve1);
     }
@@ -5,9 +5,12 @@ contract MockOracle {
     int256 private price;
     uint256 public lastUpdateTime;
 
+    event PriceUpdated(int256 price, uint256 updatedAt);
+
     function setPrice(int256 _price) external {
         price = _price;
         lastUpdateTime = block.timestamp;
+        emit PriceUpdated(_price, block.timestamp);
     }
 
     function latestRoundData()
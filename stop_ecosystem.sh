@@ -55,6 +55,15 @@ if [ -f ".profit2_pid" ]; then
     rm .profit2_pid
 fi
 
+if [ -f ".runtime_pid" ]; then
+    RUNTIME_PID=$(cat .runtime_pid)
+    if ps -p $RUNTIME_PID > /dev/null; then
+        kill $RUNTIME_PID
+        echo "Stopped bot runtime"
+    fi
+    rm .runtime_pid
+fi
+
 # Stop Anvil if we started it
 if [ -f ".anvil_pid" ]; then
     ANVIL_PID=$(cat .anvil_pid)
@@ -69,5 +78,6 @@ fi
 pkill -f "oracle_bot.py" || true
 pkill -f "retailer_bot" || true
 pkill -f "profit_bot" || true
+pkill -f "runtime.py" || true
 
 echo "Ecosystem stopped!"
@@ -24,6 +24,8 @@ contract EcosystemTest is Test {
     address user3 = address(3);
     address user4 = address(4);
 
+    event WithdrawCollateral(address indexed user, uint256 amount);
+
     function setUp() public {
         // Deploy tokens
         mweth = new MockWETH();
@@ -203,4 +205,22 @@ contract EcosystemTest is Test {
         assertEq(dusdDebt, 0);
         assertEq(duscDebt, 0);
     }
+
+    function testLendingWithdrawCollateralEmitsEvent() public {
+        uint256 collateral = 2 ether;
+        // mint is reserved to the lending protocol and the minter; the test contract holds the initial supply
+        mweth.transfer(user1, collateral);
+        vm.startPrank(user1);
+        mweth.approve(address(lending), collateral);
+        lending.depositCollateral(collateral);
+
+        vm.expectEmit(true, false, false, true, address(lending));
+        emit WithdrawCollateral(user1, 1 ether);
+        lending.withdrawCollateral(1 ether);
+        vm.stopPrank();
+
+        (uint256 collateralAmount, , ) = lending.positions(user1);
+        assertEq(collateralAmount, 1 ether);
+        assertEq(mweth.balanceOf(user1), 1 ether);
+    }
 }
@@ -0,0 +1,147 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import { Test } from "forge-std/Test.sol";
+import "../src/DemoStablecoin.sol";
+import "../src/DemoStablecoinUSC.sol";
+import "../src/mocks/MockWETH.sol";
+import "../src/mocks/MockOracle.sol";
+import "../src/LendingProtocol.sol";
+
+contract LendingBatchViewsTest is Test {
+    MockWETH mweth;
+    DemoStablecoin dusd;
+    DemoStablecoinUSC dusc;
+    MockOracle oracle;
+    LendingProtocol lending;
+
+    // Storage slot of LendingProtocol.positions
+    uint256 constant POSITIONS_SLOT = 4;
+
+    function setUp() public {
+        mweth = new MockWETH();
+        dusd = new DemoStablecoin();
+        dusc = new DemoStablecoinUSC();
+        oracle = new MockOracle();
+        oracle.setPrice(2000e8); // $2000 ETH
+
+        lending = new LendingProtocol(
+            address(mweth),
+            address(dusd),
+            address(dusc),
+            address(oracle)
+        );
+    }
+
+    // Positions are written directly to storage so any mix of healthy and unhealthy ones can be set up
+    function _setPosition(address user, uint256 collateral, uint256 dusdDebt, uint256 duscDebt) internal {
+        uint256 slot = uint256(keccak256(abi.encode(user, POSITIONS_SLOT)));
+        vm.store(address(lending), bytes32(slot), bytes32(collateral));
+        vm.store(address(lending), bytes32(slot + 1), bytes32(dusdDebt));
+        vm.store(address(lending), bytes32(slot + 2), bytes32(duscDebt));
+    }
+
+    // Every third user has no debt, every third no collateral, the rest have varying collateral
+    function _users(uint256 count) internal returns (address[] memory users) {
+        users = new address[](count);
+        for (uint256 i = 0; i < count; i++) {
+            users[i] = address(uint160(0x1000 + i));
+            if (i % 3 == 0) {
+                _setPosition(users[i], 1 ether, 0, 0);
+            } else if (i % 3 == 1) {
+                _setPosition(users[i], 0, 100e18, 0);
+            } else {
+                _setPosition(users[i], i * 1e15, 1000e18, 500e18);
+            }
+        }
+    }
+
+    function testSetPositionMatchesGetter() public {
+        _setPosition(address(1), 3 ether, 1000e18, 200e18);
+        (uint256 collateral, uint256 dusdDebt, uint256 duscDebt) = lending.positions(address(1));
+        assertEq(collateral, 3 ether);
+        assertEq(dusdDebt, 1000e18);
+        assertEq(duscDebt, 200e18);
+    }
+
+    function testGetPositionsMatchesSingleViews() public {
+        address[] memory users = _users(30);
+        LendingProtocol.PositionView[] memory views = lending.getPositions(users);
+
+        assertEq(views.length, users.length);
+        for (uint256 i = 0; i < users.length; i++) {
+            (uint256 collateral, uint256 dusdDebt, uint256 duscDebt) = lending.positions(users[i]);
+            assertEq(views[i].user, users[i]);
+            assertEq(views[i].collateralAmount, collateral);
+            assertEq(views[i].dusdDebt, dusdDebt);
+            assertEq(views[i].duscDebt, duscDebt);
+            assertEq(views[i].collateralizationRatio, lending.getCollateralizationRatio(users[i]));
+            assertEq(views[i].liquidatable, lending.canLiquidate(users[i]));
+        }
+    }
+
+    function testGetLiquidatableMatchesCanLiquidate() public {
+        address[] memory users = _users(30);
+        address[] memory liquidatable = lending.getLiquidatable(users);
+
+        uint256 count;
+        for (uint256 i = 0; i < users.length; i++) {
+            if (lending.canLiquidate(users[i])) {
+                assertEq(liquidatable[count], users[i]);
+                count++;
+            }
+        }
+        assertGt(count, 0);
+        assertEq(liquidatable.length, count);
+    }
+
+    function testLiquidatableFollowsOraclePrice() public {
+        address user = address(1);
+        address[] memory users = new address[](1);
+        users[0] = user;
+        _setPosition(user, 1 ether, 1, 0);
+
+        // ratio = collateral * price / debt, compared against LIQUIDATION_THRESHOLD
+        oracle.setPrice(2000e8);
+        assertEq(lending.getLiquidatable(users).length, 0);
+        oracle.setPrice(1);
+        assertEq(lending.getLiquidatable(users).length, 1);
+        assertTrue(lending.getPositions(users)[0].liquidatable);
+    }
+
+    function testEmptyList() public view {
+        address[] memory users = new address[](0);
+        assertEq(lending.getPositions(users).length, 0);
+        assertEq(lending.getLiquidatable(users).length, 0);
+    }
+
+    function testBatchViewsRevertWithoutPrice() public {
+        address[] memory users = _users(3);
+        oracle.setPrice(0);
+        vm.expectRevert("Invalid price");
+        lending.getLiquidatable(users);
+        vm.expectRevert("Invalid price");
+        lending.getPositions(users);
+    }
+
+    function testBatchViewsAgreeAtScale() public {
+        uint256[3] memory sizes = [uint256(1), 100, 1000];
+        for (uint256 s = 0; s < sizes.length; s++) {
+            address[] memory users = _users(sizes[s]);
+            LendingProtocol.PositionView[] memory views = lending.getPositions(users);
+            address[] memory liquidatable = lending.getLiquidatable(users);
+
+            assertEq(views.length, users.length);
+            uint256 count;
+            for (uint256 i = 0; i < users.length; i++) {
+                assertEq(views[i].user, users[i]);
+                assertEq(views[i].liquidatable, lending.canLiquidate(users[i]));
+                if (views[i].liquidatable) {
+                    assertEq(liquidatable[count], users[i]);
+                    count++;
+                }
+            }
+            assertEq(liquidatable.length, count);
+        }
+    }
+}
@@ -0,0 +1,35 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import { Test } from "forge-std/Test.sol";
+import "../src/mocks/MockOracle.sol";
+
+contract MockOracleTest is Test {
+    MockOracle oracle;
+
+    event PriceUpdated(int256 price, uint256 updatedAt);
+
+    function setUp() public {
+        oracle = new MockOracle();
+    }
+
+    function testSetPriceEmitsPriceUpdated() public {
+        vm.warp(1000);
+        vm.expectEmit(address(oracle));
+        emit PriceUpdated(2000e8, 1000);
+        oracle.setPrice(2000e8);
+
+        (, int256 price, , uint256 updatedAt, ) = oracle.latestRoundData();
+        assertEq(price, 2000e8);
+        assertEq(updatedAt, 1000);
+    }
+
+    function testEveryUpdateEmits() public {
+        oracle.setPrice(2000e8);
+        vm.warp(block.timestamp + 5);
+        vm.expectEmit(address(oracle));
+        emit PriceUpdated(1900e8, block.timestamp);
+        oracle.setPrice(1900e8);
+        assertEq(oracle.getPrice(), 1900e8);
+    }
+}
@@ -0,0 +1,62 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import { Test } from "forge-std/Test.sol";
+import "../src/Multicall.sol";
+import "../src/mocks/MockOracle.sol";
+import "../src/mocks/MockWETH.sol";
+
+contract MulticallTest is Test {
+    Multicall multicall;
+    MockOracle oracle;
+    MockWETH mweth;
+
+    address user1 = address(1);
+
+    function setUp() public {
+        multicall = new Multicall();
+        oracle = new MockOracle();
+        oracle.setPrice(2000e8);
+        mweth = new MockWETH();
+        mweth.transfer(user1, 3 ether);
+    }
+
+    function testAggregateReturnsAllResults() public {
+        Multicall.Call[] memory calls = new Multicall.Call[](2);
+        calls[0] = Multicall.Call(address(oracle), false, abi.encodeCall(MockOracle.getPrice, ()));
+        calls[1] = Multicall.Call(address(mweth), false, abi.encodeCall(mweth.balanceOf, (user1)));
+
+        Multicall.Result[] memory results = multicall.aggregate(calls);
+
+        assertTrue(results[0].success);
+        assertEq(abi.decode(results[0].returnData, (int256)), 2000e8);
+        assertTrue(results[1].success);
+        assertEq(abi.decode(results[1].returnData, (uint256)), 3 ether);
+    }
+
+    function testAggregateAllowsFailure() public {
+        Multicall.Call[] memory calls = new Multicall.Call[](1);
+        calls[0] = Multicall.Call(address(mweth), true, abi.encodeCall(mweth.mint, (user1, 1 ether)));
+
+        Multicall.Result[] memory results = multicall.aggregate(calls);
+        assertFalse(results[0].success);
+    }
+
+    function testAggregateRevertsOnRequiredFailure() public {
+        Multicall.Call[] memory calls = new Multicall.Call[](1);
+        calls[0] = Multicall.Call(address(mweth), false, abi.encodeCall(mweth.mint, (user1, 1 ether)));
+
+        vm.expectRevert("Multicall: call failed");
+        multicall.aggregate(calls);
+    }
+
+    function testBlockAndAggregatePinsBlock() public {
+        vm.roll(42);
+        Multicall.Call[] memory calls = new Multicall.Call[](1);
+        calls[0] = Multicall.Call(address(oracle), false, abi.encodeCall(MockOracle.getPrice, ()));
+
+        (uint256 blockNumber,, Multicall.Result[] memory results) = multicall.blockAndAggregate(calls);
+        assertEq(blockNumber, 42);
+        assertEq(results.length, 1);
+    }
+}
@@ -0,0 +1,150 @@
+// SPDX-License-Identifier: MIT
+pragma solidity ^0.8.20;
+
+import { Test } from "forge-std/Test.sol";
+import "../src/DemoStablecoin.sol";
+import "../src/DemoStablecoinUSC.sol";
+import "../src/mocks/MockWETH.sol";
+import "../src/SimpleDEX.sol";
+
+contract SimpleDEXRouterTest is Test {
+    MockWETH mweth;
+    DemoStablecoin dusd;
+    DemoStablecoinUSC dusc;
+    SimpleDEX dex;
+
+    address trader = address(1);
+
+    event SwapDUSDForWETH(address indexed user, uint256 dusdIn, uint256 wethOut);
+    event SwapWETHForDUSC(address indexed user, uint256 wethIn, uint256 duscOut);
+    event SwapDUSCForWETH(address indexed user, uint256 duscIn, uint256 wethOut);
+    event SwapWETHForDUSD(address indexed user, uint256 wethIn, uint256 dusdOut);
+
+    function setUp() public {
+        mweth = new MockWETH();
+        dusd = new DemoStablecoin();
+        dusc = new DemoStablecoinUSC();
+        dex = new SimpleDEX(address(dusd), address(dusc), address(mweth));
+
+        // The test contract mints directly instead of going through MinterRedeemer
+        dusd.setMinterRedeemer(address(this));
+        dusc.setMinterRedeemer(address(this));
+        mweth.setMinterRedeemer(address(this));
+
+        // Same pools as DeployEcosystem, with mWETH dearer in the dUSC pool
+        dusd.mint(address(this), 6000e18);
+        dusc.mint(address(this), 7000e18);
+        mweth.mint(address(this), 4 ether);
+        dusd.approve(address(dex), type(uint256).max);
+        dusc.approve(address(dex), type(uint256).max);
+        mweth.approve(address(dex), type(uint256).max);
+        dex.addLiquidityDUSD(6000e18, 2 ether);
+        dex.addLiquidityDUSC(7000e18, 2 ether);
+
+        dusd.mint(trader, 1000e18);
+        dusc.mint(trader, 1000e18);
+        vm.startPrank(trader);
+        dusd.approve(address(dex), type(uint256).max);
+        dusc.approve(address(dex), type(uint256).max);
+        mweth.approve(address(dex), type(uint256).max);
+        vm.stopPrank();
+    }
+
+    function _amountOut(uint256 amountIn, uint256 reserveIn, uint256 reserveOut) internal pure returns (uint256) {
+        return (amountIn * reserveOut) / (reserveIn + amountIn);
+    }
+
+    function testSwapDUSDForDUSCMatchesBothLegs() public {
+        (uint256 dusdReserve, uint256 dusdPoolWeth) = dex.getDUSDPoolReserves();
+        (uint256 duscReserve, uint256 duscPoolWeth) = dex.getDUSCPoolReserves();
+        uint256 wethOut = _amountOut(100e18, dusdReserve, dusdPoolWeth);
+        uint256 expected = _amountOut(wethOut, duscPoolWeth, duscReserve);
+
+        vm.expectEmit(address(dex));
+        emit SwapDUSDForWETH(trader, 100e18, wethOut);
+        vm.expectEmit(address(dex));
+        emit SwapWETHForDUSC(trader, wethOut, expected);
+        vm.prank(trader);
+        uint256 duscOut = dex.swapDUSDForDUSC(100e18, expected, block.timestamp);
+
+        assertEq(duscOut, expected);
+        assertGt(duscOut, 100e18);
+        assertEq(dusd.balanceOf(trader), 900e18);
+        assertEq(dusc.balanceOf(trader), 1000e18 + duscOut);
+        assertEq(mweth.balanceOf(trader), 0);
+
+        (uint256 newDusdReserve, uint256 newDusdPoolWeth) = dex.getDUSDPoolReserves();
+        (uint256 newDuscReserve, uint256 newDuscPoolWeth) = dex.getDUSCPoolReserves();
+        assertEq(newDusdReserve, dusdReserve + 100e18);
+        assertEq(newDusdPoolWeth, dusdPoolWeth - wethOut);
+        assertEq(newDuscReserve, duscReserve - duscOut);
+        assertEq(newDuscPoolWeth, duscPoolWeth + wethOut);
+        // The mWETH only moved between pools
+        assertEq(mweth.balanceOf(address(dex)), newDusdPoolWeth + newDuscPoolWeth);
+    }
+
+    function testSwapDUSCForDUSDMatchesBothLegs() public {
+        (uint256 duscReserve, uint256 duscPoolWeth) = dex.getDUSCPoolReserves();
+        (uint256 dusdReserve, uint256 dusdPoolWeth) = dex.getDUSDPoolReserves();
+        uint256 wethOut = _amountOut(100e18, duscReserve, duscPoolWeth);
+        uint256 expected = _amountOut(wethOut, dusdPoolWeth, dusdReserve);
+
+        vm.expectEmit(address(dex));
+        emit SwapDUSCForWETH(trader, 100e18, wethOut);
+        vm.expectEmit(address(dex));
+        emit SwapWETHForDUSD(trader, wethOut, expected);
+        vm.prank(trader);
+        uint256 dusdOut = dex.swapDUSCForDUSD(100e18, 0, block.timestamp);
+
+        assertEq(dusdOut, expected);
+        assertEq(dusc.balanceOf(trader), 900e18);
+        assertEq(dusd.balanceOf(trader), 1000e18 + dusdOut);
+    }
+
+    function testRouterMatchesSeparateSwaps() public {
+        uint256 snapshot = vm.snapshotState();
+        vm.startPrank(trader);
+        uint256 wethOut = dex.swapDUSDForWETH(250e18);
+        uint256 separate = dex.swapWETHForDUSC(wethOut);
+        vm.stopPrank();
+
+        vm.revertToState(snapshot);
+        vm.prank(trader);
+        assertEq(dex.swapDUSDForDUSC(250e18, separate, block.timestamp), separate);
+    }
+
+    function testRevertsBelowMinOut() public {
+        (uint256 dusdReserve, uint256 dusdPoolWeth) = dex.getDUSDPoolReserves();
+        (uint256 duscReserve, uint256 duscPoolWeth) = dex.getDUSCPoolReserves();
+        uint256 expected = _amountOut(_amountOut(100e18, dusdReserve, dusdPoolWeth), duscPoolWeth, duscReserve);
+
+        vm.prank(trader);
+        vm.expectRevert("Insufficient output amount");
+        dex.swapDUSDForDUSC(100e18, expected + 1, block.timestamp);
+        vm.prank(trader);
+        vm.expectRevert("Insufficient output amount");
+        dex.swapDUSCForDUSD(100e18, type(uint256).max, block.timestamp);
+    }
+
+    function testRevertsAfterDeadline() public {
+        vm.warp(1000);
+        vm.prank(trader);
+        vm.expectRevert("Deadline expired");
+        dex.swapDUSDForDUSC(100e18, 0, 999);
+        vm.prank(trader);
+        vm.expectRevert("Deadline expired");
+        dex.swapDUSCForDUSD(100e18, 0, 999);
+    }
+
+    function testReverseRouterMatchesSeparateSwaps() public {
+        uint256 snapshot = vm.snapshotState();
+        vm.startPrank(trader);
+        uint256 wethOut = dex.swapDUSCForWETH(250e18);
+        uint256 separate = dex.swapWETHForDUSD(wethOut);
+        vm.stopPrank();
+
+        vm.revertToState(snapshot);
+        vm.prank(trader);
+        assertEq(dex.swapDUSCForDUSD(250e18, separate, block.timestamp), separate);
+    }
+}